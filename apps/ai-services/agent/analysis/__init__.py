@@ -6,6 +6,7 @@ Provides:
 - Per-turn analysis with Guide Mode support
 - Computer vision analysis (eye contact, confidence)
 - Semantic analysis (answer quality, SWOT)
+- Timeline aggregation (windowed score/sentiment series)
 - Report generation orchestration
 """
 
@@ -15,6 +16,7 @@ from .sentiment_analyzer import SentimentAnalyzer, SentimentSignal
 from .turn_analyzer import TurnAnalyzer, TurnMetrics, SessionSummary
 from .cv_analyzer import CVAnalyzer, CVAnalysisResult, Rating, Level, Pace
 from .semantic_analyzer import SemanticAnalyzer, SemanticAnalysisResult, SWOT, Resource
+from .timeline import TimelineAggregator
 from .report_generator import ReportGenerator, InterviewReport
 
 __all__ = [
@@ -43,6 +45,8 @@ __all__ = [
     "SemanticAnalysisResult",
     "SWOT",
     "Resource",
+    # Timeline
+    "TimelineAggregator",
     # Report Generation
     "ReportGenerator",
     "InterviewReport",
@@ -6,9 +6,14 @@ into a comprehensive interview performance report.
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import partial
 from typing import Any
 from uuid import uuid4
 
@@ -17,9 +22,43 @@ from .speech_analyzer import SpeechAnalyzer, SpeechAnalysisResult
 from .cv_analyzer import CVAnalyzer, CVAnalysisResult, Rating
 from .semantic_analyzer import SemanticAnalyzer, SemanticAnalysisResult, SWOT, Resource
 from .sentiment_analyzer import SentimentAnalyzer
+from .timeline import TimelineAggregator
 
 logger = logging.getLogger(__name__)
 
+# Shared across generators so concurrent reports cannot oversubscribe the host.
+_STAGE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="report-stage")
+
+# Report fields grouped by the section (stage) that produces them.
+REPORT_SECTION_FIELDS: dict[str, tuple[str, ...]] = {
+    "transcript": ("duration", "transcript", "codeHistory"),
+    "speech": ("fillerWordsAnalysis", "pacingAnalysis"),
+    "sentiment": (),
+    "cv": (),
+    "timeline": ("timelineData",),
+    "semantic": ("questions", "swot", "resources"),
+}
+BEHAVIORAL_SECTION_FIELDS: dict[str, tuple[str, ...]] = {
+    "speech": ("fillerWords", "pace", "clarity"),
+    "cv": ("eyeContact",),
+    "sentiment": (
+        "sentiment",
+        "sentimentScore",
+        "tone",
+        "mood",
+        "pronunciationClarity",
+        "hesitationCount",
+        "deliveryGuidance",
+    ),
+}
+
+
+def _run_timed_stage(stage: Callable[[], Any]) -> tuple[Any, float]:
+    """Run one analyzer stage and return its result with elapsed milliseconds."""
+    started = time.perf_counter()
+    result = stage()
+    return result, (time.perf_counter() - started) * 1000
+
 
 @dataclass
 class InterviewReport:
@@ -62,6 +101,9 @@ class InterviewReport:
     # Recommended resources
     resources: list[dict[str, str]]
 
+    # Generation diagnostics (per-stage analyzer timings)
+    metadata: dict[str, Any] = field(default_factory=dict)
+
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary for API response."""
         return {
@@ -81,17 +123,22 @@ class InterviewReport:
             "behavioralAnalysis": self.behavioral_analysis,
             "swot": self.swot,
             "resources": self.resources,
+            "metadata": self.metadata,
         }
 
 
 class ReportGenerator:
     """Orchestrates all analyzers to generate interview reports."""
 
+    # Bump whenever analyzer output changes so cached reports are invalidated.
+    ANALYZER_VERSION = "2"
+
     def __init__(self):
         self.speech_analyzer = SpeechAnalyzer()
         self.cv_analyzer = CVAnalyzer()
         self.semantic_analyzer = SemanticAnalyzer()
         self.sentiment_analyzer = SentimentAnalyzer()
+        self.timeline_aggregator = TimelineAggregator(sentiment_analyzer=self.sentiment_analyzer)
 
     def generate(
         self,
@@ -99,7 +146,10 @@ class ReportGenerator:
         video_frames: list[Any] | None = None,
     ) -> InterviewReport:
         """Generate a comprehensive interview report.
-        
+
+        Independent analyzers run concurrently on the stage executor and are
+        joined before scoring, so latency tracks the slowest stage.
+
         Args:
             session_data: Collected session data from SessionCollector
             video_frames: Optional video frames for CV analysis
@@ -108,46 +158,277 @@ class ReportGenerator:
             InterviewReport with all analysis results
         """
         logger.info(f"Generating report for session: {session_data.metadata.room_name}")
-        
-        # Convert transcript to dict format
-        transcript_dicts = [
+        started = time.perf_counter()
+
+        transcript_dicts = self._transcript_dicts(session_data)
+        duration_seconds = self._duration_seconds(session_data)
+        stages = self._analysis_stages(transcript_dicts, duration_seconds, video_frames)
+
+        futures = {
+            name: _STAGE_EXECUTOR.submit(_run_timed_stage, stage)
+            for name, stage in stages.items()
+        }
+        results: dict[str, Any] = {}
+        timings: dict[str, float] = {}
+        for name, future in futures.items():
+            results[name], timings[name] = future.result()
+
+        return self._build_report(
+            session_data,
+            transcript_dicts,
+            duration_seconds,
+            results,
+            timings,
+            wall_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    async def generate_async(
+        self,
+        session_data: SessionData,
+        video_frames: list[Any] | None = None,
+    ) -> InterviewReport:
+        """Async variant of `generate` that awaits the analyzer fan-out."""
+        logger.info(f"Generating report for session: {session_data.metadata.room_name}")
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        transcript_dicts = self._transcript_dicts(session_data)
+        duration_seconds = self._duration_seconds(session_data)
+        stages = self._analysis_stages(transcript_dicts, duration_seconds, video_frames)
+
+        names = list(stages)
+        outcomes = await asyncio.gather(
+            *(
+                loop.run_in_executor(_STAGE_EXECUTOR, _run_timed_stage, stages[name])
+                for name in names
+            )
+        )
+        results = {name: outcome[0] for name, outcome in zip(names, outcomes, strict=True)}
+        timings = {name: outcome[1] for name, outcome in zip(names, outcomes, strict=True)}
+
+        return self._build_report(
+            session_data,
+            transcript_dicts,
+            duration_seconds,
+            results,
+            timings,
+            wall_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def _transcript_dicts(self, session_data: SessionData) -> list[dict[str, Any]]:
+        """Convert transcript entries to the dict shape analyzers consume."""
+        return [
             {
                 "speaker": entry.speaker.value,
                 "text": entry.text,
                 "timestamp": entry.timestamp,
+                "duration": entry.duration,
             }
             for entry in session_data.transcript
         ]
-        
-        # Calculate duration
+
+    def _duration_seconds(self, session_data: SessionData) -> float:
+        """Session duration in seconds, 0 when the session never ended."""
         if session_data.metadata.ended_at and session_data.metadata.started_at:
-            duration_seconds = (
+            return (
                 session_data.metadata.ended_at - session_data.metadata.started_at
             ).total_seconds()
-        else:
-            duration_seconds = 0
-        
-        # Run speech analysis
-        speech_result = self.speech_analyzer.analyze(
-            transcript_entries=transcript_dicts,
-            total_duration_seconds=duration_seconds,
-        )
-        
-        # Run CV analysis
-        cv_result = self.cv_analyzer.analyze_frames(video_frames or [])
-        
-        # Run semantic analysis
-        semantic_result = self.semantic_analyzer.analyze(
-            transcript_entries=transcript_dicts,
-        )
+        return 0
+
+    def _analysis_stages(
+        self,
+        transcript_dicts: list[dict[str, Any]],
+        duration_seconds: float,
+        video_frames: list[Any] | None,
+    ) -> dict[str, Callable[[], Any]]:
+        """Independent analyzer stages, keyed by stage name.
 
+        None of these depend on each other, only the scoring step joins them.
+        """
         candidate_transcript = " ".join(
             entry.get("text", "")
             for entry in transcript_dicts
             if str(entry.get("speaker", "")).strip().lower() in {"candidate", "user", "you", "participant"}
         ).strip()
-        sentiment_signal = self.sentiment_analyzer.analyze(candidate_transcript)
-        
+
+        return {
+            "speech": partial(
+                self.speech_analyzer.analyze,
+                transcript_entries=transcript_dicts,
+                total_duration_seconds=duration_seconds,
+            ),
+            "cv": partial(self.cv_analyzer.analyze_frames, video_frames or []),
+            "semantic": partial(
+                self.semantic_analyzer.analyze,
+                transcript_entries=transcript_dicts,
+            ),
+            "sentiment": partial(self.sentiment_analyzer.analyze, candidate_transcript),
+            "timeline": partial(
+                self.timeline_aggregator.build,
+                transcript_dicts,
+                duration_seconds,
+            ),
+        }
+
+    async def iter_sections(
+        self,
+        session_data: SessionData,
+        video_frames: list[Any] | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Yield report sections as soon as the analyzer behind each finishes.
+
+        The transcript section is available immediately; analyzer sections
+        follow in completion order and the final `scores` section carries the
+        composite scores plus the full report under `report`.
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        transcript_dicts = self._transcript_dicts(session_data)
+        duration_seconds = self._duration_seconds(session_data)
+        yield "transcript", self._transcript_section(
+            session_data, transcript_dicts, duration_seconds
+        )
+
+        stages = self._analysis_stages(transcript_dicts, duration_seconds, video_frames)
+        pending = {
+            loop.run_in_executor(_STAGE_EXECUTOR, _run_timed_stage, stage): name
+            for name, stage in stages.items()
+        }
+        results: dict[str, Any] = {}
+        timings: dict[str, float] = {}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    results[name], timings[name] = future.result()
+                    yield name, self._stage_section(name, results[name])
+        finally:
+            for future in pending:
+                future.cancel()
+
+        report = self._build_report(
+            session_data,
+            transcript_dicts,
+            duration_seconds,
+            results,
+            timings,
+            wall_ms=(time.perf_counter() - started) * 1000,
+        ).to_dict()
+        yield "scores", self._scores_section(report)
+
+    @staticmethod
+    def sections_from_report(report: dict[str, Any]) -> list[tuple[str, dict[str, Any]]]:
+        """Split a finished report dict into the sections `iter_sections` emits."""
+        sections: list[tuple[str, dict[str, Any]]] = []
+        behavioral = report.get("behavioralAnalysis") or {}
+        for name, fields in REPORT_SECTION_FIELDS.items():
+            section = {field_name: report.get(field_name) for field_name in fields}
+            behavioral_fields = BEHAVIORAL_SECTION_FIELDS.get(name)
+            if behavioral_fields:
+                section["behavioralAnalysis"] = {
+                    key: behavioral[key] for key in behavioral_fields if key in behavioral
+                }
+            sections.append((name, section))
+        sections.append(("scores", ReportGenerator._scores_section(report)))
+        return sections
+
+    def _transcript_section(
+        self,
+        session_data: SessionData,
+        transcript_dicts: list[dict[str, Any]],
+        duration_seconds: float,
+    ) -> dict[str, Any]:
+        mins = int(duration_seconds // 60)
+        secs = int(duration_seconds % 60)
+        return {
+            "duration": f"{mins}:{secs:02d}",
+            "transcript": self._format_transcript(transcript_dicts),
+            "codeHistory": self._format_code_history(session_data),
+        }
+
+    def _stage_section(self, name: str, result: Any) -> dict[str, Any]:
+        """Report fields contributed by a single analyzer stage."""
+        if name == "speech":
+            return {
+                "fillerWordsAnalysis": [
+                    {"word": fw.word, "count": fw.count}
+                    for fw in result.filler_words
+                ],
+                "pacingAnalysis": [
+                    {"time": p.time, "wpm": p.wpm}
+                    for p in result.pacing_data
+                ],
+                "behavioralAnalysis": {
+                    "fillerWords": self._filler_level(result.filler_word_percentage),
+                    "pace": self._pace_level(result.average_wpm),
+                    "clarity": self._clarity_level(result.clarity_score),
+                },
+            }
+        if name == "cv":
+            return {
+                "behavioralAnalysis": {
+                    "eyeContact": result.behavioral.eye_contact.value,
+                },
+            }
+        if name == "semantic":
+            return {
+                "questions": self._format_questions(result),
+                "swot": {
+                    "strengths": result.swot.strengths,
+                    "weaknesses": result.swot.weaknesses,
+                    "opportunities": result.swot.opportunities,
+                    "threats": result.swot.threats,
+                },
+                "resources": [
+                    {"title": r.title, "type": r.type, "url": r.url}
+                    for r in result.recommended_resources
+                ],
+            }
+        if name == "sentiment":
+            return {
+                "behavioralAnalysis": {
+                    "sentiment": result.sentiment_label.title(),
+                    "sentimentScore": result.sentiment_score,
+                    "tone": result.tone_label.title(),
+                    "mood": result.mood_label.title(),
+                    "pronunciationClarity": result.pronunciation_clarity,
+                    "hesitationCount": result.hesitation_count,
+                    "deliveryGuidance": result.guidance_hint,
+                },
+            }
+        if name == "timeline":
+            return {"timelineData": result}
+        raise ValueError(f"Unknown report stage: {name}")
+
+    @staticmethod
+    def _scores_section(report: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": report.get("id"),
+            "date": report.get("date"),
+            "overallScore": report.get("overallScore"),
+            "hardSkillsScore": report.get("hardSkillsScore"),
+            "softSkillsScore": report.get("softSkillsScore"),
+            "radarData": report.get("radarData"),
+            "metadata": report.get("metadata"),
+            "report": report,
+        }
+
+    def _build_report(
+        self,
+        session_data: SessionData,
+        transcript_dicts: list[dict[str, Any]],
+        duration_seconds: float,
+        results: dict[str, Any],
+        timings: dict[str, float],
+        wall_ms: float,
+    ) -> InterviewReport:
+        """Join analyzer results into the final report."""
+        speech_result: SpeechAnalysisResult = results["speech"]
+        cv_result: CVAnalysisResult = results["cv"]
+        semantic_result: SemanticAnalysisResult = results["semantic"]
+
         # Calculate composite scores
         overall_score = self._calculate_overall_score(
             speech_result, cv_result, semantic_result
@@ -156,11 +437,19 @@ class ReportGenerator:
         soft_skills_score = int(
             (speech_result.fluency_score + cv_result.behavioral.confidence_score) / 2 * 100
         )
-        
-        # Format duration
-        mins = int(duration_seconds // 60)
-        secs = int(duration_seconds % 60)
-        duration_str = f"{mins}:{secs:02d}"
+
+        sections = self._transcript_section(session_data, transcript_dicts, duration_seconds)
+        behavioral: dict[str, Any] = {}
+        for name in ("cv", "speech", "sentiment", "semantic", "timeline"):
+            section = self._stage_section(name, results[name])
+            behavioral.update(section.pop("behavioralAnalysis", {}))
+            sections.update(section)
+
+        logger.info(
+            "Report analyzers finished in %.1fms (stages: %s)",
+            wall_ms,
+            ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items()),
+        )
         
         # Build report
         return InterviewReport(
@@ -169,43 +458,22 @@ class ReportGenerator:
             overall_score=overall_score,
             hard_skills_score=hard_skills_score,
             soft_skills_score=soft_skills_score,
-            duration=duration_str,
+            duration=sections["duration"],
             radar_data=self._generate_radar_data(speech_result, cv_result, semantic_result),
-            timeline_data=self._generate_timeline_data(transcript_dicts),
-            questions=self._format_questions(semantic_result),
-            transcript=self._format_transcript(transcript_dicts),
-            code_history=self._format_code_history(session_data),
-            filler_words_analysis=[
-                {"word": fw.word, "count": fw.count}
-                for fw in speech_result.filler_words
-            ],
-            pacing_analysis=[
-                {"time": p.time, "wpm": p.wpm}
-                for p in speech_result.pacing_data
-            ],
-            behavioral_analysis={
-                "eyeContact": cv_result.behavioral.eye_contact.value,
-                "fillerWords": self._filler_level(speech_result.filler_word_percentage),
-                "pace": self._pace_level(speech_result.average_wpm),
-                "clarity": self._clarity_level(speech_result.clarity_score),
-                "sentiment": sentiment_signal.sentiment_label.title(),
-                "sentimentScore": sentiment_signal.sentiment_score,
-                "tone": sentiment_signal.tone_label.title(),
-                "mood": sentiment_signal.mood_label.title(),
-                "pronunciationClarity": sentiment_signal.pronunciation_clarity,
-                "hesitationCount": sentiment_signal.hesitation_count,
-                "deliveryGuidance": sentiment_signal.guidance_hint,
-            },
-            swot={
-                "strengths": semantic_result.swot.strengths,
-                "weaknesses": semantic_result.swot.weaknesses,
-                "opportunities": semantic_result.swot.opportunities,
-                "threats": semantic_result.swot.threats,
+            timeline_data=sections["timelineData"],
+            questions=sections["questions"],
+            transcript=sections["transcript"],
+            code_history=sections["codeHistory"],
+            filler_words_analysis=sections["fillerWordsAnalysis"],
+            pacing_analysis=sections["pacingAnalysis"],
+            behavioral_analysis=behavioral,
+            swot=sections["swot"],
+            resources=sections["resources"],
+            metadata={
+                "stageTimingsMs": {name: round(ms, 1) for name, ms in timings.items()},
+                "analysisWallMs": round(wall_ms, 1),
+                "analyzerVersion": self.ANALYZER_VERSION,
             },
-            resources=[
-                {"title": r.title, "type": r.type, "url": r.url}
-                for r in semantic_result.recommended_resources
-            ],
         )
 
     def _calculate_overall_score(
@@ -237,18 +505,6 @@ class ReportGenerator:
             {"subject": "Engagement", "A": int(cv.behavioral.engagement_score * 100), "fullMark": 100},
         ]
 
-    def _generate_timeline_data(self, transcript: list[dict]) -> list[dict[str, Any]]:
-        """Generate timeline data for performance over time."""
-        # Group by 5-minute intervals
-        timeline = []
-        for i in range(0, 45, 5):  # 0 to 40 minutes
-            timeline.append({
-                "time": f"{i:02d}:00",
-                "score": 70 + (i % 20),  # Simulated scores
-                "sentiment": 65 + (i % 15),
-            })
-        return timeline
-
     def _format_questions(self, semantic: SemanticAnalysisResult) -> list[dict[str, Any]]:
         """Format question evaluations for report."""
         return [
@@ -280,7 +536,9 @@ class ReportGenerator:
         for index, entry in enumerate(session_data.code_history, start=1):
             minutes = int(max(0.0, entry.timestamp) // 60)
             seconds = int(max(0.0, entry.timestamp) % 60)
-            details = entry.details if isinstance(entry.details, dict) else {}
+            details = (
+                session_data.entry_details(entry) if isinstance(entry.details, dict) else {}
+            )
             snapshot_code_raw = (
                 details.get("codeSnapshot")
                 or details.get("code")
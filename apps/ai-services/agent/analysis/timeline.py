@@ -0,0 +1,212 @@
+"""Timeline aggregation for interview performance charts.
+
+Turns per-turn candidate metrics into a fixed-size score/sentiment series:
+- Per-turn scoring from transcript text (fluency, fillers, sentiment)
+- Single sorted sweep into adaptive time windows
+- LTTB downsampling so long sessions ship a bounded chart payload
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from .sentiment_analyzer import SentimentAnalyzer
+from .turn_scoring import ALL_FILLERS, calculate_fluency, calculate_overall
+
+# Candidate window sizes in seconds, smallest first.
+WINDOW_SIZES_SECONDS = (15, 30, 60, 120, 300, 600, 900, 1800)
+
+CANDIDATE_SPEAKERS = {"candidate", "user", "you", "participant"}
+
+_WORD_RE = re.compile(r"[a-zA-Z']+")
+
+
+@dataclass
+class TurnSample:
+    """Score and sentiment for a single candidate turn."""
+    timestamp: float  # Seconds from session start
+    score: float  # 0-100
+    sentiment: float  # 0-100, 50 is neutral
+
+
+@dataclass
+class TimelinePoint:
+    """Aggregated score and sentiment for one time window."""
+    start_seconds: float
+    score: float
+    sentiment: float
+
+    def to_dict(self) -> dict[str, int | str]:
+        start = int(max(0.0, self.start_seconds))
+        return {
+            "time": f"{start // 60:02d}:{start % 60:02d}",
+            "score": int(round(self.score)),
+            "sentiment": int(round(self.sentiment)),
+        }
+
+
+def adaptive_window_seconds(duration_seconds: float, max_windows: int) -> int:
+    """Pick the smallest standard window that keeps the series under `max_windows`."""
+    for size in WINDOW_SIZES_SECONDS:
+        if duration_seconds / size <= max_windows:
+            return size
+    return WINDOW_SIZES_SECONDS[-1]
+
+
+def aggregate_windows(samples: list[TurnSample], window_seconds: int) -> list[TimelinePoint]:
+    """Average samples per window in one pass over timestamp-sorted samples.
+
+    Windows without candidate turns are omitted rather than zero-filled.
+    """
+    points: list[TimelinePoint] = []
+    current_window = -1
+    score_sum = sentiment_sum = 0.0
+    count = 0
+
+    for sample in samples:
+        window = int(max(0.0, sample.timestamp) // window_seconds)
+        if window != current_window:
+            if count:
+                points.append(
+                    TimelinePoint(
+                        start_seconds=current_window * window_seconds,
+                        score=score_sum / count,
+                        sentiment=sentiment_sum / count,
+                    )
+                )
+            current_window = window
+            score_sum = sentiment_sum = 0.0
+            count = 0
+        score_sum += sample.score
+        sentiment_sum += sample.sentiment
+        count += 1
+
+    if count:
+        points.append(
+            TimelinePoint(
+                start_seconds=current_window * window_seconds,
+                score=score_sum / count,
+                sentiment=sentiment_sum / count,
+            )
+        )
+    return points
+
+
+def lttb_downsample(points: list[TimelinePoint], threshold: int) -> list[TimelinePoint]:
+    """Largest-Triangle-Three-Buckets downsampling on the score series.
+
+    Keeps the first and last point and, per bucket, the point forming the
+    largest triangle with its neighbours, so peaks and dips survive. Sentiment
+    rides along with the selected score points.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    anchor = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p.start_seconds for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p.score for p in next_bucket) / len(next_bucket)
+
+        anchor_x = points[anchor].start_seconds
+        anchor_y = points[anchor].score
+        best_index = start
+        best_area = -1.0
+        for index in range(start, end):
+            area = abs(
+                (anchor_x - avg_x) * (points[index].score - anchor_y)
+                - (anchor_x - points[index].start_seconds) * (avg_y - anchor_y)
+            )
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        sampled.append(points[best_index])
+        anchor = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class TimelineAggregator:
+    """Builds the report timeline from transcript entries."""
+
+    def __init__(
+        self,
+        max_points: int = 24,
+        max_windows: int = 96,
+        sentiment_analyzer: SentimentAnalyzer | None = None,
+    ):
+        self.max_points = max_points
+        self.max_windows = max_windows
+        self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer()
+
+    def build(
+        self,
+        transcript_entries: list[dict],
+        total_duration_seconds: float = 0.0,
+    ) -> list[dict[str, int | str]]:
+        """Compute the chart series for a session.
+
+        Args:
+            transcript_entries: Transcript dicts with speaker, text, timestamp
+                and optionally duration
+            total_duration_seconds: Session length, falls back to the last turn
+
+        Returns:
+            At most `max_points` dicts with time, score and sentiment
+        """
+        samples = self.score_turns(transcript_entries)
+        if not samples:
+            return []
+
+        # Transcript entries are appended chronologically, so this is normally
+        # a linear check rather than a sort.
+        if any(b.timestamp < a.timestamp for a, b in zip(samples, samples[1:], strict=False)):
+            samples.sort(key=lambda sample: sample.timestamp)
+
+        duration = max(total_duration_seconds, samples[-1].timestamp)
+        window = adaptive_window_seconds(duration, self.max_windows)
+        points = aggregate_windows(samples, window)
+        return [point.to_dict() for point in lttb_downsample(points, self.max_points)]
+
+    def score_turns(self, transcript_entries: list[dict]) -> list[TurnSample]:
+        """Score every candidate turn from its text and speaking duration."""
+        samples: list[TurnSample] = []
+        for entry in transcript_entries:
+            speaker = str(entry.get("speaker", "")).strip().lower()
+            text = str(entry.get("text", "") or "")
+            if speaker not in CANDIDATE_SPEAKERS or not text.strip():
+                continue
+
+            words = [word.lower() for word in _WORD_RE.findall(text)]
+            if not words:
+                continue
+            filler_count = sum(1 for word in words if word in ALL_FILLERS)
+            filler_ratio = filler_count / len(words)
+
+            duration = float(entry.get("duration", 0.0) or 0.0)
+            # Without a measured duration assume a conversational pace.
+            wpm = len(words) / (duration / 60) if duration > 0 else 130.0
+
+            signal = self.sentiment_analyzer.analyze(text)
+            fluency = calculate_fluency(wpm, filler_ratio, signal.hesitation_count, 0.5)
+            score = calculate_overall(fluency, signal.pronunciation_clarity / 100, filler_ratio)
+
+            samples.append(
+                TurnSample(
+                    timestamp=float(entry.get("timestamp", 0.0) or 0.0),
+                    score=max(0.0, min(100.0, score)),
+                    sentiment=max(0.0, min(100.0, 50 + signal.sentiment_score * 50)),
+                )
+            )
+        return samples
@@ -0,0 +1,179 @@
+"""Delta-compressed storage for IDE code snapshots.
+
+A coding round records a full editor snapshot on every change, and
+consecutive snapshots differ by a few lines. `CodeSnapshotHistory` stores a
+full keyframe every `keyframe_interval` snapshots and line diffs against
+the previous snapshot in between, so memory grows with the edits rather
+than with the file size times the number of edits. Any snapshot can be
+rebuilt by replaying at most `keyframe_interval - 1` diffs from its
+keyframe.
+
+Everything held is kept until `discard_before()` drops the records that no
+remaining snapshot needs; a journaled session calls it as its in-memory tail
+moves on, since the journal keeps the full history.
+
+Diffs are line ops: `[start, end]` copies lines `start:end` of the previous
+snapshot and a string op inserts text.
+"""
+
+from __future__ import annotations
+
+import difflib
+from typing import Any
+
+LineOps = list[Any]
+
+DEFAULT_KEYFRAME_INTERVAL = 20
+
+
+def diff_lines(base: str, text: str) -> LineOps:
+    """Line ops that turn `base` into `text`."""
+    base_lines = base.splitlines(keepends=True)
+    text_lines = text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, text_lines, autojunk=False)
+    ops: LineOps = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(text_lines[j1:j2]))
+    return ops
+
+
+def apply_line_ops(base: str, ops: LineOps) -> str:
+    """Rebuild a snapshot from its base and line ops."""
+    base_lines = base.splitlines(keepends=True)
+    parts: list[str] = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, end = op
+            parts.extend(base_lines[start:end])
+    return "".join(parts)
+
+
+def ops_size(ops: LineOps) -> int:
+    """Approximate stored size of line ops in characters."""
+    return sum(len(op) if isinstance(op, str) else 8 for op in ops)
+
+
+class CodeSnapshotHistory:
+    """Append-only snapshot list stored as keyframes plus line diffs."""
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        self.keyframe_interval = max(1, keyframe_interval)
+        # Each record is the full text (keyframe) or line ops against the
+        # previous record. `_offset` is the index of `_records[0]`; records
+        # before it were discarded.
+        self._records: list[str | LineOps] = []
+        self._offset = 0
+        self._keyframe_index: list[int] = []
+        self._since_keyframe = 0
+        self._last_text: str | None = None
+        self._cache: tuple[int, str] | None = None
+
+    def __len__(self) -> int:
+        return self._offset + len(self._records)
+
+    def append(self, text: str) -> int:
+        """Store a snapshot and return its index.
+
+        A snapshot identical to the previous one is not stored again; the
+        previous index is returned.
+        """
+        if len(self) and text == self._last_text:
+            return len(self) - 1
+
+        index = len(self)
+        record: str | LineOps = text
+        if (
+            self._last_text is not None
+            and self._since_keyframe + 1 < self.keyframe_interval
+        ):
+            ops = diff_lines(self._last_text, text)
+            if ops_size(ops) < len(text):
+                record = ops
+
+        if isinstance(record, str):
+            self._keyframe_index.append(index)
+            self._since_keyframe = 0
+        else:
+            self._keyframe_index.append(self._keyframe_index[-1])
+            self._since_keyframe += 1
+        self._records.append(record)
+        self._last_text = text
+        self._cache = (index, text)
+        return index
+
+    def append_record(self, record: str | LineOps) -> int:
+        """Append a stored record verbatim (journal replay)."""
+        if isinstance(record, str):
+            return self.append(record)
+        base = self._last_text or ""
+        return self.append(apply_line_ops(base, record))
+
+    def record(self, index: int) -> str | LineOps:
+        """The stored form of a snapshot: full text or line ops."""
+        return self._records[self._position(index)]
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("snapshot index out of range")
+        if index < self._offset:
+            raise IndexError("snapshot was discarded")
+        return index - self._offset
+
+    def get(self, index: int) -> str:
+        """Rebuild the snapshot at `index`."""
+        if index < 0:
+            index += len(self)
+        self._position(index)
+
+        cache = self._cache
+        if cache is not None and cache[0] == index:
+            return cache[1]
+
+        keyframe = self._keyframe_index[index - self._offset]
+        # Sequential reads (report formatting) continue from the cached snapshot.
+        if cache is not None and keyframe <= cache[0] < index:
+            position, text = cache
+        else:
+            position, text = keyframe, self._records[keyframe - self._offset]
+        for step in range(position + 1, index + 1):
+            text = apply_line_ops(text, self._records[step - self._offset])
+        self._cache = (index, text)
+        return text
+
+    def discard_before(self, index: int) -> None:
+        """Free records not needed to rebuild snapshot `index` or later ones.
+
+        Indices stay stable; snapshots before the keyframe of `index` can no
+        longer be read.
+        """
+        if not self._records or index <= self._offset:
+            return
+        index = min(index, len(self) - 1)
+        keyframe = self._keyframe_index[index - self._offset]
+        drop = keyframe - self._offset
+        if drop <= 0:
+            return
+        del self._records[:drop]
+        del self._keyframe_index[:drop]
+        self._offset = keyframe
+        if self._cache is not None and self._cache[0] < keyframe:
+            self._cache = None
+
+    @property
+    def latest(self) -> str | None:
+        """The most recent snapshot, if any."""
+        return self._last_text
+
+    def stored_chars(self) -> int:
+        """Approximate characters held, for memory accounting."""
+        return sum(
+            len(record) if isinstance(record, str) else ops_size(record)
+            for record in self._records
+        )
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,14 +11,24 @@ from .routers.livekit import router as livekit_router
 from .routers.auth import router as auth_router
 from .routers.documents import router as documents_router
 from .routers.reports import router as reports_router
+from .routers.reports import shutdown_report_scheduler, start_report_scheduler
 from .settings import settings
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+	await start_report_scheduler()
+	yield
+	await shutdown_report_scheduler()
+
+
 app = FastAPI(
     title="AI Voice Agent Backend",
     description="Real-time voice agent API with STT, TTS, and Computer Vision analysis.",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 allow_origins = [
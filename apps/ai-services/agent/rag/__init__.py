@@ -4,24 +4,33 @@ This module provides:
 - Document processing and embedding
 - Vector store management with Qdrant
 - LangGraph-based interview orchestration
+
+Exports load on first access, so importing a submodule (a parse worker
+importing `parsing`, say) does not pull in the embedding model or LangGraph.
 """
 
-from .schemas import (
-    DocumentMetadata,
-    ProcessedDocument,
-    TemplateContext,
-    InterviewMode,
-)
-from .document_processor import DocumentProcessor
-from .vector_store import TemplateVectorStore
-from .interview_agent import create_interview_graph
-
-__all__ = [
-    "DocumentMetadata",
-    "ProcessedDocument",
-    "TemplateContext",
-    "InterviewMode",
-    "DocumentProcessor",
-    "TemplateVectorStore",
-    "create_interview_graph",
-]
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+_EXPORTS = {
+    "DocumentMetadata": ".schemas",
+    "ProcessedDocument": ".schemas",
+    "TemplateContext": ".schemas",
+    "InterviewMode": ".schemas",
+    "DocumentProcessor": ".document_processor",
+    "TemplateVectorStore": ".vector_store",
+    "create_interview_graph": ".interview_agent",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
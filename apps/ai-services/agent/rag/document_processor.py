@@ -2,21 +2,53 @@
 
 Handles PDF, TXT, and DOCX document loading, chunking, and embedding.
 Following python-patterns skill: async patterns for I/O operations.
+
+Parsing and chunking are CPU-bound, so they run in a process pool off the
+event loop; the pool's entry point is `parsing.parse_document`, kept in a
+light module so spawned workers do not import the rest of the package.
 """
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import os
-from pathlib import Path
-from typing import BinaryIO
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_core.documents import Document
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, BinaryIO
 
+from ..settings import settings
+from .parsing import build_splitter, parse_document
 from .schemas import DocumentChunk, DocumentMetadata, DocumentType, ProcessedDocument
 
+logger = logging.getLogger(__name__)
+
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_lock = threading.Lock()
+_parse_slots = asyncio.Semaphore(max(1, settings.rag_ingest_parse_workers) * 2)
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn: forking a process that holds model threads is unsafe.
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.rag_ingest_parse_workers),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _parse_pool
+
+
+def _reset_parse_pool() -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
 
 class DocumentProcessor:
     """Process documents for vector storage.
@@ -32,12 +64,9 @@ class DocumentProcessor:
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
     ):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""],
-        )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.text_splitter = build_splitter(chunk_size, chunk_overlap)
 
     async def process_file(
         self,
@@ -59,10 +88,14 @@ class DocumentProcessor:
         Returns:
             ProcessedDocument with chunks
         """
+        def read_and_hash() -> tuple[bytes, str]:
+            # Uploads may be spooled to disk and hashing is CPU work: off-loop.
+            content = file.read()
+            file.seek(0)
+            return content, self._generate_doc_id(content, filename)
+
         # Generate document ID
-        content_bytes = file.read()
-        file.seek(0)
-        doc_id = self._generate_doc_id(content_bytes, filename)
+        content_bytes, doc_id = await asyncio.to_thread(read_and_hash)
         
         # Create metadata
         metadata = DocumentMetadata(
@@ -75,9 +108,11 @@ class DocumentProcessor:
         )
         
         try:
-            # Load and chunk document
-            documents = await self._load_document(content_bytes, filename)
-            chunks = self._chunk_documents(documents, doc_id)
+            # Load and chunk document in the parse pool
+            chunks = [
+                DocumentChunk(**chunk)
+                for chunk in await self._parse(content_bytes, filename, doc_id)
+            ]
             
             metadata.chunk_count = len(chunks)
             
@@ -94,63 +129,19 @@ class DocumentProcessor:
                 error=str(e),
             )
 
-    async def _load_document(
-        self,
-        content: bytes,
-        filename: str,
-    ) -> list[Document]:
-        """Load document based on file extension."""
-        ext = Path(filename).suffix.lower()
-        
-        # Save to temp file for loaders that need file path
-        temp_path = Path(f"/tmp/{filename}")
-        temp_path.write_bytes(content)
-        
+    async def _parse(self, content: bytes, filename: str, doc_id: str) -> list[dict[str, Any]]:
+        args = (content, filename, doc_id, self.chunk_size, self.chunk_overlap)
+        loop = asyncio.get_running_loop()
         try:
-            if ext == ".pdf":
-                loader = PyPDFLoader(str(temp_path))
-                return loader.load()
-            elif ext == ".txt" or ext == ".md":
-                loader = TextLoader(str(temp_path))
-                return loader.load()
-            elif ext == ".docx":
-                # Use python-docx for DOCX
-                from docx import Document as DocxDocument
-                doc = DocxDocument(temp_path)
-                text = "\n".join([para.text for para in doc.paragraphs])
-                return [Document(page_content=text, metadata={"source": filename})]
-            else:
-                # Fallback: try as text
-                text = content.decode("utf-8", errors="ignore")
-                return [Document(page_content=text, metadata={"source": filename})]
-        finally:
-            # Cleanup temp file
-            if temp_path.exists():
-                temp_path.unlink()
-
-    def _chunk_documents(
-        self,
-        documents: list[Document],
-        doc_id: str,
-    ) -> list[DocumentChunk]:
-        """Split documents into chunks."""
-        chunks = []
-        split_docs = self.text_splitter.split_documents(documents)
-        
-        for i, doc in enumerate(split_docs):
-            chunk = DocumentChunk(
-                id=f"{doc_id}_chunk_{i}",
-                content=doc.page_content,
-                metadata={
-                    "doc_id": doc_id,
-                    "chunk_index": i,
-                    "source": doc.metadata.get("source", ""),
-                    "page": doc.metadata.get("page", 0),
-                },
-            )
-            chunks.append(chunk)
-        
-        return chunks
+            # Bound in-flight parses so a burst of uploads queues here, not
+            # as pickled file bodies inside the pool.
+            async with _parse_slots:
+                return await loop.run_in_executor(_get_parse_pool(), parse_document, *args)
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool; rebuild it and parse in a thread.
+            logger.warning("Document parse pool broke; retrying %s in a thread", filename)
+            _reset_parse_pool()
+            return await asyncio.to_thread(parse_document, *args)
 
     def _generate_doc_id(self, content: bytes, filename: str) -> str:
         """Generate unique document ID from content hash."""
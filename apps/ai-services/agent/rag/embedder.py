@@ -0,0 +1,281 @@
+"""Sentence embedding model loader with a selectable inference backend.
+
+`rag_embedder_backend` picks how `TemplateVectorStore` runs the model:
+
+- `torch` (default): the PyTorch weights, as published
+- `onnx`: ONNX Runtime on CPU with int8 dynamic quantization. The model is
+  exported and quantized once per host into `rag_embedder_dir` and every
+  process loads the cached file; requires the `onnx` extra
+
+Each export is checked against the torch model on a few sample sentences.
+If the lowest cosine similarity is below `rag_embedder_parity_min_cosine`
+the result is recorded and processes keep using torch, so stored vectors
+stay interchangeable between backends. The embedding cache still keeps each
+variant apart (see `embedder_variant`), since int8 vectors are close to the
+torch ones but not identical.
+
+Run `python -m agent.rag.embedder` to print the parity of the configured
+backend.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import platform
+import re
+import tempfile
+from typing import Any
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from ..settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev hosts: single process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+_PARITY_FILE = "parity.json"
+
+# Variant of the model each process actually loaded, by model name.
+_variants: dict[str, str] = {}
+
+# Short, interview-shaped texts for the parity check.
+_PARITY_TEXTS = [
+    "Tell me about a time you handled a production outage.",
+    "Five years of Python experience building REST APIs with FastAPI and PostgreSQL.",
+    "Explain the difference between a process and a thread.",
+    "The candidate should describe trade-offs between consistency and availability.",
+    "Led a team of four engineers migrating a monolith to microservices on Kubernetes.",
+    "What is your approach to code review?",
+    "Bachelor of Science in Computer Science, minor in statistics.",
+    "Scoring rubric: 1 - no answer, 3 - partial understanding, 5 - complete and precise.",
+]
+
+
+def load_embedder(model_name: str) -> SentenceTransformer:
+    """Load `model_name` on the configured backend, falling back to torch."""
+    backend = settings.rag_embedder_backend.strip().lower()
+    if backend == "onnx":
+        try:
+            model = _load_onnx(model_name)
+            if model is not None:
+                return model
+        except Exception as e:
+            logger.warning("ONNX embedder unavailable for %s, using torch: %s", model_name, e)
+    elif backend != "torch":
+        logger.warning("Unknown embedder backend %r, using torch", backend)
+    _variants[model_name] = "torch"
+    return _load_torch(model_name)
+
+
+def embedder_variant(model_name: str) -> str:
+    """Which weights encode `model_name` here: `torch` or `onnx-<target>-<file>`.
+
+    Known without loading the model: an ONNX export is identified by its
+    quantization target and the file recorded in its parity check. Before
+    any process has exported it, returns `onnx-<target>`.
+    """
+    variant = _variants.get(model_name)
+    if variant is not None:
+        return variant
+    if settings.rag_embedder_backend.strip().lower() != "onnx":
+        variant = "torch"
+    else:
+        quantization = _quantization_target()
+        parity = _read_parity(_export_dir(model_name, quantization))
+        if parity is None:
+            return f"onnx-{quantization}"
+        variant = _onnx_variant(quantization, parity)
+    _variants[model_name] = variant
+    return variant
+
+
+def _onnx_variant(quantization: str, parity: dict[str, Any]) -> str:
+    if not parity.get("passed"):
+        return "torch"
+    return f"onnx-{quantization}-{parity['file_name']}"
+
+
+def check_parity(
+    model: SentenceTransformer,
+    reference: SentenceTransformer,
+    texts: list[str] | None = None,
+) -> float:
+    """Lowest cosine similarity between the two models' embeddings of `texts`."""
+    texts = texts or _PARITY_TEXTS
+    a = np.asarray(model.encode(texts, show_progress_bar=False), dtype=np.float32)
+    b = np.asarray(reference.encode(texts, show_progress_bar=False), dtype=np.float32)
+    a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b /= np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return float(np.min(np.sum(a * b, axis=1)))
+
+
+def _load_torch(model_name: str) -> SentenceTransformer:
+    if settings.rag_embedder_threads:
+        import torch
+
+        torch.set_num_threads(settings.rag_embedder_threads)
+    return SentenceTransformer(model_name)
+
+
+def _load_onnx(model_name: str) -> SentenceTransformer | None:
+    """Quantized ONNX model from the export cache, or None if it failed parity."""
+    quantization = _quantization_target()
+    export_dir = _export_dir(model_name, quantization)
+    os.makedirs(export_dir, exist_ok=True)
+
+    # One process exports; the others wait and load its files.
+    with _ExportLock(os.path.join(export_dir, ".export.lock")):
+        parity = _read_parity(export_dir)
+        if parity is None:
+            parity = _export(model_name, export_dir, quantization)
+
+    if not parity.get("passed"):
+        logger.warning(
+            "ONNX %s embedder failed parity (min cosine %.4f < %.4f), using torch",
+            quantization,
+            parity.get("min_cosine", 0.0),
+            settings.rag_embedder_parity_min_cosine,
+        )
+        return None
+    model = _open_onnx(export_dir, parity["file_name"])
+    _variants[model_name] = _onnx_variant(quantization, parity)
+    logger.info(
+        "Loaded ONNX %s embedder for %s (%s, min cosine %.4f vs torch)",
+        quantization,
+        model_name,
+        parity["file_name"],
+        parity["min_cosine"],
+    )
+    return model
+
+
+def _export_dir(model_name: str, quantization: str) -> str:
+    return os.path.join(
+        settings.rag_embedder_dir or os.path.join(tempfile.gettempdir(), "ai-services-embedder"),
+        f"{_SAFE_NAME_RE.sub('_', model_name)}-onnx-{quantization}",
+    )
+
+
+def _export(model_name: str, export_dir: str, quantization: str) -> dict[str, Any]:
+    """Export and quantize the model into `export_dir`, then record its parity."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    logger.info("Exporting ONNX embedder for %s to %s", model_name, export_dir)
+    onnx_model = SentenceTransformer(model_name, backend="onnx")
+    onnx_model.save(export_dir)
+    # `save` writes the float model at the top level; quantized files go to `onnx/`.
+    pattern = "model.onnx"
+    if quantization != "none":
+        export_dynamic_quantized_onnx_model(onnx_model, quantization, export_dir)
+        pattern = os.path.join("onnx", f"model_*{quantization}.onnx")
+    matches = glob.glob(os.path.join(export_dir, pattern))
+    if not matches:
+        raise FileNotFoundError(f"{pattern} not found in {export_dir}")
+    file_name = os.path.relpath(matches[0], export_dir).replace(os.sep, "/")
+
+    min_cosine = check_parity(_open_onnx(export_dir, file_name), SentenceTransformer(model_name))
+    parity = {
+        "model": model_name,
+        "file_name": file_name,
+        "min_cosine": min_cosine,
+        "passed": min_cosine >= settings.rag_embedder_parity_min_cosine,
+    }
+    path = os.path.join(export_dir, _PARITY_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(parity, f)
+    os.replace(f"{path}.tmp", path)
+    return parity
+
+
+def _read_parity(export_dir: str) -> dict[str, Any] | None:
+    try:
+        with open(os.path.join(export_dir, _PARITY_FILE), encoding="utf-8") as f:
+            parity = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Re-judge with the current threshold; the measurement itself is reused.
+    parity["passed"] = parity.get("min_cosine", 0.0) >= settings.rag_embedder_parity_min_cosine
+    if parity["passed"] and not os.path.exists(os.path.join(export_dir, parity.get("file_name", ""))):
+        return None
+    return parity
+
+
+def _open_onnx(export_dir: str, file_name: str) -> SentenceTransformer:
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = _thread_budget()
+    session_options.inter_op_num_threads = 1
+    return SentenceTransformer(
+        export_dir,
+        backend="onnx",
+        model_kwargs={
+            "file_name": file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": session_options,
+        },
+    )
+
+
+def _thread_budget() -> int:
+    """Intra-op threads per process, so warm job processes don't oversubscribe the CPU."""
+    if settings.rag_embedder_threads:
+        return settings.rag_embedder_threads
+    processes = max(1, settings.livekit_num_idle_processes) + 1
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+def _quantization_target() -> str:
+    """ONNX Runtime int8 kernel set for this CPU (`rag_embedder_quantization`)."""
+    target = settings.rag_embedder_quantization.strip().lower()
+    if target != "auto":
+        return target
+    if platform.machine().lower() in {"arm64", "aarch64"}:
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+class _ExportLock:
+    """Exclusive `flock` on the export directory's lock file."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._fd: int | None = None
+
+    def __enter__(self) -> None:
+        if fcntl is not None:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+if __name__ == "__main__":
+    from .vector_store import TemplateVectorStore
+
+    logging.basicConfig(level=logging.INFO)
+    name = TemplateVectorStore.EMBEDDING_MODEL
+    print(f"{settings.rag_embedder_backend} vs torch, min cosine: "
+          f"{check_parity(load_embedder(name), _load_torch(name)):.4f}")
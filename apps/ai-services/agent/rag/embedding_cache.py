@@ -0,0 +1,233 @@
+"""Persistent embedding cache shared by processes on one host.
+
+Embeddings are keyed by (model name, variant, normalized text) and stored
+in two append-only files per model variant:
+
+- `<model>-<variant>-<dim>.f32`: a float32 matrix, one row per cached text,
+  read through a memory map
+- `<model>-<variant>-<dim>.idx`: 16-byte key digests; digest `i` owns row `i`
+
+The variant names the weights that produced the vectors (`torch`, or the
+ONNX quantization target and file, see `embedder.embedder_variant`), so
+switching backends never serves vectors from another one.
+
+Writers append under an exclusive `flock`, writing the row before its
+digest, so a reader never sees a digest without its vector. A write cut
+short by a crash leaves an orphan row or a partial digest; the next writer
+overwrites or truncates it. Readers pick up rows added by other processes by
+reading the index tail on a miss. Once `max_rows` is reached the cache stops
+growing and serves reads only; that is logged once per process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Sequence
+
+import numpy as np
+
+from ..settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev hosts: single process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_BYTES = 16
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive cache key text."""
+    return " ".join(str(text or "").split())
+
+
+class EmbeddingCache:
+    """Memory-mapped float32 embedding store with a digest -> row index."""
+
+    def __init__(
+        self,
+        model_name: str,
+        dimension: int,
+        variant: str = "torch",
+        directory: str | None = None,
+        max_rows: int | None = None,
+    ):
+        self.model_name = model_name
+        self.variant = variant
+        self.dimension = dimension
+        self.max_rows = max(0, max_rows if max_rows is not None else settings.rag_embedding_cache_max_rows)
+        self.directory = directory or settings.rag_embedding_cache_dir or os.path.join(
+            tempfile.gettempdir(), "ai-services-embedding-cache"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        base = os.path.join(
+            self.directory, _SAFE_NAME_RE.sub("_", f"{model_name}-{variant}-{dimension}")
+        )
+        self.vectors_path = f"{base}.f32"
+        self.index_path = f"{base}.idx"
+        self._row_bytes = dimension * 4
+
+        self._lock = threading.Lock()
+        self._rows: dict[bytes, int] = {}
+        self._index_offset = 0
+        self._matrix: np.memmap | None = None
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._full_logged = False
+
+        # Every process opens the same pair of files; writes are positional.
+        self._vectors_fd = os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._lock:
+            self._refresh_index()
+
+    def key(self, text: str) -> bytes:
+        hasher = hashlib.sha256()
+        hasher.update(self.model_name.encode("utf-8"))
+        hasher.update(b"\x00")
+        hasher.update(self.variant.encode("utf-8"))
+        hasher.update(b"\x00")
+        hasher.update(normalize_text(text).encode("utf-8"))
+        return hasher.digest()[:_DIGEST_BYTES]
+
+    def get_many(self, texts: Sequence[str]) -> list[list[float] | None]:
+        """Cached vectors for `texts`, None where missing."""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                # Rows may have been added by another process.
+                self._refresh_index()
+            results: list[list[float] | None] = []
+            for key in keys:
+                row = self._rows.get(key)
+                if row is None:
+                    self._misses += 1
+                    results.append(None)
+                else:
+                    self._hits += 1
+                    results.append(self._read_row(row))
+            return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Append vectors for texts not cached yet."""
+        pending: dict[bytes, Sequence[float]] = {}
+        for text, vector in zip(texts, vectors, strict=True):
+            pending.setdefault(self.key(text), vector)
+        if not pending:
+            return
+
+        with self._lock:
+            self._locked_file(True)
+            try:
+                self._refresh_index()
+                row = self._index_offset // _DIGEST_BYTES
+                # Drop a partial digest left by an interrupted writer.
+                os.ftruncate(self._index_fd, row * _DIGEST_BYTES)
+                new_keys = [key for key in pending if key not in self._rows]
+                if new_keys and row + len(new_keys) > self.max_rows:
+                    self._log_full()
+                new_keys = new_keys[: max(0, self.max_rows - row)]
+                if not new_keys:
+                    return
+                matrix = np.asarray([pending[key] for key in new_keys], dtype=np.float32)
+                if matrix.shape[1] != self.dimension:
+                    raise ValueError(
+                        f"expected {self.dimension}-dim vectors, got {matrix.shape[1]}"
+                    )
+                # Rows first, then digests: a digest is only visible once
+                # its row is on disk.
+                os.pwrite(self._vectors_fd, matrix.tobytes(), row * self._row_bytes)
+                os.pwrite(self._index_fd, b"".join(new_keys), row * _DIGEST_BYTES)
+                for offset, key in enumerate(new_keys):
+                    self._rows[key] = row + offset
+                self._index_offset = (row + len(new_keys)) * _DIGEST_BYTES
+                self._writes += len(new_keys)
+            finally:
+                self._locked_file(False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "rows": len(self._rows),
+                "maxRows": self.max_rows,
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._lock)
+    # ------------------------------------------------------------------
+
+    def _log_full(self) -> None:
+        if not self._full_logged:
+            self._full_logged = True
+            logger.warning(
+                "Embedding cache %s reached max_rows=%d; new vectors are not cached",
+                self.vectors_path,
+                self.max_rows,
+            )
+
+    def _locked_file(self, acquire: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._index_fd, fcntl.LOCK_EX if acquire else fcntl.LOCK_UN)
+
+    def _refresh_index(self) -> None:
+        size = os.fstat(self._index_fd).st_size
+        size -= size % _DIGEST_BYTES
+        if size <= self._index_offset:
+            return
+        data = os.pread(self._index_fd, size - self._index_offset, self._index_offset)
+        row = self._index_offset // _DIGEST_BYTES
+        for start in range(0, len(data), _DIGEST_BYTES):
+            self._rows.setdefault(data[start:start + _DIGEST_BYTES], row)
+            row += 1
+        self._index_offset = size
+
+    def _read_row(self, row: int) -> list[float]:
+        matrix = self._matrix
+        if matrix is None or row >= matrix.shape[0]:
+            rows = os.fstat(self._vectors_fd).st_size // self._row_bytes
+            matrix = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dimension),
+            )
+            self._matrix = matrix
+        return matrix[row].tolist()
+
+
+_caches: dict[tuple[str, str, int], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(
+    model_name: str,
+    dimension: int,
+    variant: str = "torch",
+) -> EmbeddingCache | None:
+    """Get the shared cache for a model variant, or None when disabled or unavailable."""
+    if not settings.rag_embedding_cache_enabled:
+        return None
+    key = (model_name, variant, dimension)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            try:
+                cache = EmbeddingCache(model_name, dimension, variant)
+            except OSError as e:
+                logger.warning("Embedding cache unavailable: %s", e)
+                return None
+            _caches[key] = cache
+        return cache
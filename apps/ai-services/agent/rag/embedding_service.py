@@ -0,0 +1,387 @@
+"""Host-local embedding service shared by LiveKit job processes.
+
+Without it every job process loads its own copy of the embedding model and
+encodes each turn's query as a batch of one. With `rag_embed_service_socket`
+set, one sidecar process holds the model and job processes send it texts
+over a Unix socket:
+
+- requests arriving within `rag_embed_service_max_wait_ms` of each other are
+  coalesced, up to `rag_embed_service_max_batch` texts, into one `encode`
+  call, so throughput follows batch size instead of process count
+- vectors come back through shared memory: each client connection creates
+  a float32 block sized for one batch and the service writes result rows
+  into it; the socket only carries texts and row counts
+
+Clients keep one connection per thread. If the service is unreachable the
+store falls back to its in-process model and retries the service later.
+
+Run `python -m agent.rag.embedding_service` to start the service; the voice
+agent starts it automatically when `rag_embed_service_autostart` is on.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+import numpy as np
+
+from ..settings import settings
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+_MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+# After a failed call, clients use the in-process model for this long.
+_RETRY_SECONDS = 30.0
+
+
+class EmbeddingServiceError(OSError):
+    """The embedding service is unreachable or rejected a request."""
+
+
+def _encode_message(message: dict[str, Any]) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise EmbeddingServiceError("embedding service closed the connection")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def _recv_message(sock: socket.socket) -> dict[str, Any]:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+async def _read_message(reader: asyncio.StreamReader) -> dict[str, Any] | None:
+    """Next message, or None once the client disconnects."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > _MAX_MESSAGE_BYTES:
+        raise ValueError(f"message of {size} bytes exceeds the limit")
+    return json.loads(await reader.readexactly(size))
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    block = shared_memory.SharedMemory(name=name)
+    # The client owns the block. Python < 3.13 also registers attachments
+    # with the resource tracker, which would unlink it when this process exits.
+    try:
+        resource_tracker.unregister(block._name, "shared_memory")
+    except Exception:
+        pass
+    return block
+
+
+def _is_listening(socket_path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class EmbeddingServer:
+    """Micro-batching encoder behind a Unix socket."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        model_name: str,
+        max_batch: int | None = None,
+        max_wait_ms: float | None = None,
+    ):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch or settings.rag_embed_service_max_batch)
+        self.max_wait = max(
+            0.0,
+            (max_wait_ms if max_wait_ms is not None else settings.rag_embed_service_max_wait_ms) / 1000,
+        )
+        self.dimension = 0
+        self._model: Any = None
+        self._queue: asyncio.Queue[tuple[list[str], asyncio.Future[np.ndarray]]] | None = None
+
+    async def serve_forever(self) -> None:
+        from .embedder import load_embedder
+
+        if _is_listening(self.socket_path):
+            logger.info("Embedding service already listening on %s", self.socket_path)
+            return
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._model = await asyncio.to_thread(load_embedder, self.model_name)
+        self.dimension = int(self._model.get_sentence_embedding_dimension())
+        self._queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logger.info(
+            "Embedding service for %s on %s (max batch %d, max wait %.1f ms)",
+            self.model_name,
+            self.socket_path,
+            self.max_batch,
+            self.max_wait * 1000,
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        block: shared_memory.SharedMemory | None = None
+        rows: np.ndarray | None = None
+        try:
+            hello = await _read_message(reader)
+            if hello is None:
+                return
+            if hello.get("model") != self.model_name or hello.get("dim") != self.dimension:
+                writer.write(_encode_message({
+                    "error": f"service embeds {self.model_name} ({self.dimension} dims)",
+                }))
+                await writer.drain()
+                return
+            capacity = int(hello["rows"])
+            block = _attach_shared_memory(hello["shm"])
+            rows = np.ndarray((capacity, self.dimension), dtype=np.float32, buffer=block.buf)
+            writer.write(_encode_message({"ok": True}))
+            await writer.drain()
+
+            while (request := await _read_message(reader)) is not None:
+                texts = [str(text) for text in request.get("texts") or []]
+                if len(texts) > capacity:
+                    reply: dict[str, Any] = {"error": f"{len(texts)} texts exceed {capacity} rows"}
+                elif texts:
+                    future: asyncio.Future[np.ndarray] = loop.create_future()
+                    await self._queue.put((texts, future))
+                    try:
+                        rows[:len(texts)] = await future
+                        reply = {"rows": len(texts)}
+                    except Exception as e:
+                        reply = {"error": str(e)}
+                else:
+                    reply = {"rows": 0}
+                writer.write(_encode_message(reply))
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError, ValueError, KeyError, TypeError) as e:
+            # OSError also covers a shared memory block that is already gone.
+            logger.debug("Embedding client disconnected: %s", e)
+        finally:
+            # Views must go before the block can close.
+            rows = None
+            if block is not None:
+                block.close()
+            writer.close()
+
+    async def _batch_loop(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                try:
+                    item = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(
+                        self._queue.get(), timeout
+                    )
+                except (asyncio.QueueEmpty, TimeoutError):
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            started = time.perf_counter()
+            try:
+                vectors = await asyncio.to_thread(self._encode, texts)
+            except Exception as e:
+                logger.warning("Embedding batch of %d texts failed: %s", len(texts), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            logger.debug(
+                "Encoded %d texts from %d requests in %.1f ms",
+                len(texts),
+                len(batch),
+                (time.perf_counter() - started) * 1000,
+            )
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        embeddings = self._model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class _Connection:
+    """One socket plus the shared-memory block the service writes results into."""
+
+    def __init__(self, socket_path: str, model_name: str, dimension: int, capacity: int):
+        self.capacity = capacity
+        block = shared_memory.SharedMemory(create=True, size=capacity * dimension * 4)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._finalizer = weakref.finalize(self, _release, sock, block)
+        try:
+            sock.settimeout(settings.rag_embed_service_timeout_seconds)
+            sock.connect(socket_path)
+            sock.sendall(_encode_message({
+                "model": model_name,
+                "dim": dimension,
+                "shm": block.name,
+                "rows": capacity,
+            }))
+            reply = _recv_message(sock)
+            if not reply.get("ok"):
+                raise EmbeddingServiceError(reply.get("error") or "handshake rejected")
+        except BaseException:
+            self._finalizer()
+            raise
+        self._sock = sock
+        self._rows: np.ndarray | None = np.ndarray(
+            (capacity, dimension), dtype=np.float32, buffer=block.buf
+        )
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        assert self._rows is not None
+        self._sock.sendall(_encode_message({"texts": texts}))
+        reply = _recv_message(self._sock)
+        if "error" in reply:
+            raise EmbeddingServiceError(reply["error"])
+        return self._rows[:reply["rows"]].tolist()
+
+    def close(self) -> None:
+        self._rows = None
+        self._finalizer()
+
+
+def _release(sock: socket.socket, block: shared_memory.SharedMemory) -> None:
+    sock.close()
+    try:
+        block.close()
+        block.unlink()
+    except (BufferError, FileNotFoundError):
+        pass
+
+
+class EmbeddingServiceClient:
+    """Blocking client for `EmbeddingServer`; one connection per thread."""
+
+    def __init__(self, socket_path: str, model_name: str, dimension: int, capacity: int | None = None):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.dimension = dimension
+        self.capacity = max(1, capacity or settings.rag_embed_service_max_batch)
+        self._local = threading.local()
+        self._retry_at = 0.0
+
+    def available(self) -> bool:
+        """False while backing off after a failed call."""
+        return time.monotonic() >= self._retry_at
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        vectors: list[list[float]] = []
+        try:
+            connection = self._connection()
+            for start in range(0, len(texts), self.capacity):
+                vectors.extend(connection.encode(texts[start:start + self.capacity]))
+        except (OSError, ValueError) as e:
+            self._close_connection()
+            self._retry_at = time.monotonic() + _RETRY_SECONDS
+            if isinstance(e, EmbeddingServiceError):
+                raise
+            raise EmbeddingServiceError(str(e)) from e
+        return vectors
+
+    def _connection(self) -> _Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _Connection(self.socket_path, self.model_name, self.dimension, self.capacity)
+            self._local.connection = connection
+        return connection
+
+    def _close_connection(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
+
+
+_clients: dict[tuple[str, int], EmbeddingServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_embedding_service_client(model_name: str, dimension: int) -> EmbeddingServiceClient | None:
+    """Get the shared client for a model, or None when no service is configured."""
+    socket_path = settings.rag_embed_service_socket
+    if not socket_path:
+        return None
+    key = (model_name, dimension)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = EmbeddingServiceClient(socket_path, model_name, dimension)
+            _clients[key] = client
+        return client
+
+
+def spawn_embedding_service() -> subprocess.Popen | None:
+    """Start the service as a child process unless one is already listening."""
+    socket_path = settings.rag_embed_service_socket
+    if not socket_path or _is_listening(socket_path):
+        return None
+    process = subprocess.Popen([sys.executable, "-m", "agent.rag.embedding_service"])
+    atexit.register(process.terminate)
+    logger.info("Started embedding service (pid %d) on %s", process.pid, socket_path)
+    return process
+
+
+if __name__ == "__main__":
+    from .vector_store import TemplateVectorStore
+
+    logging.basicConfig(level=logging.INFO)
+    if not settings.rag_embed_service_socket:
+        sys.exit("RAG_EMBED_SERVICE_SOCKET is not set")
+    try:
+        asyncio.run(
+            EmbeddingServer(
+                settings.rag_embed_service_socket,
+                TemplateVectorStore.EMBEDDING_MODEL,
+            ).serve_forever()
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,190 @@
+"""Off-loop ingestion pipeline for template documents.
+
+Point ids are derived from chunk content, so before anything is embedded
+the pipeline looks up which ids are already stored and skips those chunks;
+re-ingesting a lightly edited document only embeds the changed chunks. The
+skipped chunks get their payload refreshed, since the document id and chunk
+positions change with every edit. Points left over from the previous version of the same file are deleted
+afterwards.
+
+Embedding and upserting run as two overlapped stages joined by a bounded
+queue, so the event loop only coordinates:
+
+- embed: batched `encode` calls on one dedicated thread shared by every
+  upload, so concurrent uploads queue behind each other instead of
+  oversubscribing the CPU
+- upsert: bounded point batches awaited on the backend's async client
+
+The queue between the stages holds at most `rag_ingest_queue_depth`
+batches; a slow Qdrant stalls embedding instead of buffering vectors.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from ..settings import settings
+from .schemas import DocumentChunk
+from .vector_backend import VectorPoint
+
+if TYPE_CHECKING:
+    from .vector_store import TemplateVectorStore
+
+logger = logging.getLogger(__name__)
+
+_EMBED_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-embed")
+
+
+async def ingest_chunks(
+    store: TemplateVectorStore,
+    template_id: str,
+    chunks: list[DocumentChunk],
+) -> int:
+    """Embed and upsert `chunks` for a template without blocking the loop.
+
+    Returns:
+        Number of points upserted (chunks already stored are skipped)
+    """
+    if not chunks:
+        return 0
+
+    embed_batch_size = max(1, settings.rag_ingest_embed_batch_size)
+    upsert_batch_size = max(1, settings.rag_ingest_upsert_batch_size)
+    timings = {"lookup": 0.0, "embed": 0.0, "upsert": 0.0}
+
+    # Point ids per source document; repeated text within a document maps to
+    # one point.
+    ids_by_source: dict[str, list[str]] = {}
+    unique: dict[str, DocumentChunk] = {}
+    for chunk in chunks:
+        point_id = store.point_id(template_id, chunk)
+        source = str(chunk.metadata.get("source", ""))
+        ids_by_source.setdefault(source, []).append(point_id)
+        unique.setdefault(point_id, chunk)
+
+    started = time.perf_counter()
+    all_ids = list(unique)
+    existing: set[str] = set()
+    for start in range(0, len(all_ids), upsert_batch_size):
+        existing |= await store.existing_point_ids_async(
+            template_id,
+            all_ids[start:start + upsert_batch_size],
+        )
+    timings["lookup"] = time.perf_counter() - started
+
+    stored_ids = [point_id for point_id in all_ids if point_id in existing]
+    for start in range(0, len(stored_ids), upsert_batch_size):
+        await store.update_point_payloads_async(
+            template_id,
+            {
+                point_id: store.chunk_payload(template_id, unique[point_id])
+                for point_id in stored_ids[start:start + upsert_batch_size]
+            },
+        )
+
+    pending_ids = [point_id for point_id in all_ids if point_id not in existing]
+    upserted = await _embed_and_upsert(
+        store,
+        template_id,
+        [unique[point_id] for point_id in pending_ids],
+        pending_ids,
+        embed_batch_size,
+        upsert_batch_size,
+        timings,
+    )
+
+    for source, keep_ids in ids_by_source.items():
+        if source:
+            await store.delete_stale_points_async(
+                template_id,
+                source,
+                list(dict.fromkeys(keep_ids)),
+            )
+
+    logger.info(
+        "Ingested %d chunks for template %s: %d embedded, %d already stored "
+        "(lookup %.0f ms, embed %.0f ms, upsert %.0f ms)",
+        len(chunks),
+        template_id,
+        upserted,
+        len(existing),
+        timings["lookup"] * 1000,
+        timings["embed"] * 1000,
+        timings["upsert"] * 1000,
+    )
+    return upserted
+
+
+async def _embed_and_upsert(
+    store: TemplateVectorStore,
+    template_id: str,
+    chunks: list[DocumentChunk],
+    point_ids: list[str],
+    embed_batch_size: int,
+    upsert_batch_size: int,
+    timings: dict[str, float],
+) -> int:
+    if not chunks:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[list[VectorPoint] | None] = asyncio.Queue(
+        maxsize=max(1, settings.rag_ingest_queue_depth)
+    )
+
+    async def embed_stage() -> None:
+        pending: list[VectorPoint] = []
+        try:
+            for start in range(0, len(chunks), embed_batch_size):
+                batch = chunks[start:start + embed_batch_size]
+                started = time.perf_counter()
+                vectors = await loop.run_in_executor(
+                    _EMBED_EXECUTOR,
+                    store.embed_texts,
+                    [chunk.content for chunk in batch],
+                )
+                timings["embed"] += time.perf_counter() - started
+                pending.extend(
+                    store.build_points(
+                        template_id,
+                        batch,
+                        vectors,
+                        point_ids[start:start + embed_batch_size],
+                    )
+                )
+                while len(pending) >= upsert_batch_size:
+                    await queue.put(pending[:upsert_batch_size])
+                    pending = pending[upsert_batch_size:]
+            if pending:
+                await queue.put(pending)
+            await queue.put(None)
+        except Exception:
+            # Stop the upsert stage; the error surfaces through `await producer`.
+            # Not on cancellation: the upsert stage already failed, and a full
+            # queue would block this put forever.
+            await queue.put(None)
+            raise
+
+    async def upsert_stage() -> int:
+        upserted = 0
+        while (points := await queue.get()) is not None:
+            started = time.perf_counter()
+            await store.upsert_points_async(points)
+            timings["upsert"] += time.perf_counter() - started
+            upserted += len(points)
+        return upserted
+
+    producer = asyncio.create_task(embed_stage())
+    try:
+        upserted = await upsert_stage()
+    except BaseException:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        raise
+    # Surfaces an embedding failure after the queue has drained.
+    await producer
+    return upserted
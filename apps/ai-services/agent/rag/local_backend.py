@@ -0,0 +1,441 @@
+"""Embedded vector backend: per-template float32 matrices on local disk.
+
+Each template is stored as two files in `rag_local_index_dir`:
+
+- `<template>.<generation>.f32`: L2-normalized float32 rows, memory-mapped
+  for search
+- `<template>.json`: sidecar with the matrix file name, point ids and
+  payloads, one per row (a deleted row has a null id)
+
+Upserts overwrite existing rows in place and append new ones, then
+atomically replace the sidecar, so readers only see rows the sidecar
+names. Once more than half the rows are deleted, the live rows are copied
+to a new generation file. A process that still maps the old file keeps
+reading it until it notices the new sidecar. Other processes reload a
+template when its sidecar changes, so an upload made by the API process is
+visible to interview workers on the same host.
+
+Search is one matrix product over all queries in a batch plus
+`argpartition`. Templates with at least `rag_local_hnsw_min_points` live
+rows use an in-memory HNSW graph when `hnswlib` is installed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from ..serialization import dumps, loads
+from ..settings import settings
+from .vector_backend import SearchOptions, VectorBackend, VectorPoint, shape_hits
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev hosts: single process only
+    fcntl = None
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional dependency
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+@dataclass
+class _TemplateIndex:
+    matrix_name: str
+    ids: list[str | None]
+    payloads: list[dict[str, Any] | None]
+    # (inode, mtime, size) of the sidecar it was loaded from; every commit
+    # replaces the sidecar, so any change means a new version.
+    version: tuple[int, int, int] = (0, 0, 0)
+    rows: dict[str, int] = field(default_factory=dict)
+    matrix: np.ndarray | None = None
+    live_rows: np.ndarray | None = None
+    hnsw: Any = None
+    _live_matrix: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids) if point_id is not None}
+        self.live_rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+
+    def live_matrix(self) -> np.ndarray:
+        """Rows of live points, aligned with `live_rows` (built once per load)."""
+        if self._live_matrix is None:
+            if len(self.live_rows) == len(self.ids):
+                self._live_matrix = self.matrix
+            else:
+                self._live_matrix = np.ascontiguousarray(self.matrix[self.live_rows])
+        return self._live_matrix
+
+
+class LocalVectorBackend(VectorBackend):
+    """In-process vector search over memory-mapped per-template matrices."""
+
+    def __init__(self, dimension: int, directory: str | None = None):
+        self.dimension = dimension
+        self.directory = directory or settings.rag_local_index_dir or os.path.join(
+            tempfile.gettempdir(), "ai-services-vector-index"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self.hnsw_min_points = settings.rag_local_hnsw_min_points
+        self._lock = threading.RLock()
+        self._templates: dict[str, _TemplateIndex] = {}
+
+    # ------------------------------------------------------------------
+    # VectorBackend
+    # ------------------------------------------------------------------
+
+    def upsert(self, points: list[VectorPoint]) -> None:
+        by_template: dict[str, list[VectorPoint]] = {}
+        for point in points:
+            by_template.setdefault(str(point.payload.get("template_id", "")), []).append(point)
+        for template_id, template_points in by_template.items():
+            with self._write_lock(template_id):
+                index = self._load(template_id) or self._empty(template_id)
+                ids = list(index.ids)
+                payloads = list(index.payloads)
+                rows = dict(index.rows)
+                updates: dict[int, VectorPoint] = {}
+                for point in template_points:
+                    row = rows.get(point.id)
+                    if row is None:
+                        row = len(ids)
+                        rows[point.id] = row
+                        ids.append(point.id)
+                        payloads.append(point.payload)
+                    else:
+                        payloads[row] = point.payload
+                    updates[row] = point
+                self._write_rows(index.matrix_name, updates)
+                self._commit(template_id, index.matrix_name, ids, payloads)
+
+    def existing_ids(self, template_id: str, point_ids: list[str]) -> set[str]:
+        with self._lock:
+            index = self._load(template_id)
+            if index is None:
+                return set()
+            return {point_id for point_id in point_ids if point_id in index.rows}
+
+    def update_payloads(self, template_id: str, payloads: dict[str, dict[str, Any]]) -> None:
+        with self._write_lock(template_id):
+            index = self._load(template_id)
+            if index is None:
+                return
+            updated = list(index.payloads)
+            changed = False
+            for point_id, fields in payloads.items():
+                row = index.rows.get(point_id)
+                if row is None:
+                    continue
+                merged = {**(updated[row] or {}), **fields}
+                if merged != updated[row]:
+                    updated[row] = merged
+                    changed = True
+            if changed:
+                self._commit(template_id, index.matrix_name, list(index.ids), updated)
+
+    def delete_template(self, template_id: str) -> None:
+        with self._write_lock(template_id):
+            index = self._load(template_id)
+            self._templates.pop(template_id, None)
+            for path in (self._sidecar_path(template_id),) + (
+                (self._path(index.matrix_name),) if index is not None else ()
+            ):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def delete_stale(self, template_id: str, source: str, keep_ids: list[str]) -> None:
+        keep = set(keep_ids)
+        with self._write_lock(template_id):
+            index = self._load(template_id)
+            if index is None:
+                return
+            ids = list(index.ids)
+            payloads = list(index.payloads)
+            removed = 0
+            for row, point_id in enumerate(ids):
+                payload = payloads[row]
+                if point_id is None or point_id in keep or payload is None:
+                    continue
+                if payload.get("source") == source:
+                    ids[row] = None
+                    payloads[row] = None
+                    removed += 1
+            if removed:
+                self._commit(template_id, index.matrix_name, ids, payloads)
+
+    def search_batch(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        options = options or SearchOptions()
+        if not vectors:
+            return []
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.dimension)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        # (score, payload) candidates per query, gathered across targets.
+        candidates: list[list[tuple[float, dict[str, Any]]]] = [[] for _ in vectors]
+        with self._lock:
+            for target_id in dict.fromkeys(target_ids):
+                index = self._load(target_id)
+                if index is None or not len(index.live_rows):
+                    continue
+                top = self._top_k(index, queries, options.candidate_limit(limit))
+                for query_index, hits in enumerate(top):
+                    candidates[query_index].extend(hits)
+
+        return [shape_hits(hits, limit, options) for hits in candidates]
+
+    def count(self, target_ids: list[str]) -> int:
+        with self._lock:
+            total = 0
+            for target_id in dict.fromkeys(target_ids):
+                index = self._load(target_id)
+                if index is not None:
+                    total += len(index.live_rows)
+            return total
+
+    def scroll(
+        self,
+        target_ids: list[str],
+        max_points: int,
+        payload_fields: list[str] | None = None,
+    ) -> list[tuple[list[float], dict[str, Any]]] | None:
+        results: list[tuple[list[float], dict[str, Any]]] = []
+        with self._lock:
+            for target_id in dict.fromkeys(target_ids):
+                index = self._load(target_id)
+                if index is None:
+                    continue
+                if len(results) + len(index.live_rows) > max_points:
+                    return None
+                for row in index.live_rows:
+                    payload = index.payloads[row] or {}
+                    if payload_fields is not None:
+                        payload = {key: payload[key] for key in payload_fields if key in payload}
+                    results.append((index.matrix[row].tolist(), payload))
+        return results
+
+    # ------------------------------------------------------------------
+    # Search internals
+    # ------------------------------------------------------------------
+
+    def _top_k(
+        self,
+        index: _TemplateIndex,
+        queries: np.ndarray,
+        limit: int,
+    ) -> list[list[tuple[float, dict[str, Any]]]]:
+        live_rows = index.live_rows
+        k = min(limit, len(live_rows))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if hnswlib is not None and len(live_rows) >= self.hnsw_min_points:
+            graph = self._hnsw(index)
+            labels, distances = graph.knn_query(queries, k=k)
+            # Inner-product space: distance = 1 - similarity.
+            return [
+                [
+                    (1.0 - float(distance), index.payloads[int(row)])
+                    for row, distance in zip(row_labels, row_distances, strict=True)
+                ]
+                for row_labels, row_distances in zip(labels, distances, strict=True)
+            ]
+
+        scores = index.live_matrix() @ queries.T  # (live rows, queries)
+        if k < len(live_rows):
+            top = np.argpartition(scores, -k, axis=0)[-k:]
+        else:
+            top = np.broadcast_to(np.arange(len(live_rows))[:, None], scores.shape)
+        return [
+            [(float(scores[row, column]), index.payloads[int(live_rows[row])]) for row in top[:, column]]
+            for column in range(queries.shape[0])
+        ]
+
+    def _hnsw(self, index: _TemplateIndex) -> Any:
+        if index.hnsw is None:
+            graph = hnswlib.Index(space="ip", dim=self.dimension)
+            graph.init_index(
+                max_elements=len(index.live_rows),
+                ef_construction=settings.rag_local_hnsw_ef_construction,
+                M=settings.rag_local_hnsw_m,
+            )
+            graph.add_items(index.live_matrix(), index.live_rows)
+            graph.set_ef(max(settings.rag_local_hnsw_ef_search, 16))
+            index.hnsw = graph
+        return index.hnsw
+
+    # ------------------------------------------------------------------
+    # Storage internals
+    # ------------------------------------------------------------------
+
+    def _file_stem(self, template_id: str) -> str:
+        digest = hashlib.sha256(template_id.encode("utf-8")).hexdigest()[:12]
+        return f"{_SAFE_NAME_RE.sub('_', template_id)[:64]}-{digest}"
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _sidecar_path(self, template_id: str) -> str:
+        return self._path(f"{self._file_stem(template_id)}.json")
+
+    def _empty(self, template_id: str) -> _TemplateIndex:
+        return _TemplateIndex(
+            matrix_name=f"{self._file_stem(template_id)}.0.f32",
+            ids=[],
+            payloads=[],
+        )
+
+    def _load(self, template_id: str) -> _TemplateIndex | None:
+        """Cached index for a template, reloaded when its sidecar changed."""
+        path = self._sidecar_path(template_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._templates.pop(template_id, None)
+            return None
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._templates.get(template_id)
+        if cached is not None and cached.version == version:
+            return cached
+
+        try:
+            with open(path, "rb") as fh:
+                sidecar = loads(fh.read())
+        except FileNotFoundError:
+            self._templates.pop(template_id, None)
+            return None
+        index = _TemplateIndex(
+            matrix_name=sidecar["matrix"],
+            ids=sidecar["ids"],
+            payloads=sidecar["payloads"],
+            version=version,
+        )
+        if index.ids:
+            index.matrix = np.memmap(
+                self._path(index.matrix_name),
+                dtype=np.float32,
+                mode="r",
+                shape=(len(index.ids), self.dimension),
+            )
+        else:
+            index.matrix = np.empty((0, self.dimension), dtype=np.float32)
+        self._templates[template_id] = index
+        return index
+
+    def _write_rows(self, matrix_name: str, updates: dict[int, VectorPoint]) -> None:
+        if not updates:
+            return
+        matrix = np.asarray([point.vector for point in updates.values()], dtype=np.float32)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"expected {self.dimension}-dim vectors, got {matrix.shape[1]}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        row_bytes = self.dimension * 4
+        fd = os.open(self._path(matrix_name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            for row, vector in zip(updates, matrix, strict=True):
+                os.pwrite(fd, vector.tobytes(), row * row_bytes)
+        finally:
+            os.close(fd)
+
+    def _commit(
+        self,
+        template_id: str,
+        matrix_name: str,
+        ids: list[str | None],
+        payloads: list[dict[str, Any] | None],
+    ) -> None:
+        """Compact if needed, then atomically publish the sidecar."""
+        old_matrix = None
+        dead = sum(1 for point_id in ids if point_id is None)
+        if dead and dead * 2 > len(ids):
+            live = [row for row, point_id in enumerate(ids) if point_id is not None]
+            old_matrix = matrix_name
+            generation = int(matrix_name.rsplit(".", 2)[-2]) + 1
+            matrix_name = f"{self._file_stem(template_id)}.{generation}.f32"
+            if live:
+                source = np.memmap(
+                    self._path(old_matrix),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(len(ids), self.dimension),
+                )
+                with open(self._path(matrix_name), "wb") as fh:
+                    fh.write(np.ascontiguousarray(source[live]).tobytes())
+            ids = [ids[row] for row in live]
+            payloads = [payloads[row] for row in live]
+
+        if not ids:
+            self._templates.pop(template_id, None)
+            for path in (self._sidecar_path(template_id), self._path(matrix_name)):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        else:
+            sidecar_path = self._sidecar_path(template_id)
+            tmp_path = f"{sidecar_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                fh.write(dumps({"matrix": matrix_name, "ids": ids, "payloads": payloads}))
+            os.replace(tmp_path, sidecar_path)
+
+        if old_matrix is not None:
+            # Open memory maps of the old generation stay valid after unlink.
+            try:
+                os.unlink(self._path(old_matrix))
+            except FileNotFoundError:
+                pass
+        # Force a reload (and HNSW rebuild) on next access.
+        self._templates.pop(template_id, None)
+
+    def _write_lock(self, template_id: str) -> _TemplateWriteLock:
+        return _TemplateWriteLock(self._lock, self._path(f"{self._file_stem(template_id)}.lock"))
+
+
+class _TemplateWriteLock:
+    """Thread lock plus an exclusive `flock` on a template's lock file."""
+
+    def __init__(self, lock: threading.RLock, path: str):
+        self._lock = lock
+        self._path = path
+        self._fd: int | None = None
+
+    def __enter__(self) -> None:
+        self._lock.acquire()
+        if fcntl is not None:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+        finally:
+            self._lock.release()
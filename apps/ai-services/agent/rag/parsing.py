@@ -0,0 +1,89 @@
+"""Document loading and chunking for the parse process pool.
+
+Spawned parse workers import this module to run `parse_document`, so it
+pulls in the document loaders and the text splitter only: no settings, no
+embedding model and nothing else from the `agent.rag` package.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def _load_documents(content: bytes, filename: str) -> list[Document]:
+    """Load document based on file extension."""
+    ext = Path(filename).suffix.lower()
+
+    if ext not in {".pdf", ".txt", ".md", ".docx"}:
+        # Fallback: try as text
+        text = content.decode("utf-8", errors="ignore")
+        return [Document(page_content=text, metadata={"source": filename})]
+
+    # Save to temp file for loaders that need file path
+    fd, temp_name = tempfile.mkstemp(suffix=ext)
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        if ext == ".pdf":
+            documents = PyPDFLoader(str(temp_path)).load()
+        elif ext == ".docx":
+            # Use python-docx for DOCX
+            from docx import Document as DocxDocument
+            doc = DocxDocument(temp_path)
+            text = "\n".join([para.text for para in doc.paragraphs])
+            documents = [Document(page_content=text)]
+        else:
+            documents = TextLoader(str(temp_path)).load()
+    finally:
+        # Cleanup temp file
+        temp_path.unlink(missing_ok=True)
+
+    for document in documents:
+        document.metadata["source"] = filename
+    return documents
+
+
+def parse_document(
+    content: bytes,
+    filename: str,
+    doc_id: str,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> list[dict[str, Any]]:
+    """Load and chunk a document; runs in the parse process pool.
+
+    Returns plain chunk dicts (`id`, `content`, `metadata`) so results
+    pickle cheaply back to the parent.
+    """
+    splitter = build_splitter(chunk_size, chunk_overlap)
+    split_docs = splitter.split_documents(_load_documents(content, filename))
+    return [
+        {
+            "id": f"{doc_id}_chunk_{i}",
+            "content": doc.page_content,
+            "metadata": {
+                "doc_id": doc_id,
+                "chunk_index": i,
+                "source": doc.metadata.get("source", ""),
+                "page": doc.metadata.get("page", 0),
+            },
+        }
+        for i, doc in enumerate(split_docs)
+    ]
+
+
+def build_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
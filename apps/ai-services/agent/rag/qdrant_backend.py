@@ -0,0 +1,516 @@
+"""Qdrant server backend for `TemplateVectorStore`.
+
+Every query filters on `template_id`, so collection bootstrap makes sure it
+has a keyword payload index (marked as the tenant key), plus ones on
+`source` for stale-chunk cleanup and `doc_id` for grouped retrieval. HNSW
+parameters and optional int8 scalar quantization come from settings and are
+applied both to new collections and, in place, to existing ones.
+
+Nothing touches the network at construction. Clients are created on first
+use and the collection is bootstrapped once, under a lock, by whichever
+call comes first; async callers run that bootstrap on a worker thread.
+Event-loop code uses an `AsyncQdrantClient` (gRPC when
+`qdrant_prefer_grpc`), whose single channel multiplexes concurrent requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections.abc import Sequence
+from typing import Any
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+from ..settings import settings
+from .vector_backend import SearchOptions, VectorBackend, VectorPoint
+
+logger = logging.getLogger(__name__)
+
+# Points per scroll page when loading a session index.
+_SCROLL_PAGE_SIZE = 256
+
+
+class QdrantBackend(VectorBackend):
+    """Points in one Qdrant collection, filtered by `template_id`."""
+
+    def __init__(self, collection_name: str, dimension: int, url: str | None = None):
+        self.collection_name = collection_name
+        self.dimension = dimension
+        self.url = url or settings.qdrant_url
+        self._lock = threading.Lock()
+        self._client: QdrantClient | None = None
+        self._async_client: AsyncQdrantClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+        self._ready = False
+
+    def _client_options(self) -> dict[str, Any]:
+        options: dict[str, Any] = {
+            "url": self.url,
+            "timeout": settings.qdrant_timeout_seconds,
+            "prefer_grpc": settings.qdrant_prefer_grpc,
+            "grpc_port": settings.qdrant_grpc_port,
+        }
+        if settings.qdrant_pool_size:
+            options["pool_size"] = settings.qdrant_pool_size
+        return options
+
+    @property
+    def client(self) -> QdrantClient:
+        """Blocking client; the first access bootstraps the collection."""
+        self._ensure_ready()
+        assert self._client is not None
+        return self._client
+
+    async def _get_async_client(self) -> AsyncQdrantClient:
+        """Async client bound to the running loop, created on first use."""
+        if not self._ready:
+            await asyncio.to_thread(self._ensure_ready)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # gRPC and httpx connections belong to the loop that opened them.
+            if self._async_client is None or self._async_loop is not loop:
+                self._async_client = AsyncQdrantClient(**self._client_options())
+                self._async_loop = loop
+            return self._async_client
+
+    def _ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            if self._client is None:
+                self._client = QdrantClient(**self._client_options())
+            self._ensure_collection(self._client)
+            self._ready = True
+
+    def _ensure_collection(self, client: QdrantClient) -> None:
+        """Create the collection, or bring an existing one up to the configured tuning."""
+        try:
+            collections = client.get_collections()
+            exists = any(c.name == self.collection_name for c in collections.collections)
+
+            if not exists:
+                client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config=qdrant_models.VectorParams(
+                        size=self.dimension,
+                        distance=qdrant_models.Distance.COSINE,
+                    ),
+                    hnsw_config=self._hnsw_config(),
+                    quantization_config=self._quantization_config(),
+                )
+                logger.info(f"Created Qdrant collection: {self.collection_name}")
+            else:
+                self._migrate_collection(client)
+            self._ensure_payload_indexes(client)
+        except Exception as e:
+            logger.warning(f"Could not ensure Qdrant collection: {e}")
+
+    def _hnsw_config(self) -> qdrant_models.HnswConfigDiff:
+        return qdrant_models.HnswConfigDiff(
+            m=settings.qdrant_hnsw_m,
+            ef_construct=settings.qdrant_hnsw_ef_construct,
+        )
+
+    def _quantization_config(self) -> qdrant_models.ScalarQuantization | None:
+        if not settings.qdrant_scalar_quantization:
+            return None
+        return qdrant_models.ScalarQuantization(
+            scalar=qdrant_models.ScalarQuantizationConfig(
+                type=qdrant_models.ScalarType.INT8,
+                quantile=settings.qdrant_quantization_quantile,
+                always_ram=True,
+            )
+        )
+
+    def _migrate_collection(self, client: QdrantClient) -> None:
+        """Update HNSW and quantization settings of an existing collection in place."""
+        config = client.get_collection(self.collection_name).config
+        hnsw = config.hnsw_config
+        hnsw_changed = (
+            hnsw.m != settings.qdrant_hnsw_m
+            or hnsw.ef_construct != settings.qdrant_hnsw_ef_construct
+        )
+
+        current = getattr(config, "quantization_config", None)
+        current_scalar = getattr(current, "scalar", None)
+        quantization: Any = None
+        if settings.qdrant_scalar_quantization:
+            if current_scalar is None or current_scalar.quantile != settings.qdrant_quantization_quantile:
+                quantization = self._quantization_config()
+        elif current is not None:
+            quantization = qdrant_models.Disabled.DISABLED
+
+        if not hnsw_changed and quantization is None:
+            return
+        # Qdrant rebuilds the index in the background; the collection stays searchable.
+        client.update_collection(
+            collection_name=self.collection_name,
+            hnsw_config=self._hnsw_config() if hnsw_changed else None,
+            quantization_config=quantization,
+        )
+        logger.info(
+            "Updated Qdrant collection %s: hnsw m=%d ef_construct=%d, scalar quantization %s",
+            self.collection_name,
+            settings.qdrant_hnsw_m,
+            settings.qdrant_hnsw_ef_construct,
+            "on" if settings.qdrant_scalar_quantization else "off",
+        )
+
+    def _ensure_payload_indexes(self, client: QdrantClient) -> None:
+        schema = client.get_collection(self.collection_name).payload_schema or {}
+        fields = {
+            # Tenant key: Qdrant co-locates each template's points on disk.
+            "template_id": qdrant_models.KeywordIndexParams(
+                type=qdrant_models.KeywordIndexType.KEYWORD,
+                is_tenant=True,
+            ),
+            "source": qdrant_models.PayloadSchemaType.KEYWORD,
+            # Grouped retrieval groups hits by document.
+            "doc_id": qdrant_models.PayloadSchemaType.KEYWORD,
+        }
+        for field_name, field_schema in fields.items():
+            if field_name in schema:
+                continue
+            client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+            logger.info("Created Qdrant payload index on %s.%s", self.collection_name, field_name)
+
+    def _search_params(self) -> qdrant_models.SearchParams | None:
+        quantization = None
+        if settings.qdrant_scalar_quantization:
+            quantization = qdrant_models.QuantizationSearchParams(
+                rescore=settings.qdrant_quantization_rescore,
+                oversampling=settings.qdrant_quantization_oversampling,
+            )
+        if quantization is None and settings.qdrant_hnsw_ef is None:
+            return None
+        return qdrant_models.SearchParams(
+            hnsw_ef=settings.qdrant_hnsw_ef,
+            quantization=quantization,
+        )
+
+    def _targets_filter(self, target_ids: list[str]) -> qdrant_models.Filter:
+        if len(target_ids) == 1:
+            match: Any = qdrant_models.MatchValue(value=target_ids[0])
+        else:
+            match = qdrant_models.MatchAny(any=target_ids)
+        return qdrant_models.Filter(
+            must=[qdrant_models.FieldCondition(key="template_id", match=match)]
+        )
+
+    def _point_structs(self, points: list[VectorPoint]) -> list[qdrant_models.PointStruct]:
+        return [
+            qdrant_models.PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+            for point in points
+        ]
+
+    def _stale_selector(
+        self,
+        template_id: str,
+        source: str,
+        keep_ids: list[str],
+    ) -> qdrant_models.FilterSelector:
+        return qdrant_models.FilterSelector(
+            filter=qdrant_models.Filter(
+                must=[
+                    qdrant_models.FieldCondition(
+                        key="template_id",
+                        match=qdrant_models.MatchValue(value=template_id),
+                    ),
+                    qdrant_models.FieldCondition(
+                        key="source",
+                        match=qdrant_models.MatchValue(value=source),
+                    ),
+                ],
+                must_not=[qdrant_models.HasIdCondition(has_id=keep_ids)],
+            )
+        )
+
+    def _set_payload_operations(
+        self,
+        payloads: dict[str, dict[str, Any]],
+    ) -> list[qdrant_models.SetPayloadOperation]:
+        return [
+            qdrant_models.SetPayloadOperation(
+                set_payload=qdrant_models.SetPayload(payload=fields, points=[point_id])
+            )
+            for point_id, fields in payloads.items()
+        ]
+
+    def upsert(self, points: list[VectorPoint]) -> None:
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=self._point_structs(points),
+        )
+
+    async def upsert_async(self, points: list[VectorPoint]) -> None:
+        client = await self._get_async_client()
+        await client.upsert(
+            collection_name=self.collection_name,
+            points=self._point_structs(points),
+        )
+
+    def existing_ids(self, template_id: str, point_ids: list[str]) -> set[str]:
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=False,
+        )
+        return {str(record.id) for record in records}
+
+    async def existing_ids_async(self, template_id: str, point_ids: list[str]) -> set[str]:
+        client = await self._get_async_client()
+        records = await client.retrieve(
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=False,
+        )
+        return {str(record.id) for record in records}
+
+    def update_payloads(self, template_id: str, payloads: dict[str, dict[str, Any]]) -> None:
+        if not payloads:
+            return
+        self.client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=self._set_payload_operations(payloads),
+        )
+
+    async def update_payloads_async(
+        self,
+        template_id: str,
+        payloads: dict[str, dict[str, Any]],
+    ) -> None:
+        if not payloads:
+            return
+        client = await self._get_async_client()
+        await client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=self._set_payload_operations(payloads),
+        )
+
+    def delete_template(self, template_id: str) -> None:
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=qdrant_models.FilterSelector(
+                filter=self._targets_filter([template_id])
+            ),
+        )
+
+    async def delete_template_async(self, template_id: str) -> None:
+        client = await self._get_async_client()
+        await client.delete(
+            collection_name=self.collection_name,
+            points_selector=qdrant_models.FilterSelector(
+                filter=self._targets_filter([template_id])
+            ),
+        )
+
+    def delete_stale(self, template_id: str, source: str, keep_ids: list[str]) -> None:
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=self._stale_selector(template_id, source, keep_ids),
+        )
+
+    async def delete_stale_async(self, template_id: str, source: str, keep_ids: list[str]) -> None:
+        client = await self._get_async_client()
+        await client.delete(
+            collection_name=self.collection_name,
+            points_selector=self._stale_selector(template_id, source, keep_ids),
+        )
+
+    def _with_payload(self, options: SearchOptions) -> Any:
+        return options.payload_fields if options.payload_fields is not None else True
+
+    def _query_requests(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions,
+    ) -> list[qdrant_models.QueryRequest]:
+        query_filter = self._targets_filter(target_ids)
+        search_params = self._search_params()
+        return [
+            qdrant_models.QueryRequest(
+                query=list(vector),
+                filter=query_filter,
+                params=search_params,
+                limit=limit,
+                score_threshold=options.score_threshold,
+                with_payload=self._with_payload(options),
+            )
+            for vector in vectors
+        ]
+
+    def _group_query(
+        self,
+        target_ids: list[str],
+        vector: Sequence[float],
+        limit: int,
+        options: SearchOptions,
+    ) -> dict[str, Any]:
+        """Arguments of a grouped search: at most `group_size` hits per group."""
+        return {
+            "collection_name": self.collection_name,
+            "query": list(vector),
+            "query_filter": self._targets_filter(target_ids),
+            "search_params": self._search_params(),
+            "group_by": options.group_by,
+            "group_size": max(1, options.group_size),
+            "limit": limit,
+            "score_threshold": options.score_threshold,
+            "with_payload": self._with_payload(options),
+        }
+
+    def _group_hits(self, response: Any, limit: int) -> list[Any]:
+        """Hits of a grouped search, best first."""
+        hits = [hit for group in response.groups for hit in group.hits]
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return hits[:limit]
+
+    def _payloads(self, batches: list[list[Any]]) -> list[list[dict[str, Any]]]:
+        return [
+            [point.payload for point in points if getattr(point, "payload", None)]
+            for points in batches
+        ]
+
+    def search_batch(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        options = options or SearchOptions()
+        client = self.client
+        if options.group_by:
+            batches = [
+                self._group_hits(
+                    client.query_points_groups(**self._group_query(target_ids, vector, limit, options)),
+                    limit,
+                )
+                for vector in vectors
+            ]
+        elif hasattr(client, "query_batch_points"):
+            responses = client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._query_requests(target_ids, vectors, limit, options),
+            )
+            batches = [getattr(response, "points", []) for response in responses]
+        else:
+            batches = [
+                client.search(
+                    collection_name=self.collection_name,
+                    query_vector=list(vector),
+                    query_filter=self._targets_filter(target_ids),
+                    search_params=self._search_params(),
+                    limit=limit,
+                    score_threshold=options.score_threshold,
+                    with_payload=self._with_payload(options),
+                )
+                for vector in vectors
+            ]
+        return self._payloads(batches)
+
+    async def search_batch_async(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        options = options or SearchOptions()
+        client = await self._get_async_client()
+        if options.group_by:
+            responses = await asyncio.gather(
+                *(
+                    client.query_points_groups(**self._group_query(target_ids, vector, limit, options))
+                    for vector in vectors
+                )
+            )
+            batches = [self._group_hits(response, limit) for response in responses]
+        else:
+            responses = await client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._query_requests(target_ids, vectors, limit, options),
+            )
+            batches = [getattr(response, "points", []) for response in responses]
+        return self._payloads(batches)
+
+    def count(self, target_ids: list[str]) -> int:
+        return self.client.count(
+            collection_name=self.collection_name,
+            count_filter=self._targets_filter(target_ids),
+            exact=True,
+        ).count
+
+    async def count_async(self, target_ids: list[str]) -> int:
+        client = await self._get_async_client()
+        result = await client.count(
+            collection_name=self.collection_name,
+            count_filter=self._targets_filter(target_ids),
+            exact=True,
+        )
+        return result.count
+
+    def scroll(
+        self,
+        target_ids: list[str],
+        max_points: int,
+        payload_fields: list[str] | None = None,
+    ) -> list[tuple[list[float], dict[str, Any]]] | None:
+        client = self.client
+        results: list[tuple[list[float], dict[str, Any]]] = []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._targets_filter(target_ids),
+                limit=_SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=payload_fields if payload_fields is not None else True,
+                with_vectors=True,
+            )
+            results.extend((point.vector, point.payload or {}) for point in points)
+            if len(results) > max_points:
+                return None
+            if offset is None:
+                return results
+
+    async def scroll_async(
+        self,
+        target_ids: list[str],
+        max_points: int,
+        payload_fields: list[str] | None = None,
+    ) -> list[tuple[list[float], dict[str, Any]]] | None:
+        client = await self._get_async_client()
+        results: list[tuple[list[float], dict[str, Any]]] = []
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._targets_filter(target_ids),
+                limit=_SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=payload_fields if payload_fields is not None else True,
+                with_vectors=True,
+            )
+            results.extend((point.vector, point.payload or {}) for point in points)
+            if len(results) > max_points:
+                return None
+            if offset is None:
+                return results
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
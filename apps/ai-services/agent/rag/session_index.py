@@ -0,0 +1,76 @@
+"""In-memory vector index for one interview session.
+
+A session retrieves from its template and its own uploads, usually a few
+hundred chunks. The worker loads those points from Qdrant once at session
+start into a contiguous, L2-normalized float32 matrix. Each turn is then a
+single matrix-vector product plus `argpartition`, with no network round-trip,
+so retrieval keeps working if Qdrant slows down mid-interview.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+
+from .vector_backend import SearchOptions, shape_hits
+
+
+class SessionVectorIndex:
+    """Cosine top-k over a fixed set of chunk vectors."""
+
+    def __init__(
+        self,
+        target_ids: Iterable[str],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[dict[str, Any]],
+        point_count: int | None = None,
+    ):
+        self.target_ids = frozenset(target_ids)
+        # Number of Qdrant points behind the index (before deduplication);
+        # compared against a fresh count to detect new uploads.
+        self.point_count = len(payloads) if point_count is None else point_count
+
+        # Identical text under several targets is kept once.
+        rows: dict[str, int] = {}
+        for row, payload in enumerate(payloads):
+            content = payload.get("content")
+            if content and content not in rows:
+                rows[content] = row
+        self.contents = list(rows)
+        self.payloads = [payloads[row] for row in rows.values()]
+
+        if rows:
+            matrix = np.asarray(vectors, dtype=np.float32)[list(rows.values())]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = np.ascontiguousarray(matrix / norms)
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int,
+        options: SearchOptions | None = None,
+    ) -> list[str]:
+        """Contents of the `k` rows most similar to `query_vector`, best first."""
+        options = options or SearchOptions()
+        if not self.contents or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+        scores = self.matrix @ query
+        candidates = options.candidate_limit(k)
+        if candidates < len(scores):
+            top = np.argpartition(scores, -candidates)[-candidates:]
+        else:
+            top = np.arange(len(scores))
+        hits = [(float(scores[row]), self.payloads[row]) for row in top]
+        return [payload["content"] for payload in shape_hits(hits, k, options)]
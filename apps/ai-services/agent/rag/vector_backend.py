@@ -0,0 +1,214 @@
+"""Storage backends for `TemplateVectorStore`.
+
+The store owns embedding, caching and point ids; a backend only stores
+vectors with their payloads and answers filtered top-k queries. Every
+point carries a `template_id` payload and searches are scoped to a set of
+target ids (templates or sessions).
+
+Backends:
+
+- `qdrant` (default): a Qdrant server, see `qdrant_backend`
+- `local`: an embedded index in this process, see `local_backend`; for
+  single-node deployments and tests, no server required
+
+Each blocking method has an `_async` twin for code on the event loop. The
+defaults run the blocking method on a worker thread; backends with native
+async I/O override them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..settings import settings
+
+
+@dataclass
+class SearchOptions:
+    """Result shaping applied by the backend."""
+
+    # Payload fields to return; None returns the whole payload.
+    payload_fields: list[str] | None = None
+    # Drop hits scoring below this cosine similarity.
+    score_threshold: float | None = None
+    # Keep at most `group_size` hits per value of this payload field, so
+    # overlapping chunks of one document don't crowd out the rest.
+    group_by: str | None = None
+    group_size: int = 1
+
+    def candidate_limit(self, limit: int) -> int:
+        """Hits to score before shaping; grouping discards some of them."""
+        return limit * GROUP_OVERFETCH if self.group_by else limit
+
+
+# Candidates fetched per result slot when grouping in-process.
+GROUP_OVERFETCH = 4
+
+
+def shape_hits(
+    hits: Iterable[tuple[float, dict[str, Any]]],
+    limit: int,
+    options: SearchOptions,
+) -> list[dict[str, Any]]:
+    """Apply threshold, grouping and payload selection to `(score, payload)` hits.
+
+    Mirrors Qdrant: results are best first and, when grouping, points
+    without the group field are skipped.
+    """
+    results: list[dict[str, Any]] = []
+    group_counts: dict[Any, int] = {}
+    for score, payload in sorted(hits, key=lambda hit: hit[0], reverse=True):
+        if len(results) >= limit:
+            break
+        if options.score_threshold is not None and score < options.score_threshold:
+            break
+        if options.group_by:
+            group = payload.get(options.group_by)
+            if group is None or group_counts.get(group, 0) >= max(1, options.group_size):
+                continue
+            group_counts[group] = group_counts.get(group, 0) + 1
+        if options.payload_fields is not None:
+            payload = {key: payload[key] for key in options.payload_fields if key in payload}
+        results.append(payload)
+    return results
+
+
+@dataclass
+class VectorPoint:
+    """A vector with its id and payload, ready to store."""
+
+    id: str
+    vector: list[float]
+    payload: dict[str, Any] = field(default_factory=dict)
+
+
+class VectorBackend(ABC):
+    """Vector storage scoped by the `template_id` payload."""
+
+    @abstractmethod
+    def upsert(self, points: list[VectorPoint]) -> None:
+        """Insert or replace points."""
+
+    @abstractmethod
+    def existing_ids(self, template_id: str, point_ids: list[str]) -> set[str]:
+        """Ids among `point_ids` already stored for the template."""
+
+    @abstractmethod
+    def update_payloads(self, template_id: str, payloads: dict[str, dict[str, Any]]) -> None:
+        """Merge fields into the payloads of stored points, by point id."""
+
+    @abstractmethod
+    def delete_template(self, template_id: str) -> None:
+        """Delete every point of a template."""
+
+    @abstractmethod
+    def delete_stale(self, template_id: str, source: str, keep_ids: list[str]) -> None:
+        """Delete a source document's points that are not in `keep_ids`."""
+
+    @abstractmethod
+    def search_batch(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Payloads of the `limit` nearest points per query vector, best first."""
+
+    def search(
+        self,
+        target_ids: list[str],
+        vector: Sequence[float],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[dict[str, Any]]:
+        return self.search_batch(target_ids, [vector], limit, options)[0]
+
+    async def upsert_async(self, points: list[VectorPoint]) -> None:
+        await asyncio.to_thread(self.upsert, points)
+
+    async def existing_ids_async(self, template_id: str, point_ids: list[str]) -> set[str]:
+        return await asyncio.to_thread(self.existing_ids, template_id, point_ids)
+
+    async def update_payloads_async(
+        self,
+        template_id: str,
+        payloads: dict[str, dict[str, Any]],
+    ) -> None:
+        await asyncio.to_thread(self.update_payloads, template_id, payloads)
+
+    async def delete_template_async(self, template_id: str) -> None:
+        await asyncio.to_thread(self.delete_template, template_id)
+
+    async def delete_stale_async(self, template_id: str, source: str, keep_ids: list[str]) -> None:
+        await asyncio.to_thread(self.delete_stale, template_id, source, keep_ids)
+
+    async def search_batch_async(
+        self,
+        target_ids: list[str],
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        return await asyncio.to_thread(self.search_batch, target_ids, vectors, limit, options)
+
+    async def search_async(
+        self,
+        target_ids: list[str],
+        vector: Sequence[float],
+        limit: int,
+        options: SearchOptions | None = None,
+    ) -> list[dict[str, Any]]:
+        return (await self.search_batch_async(target_ids, [vector], limit, options))[0]
+
+    async def count_async(self, target_ids: list[str]) -> int:
+        return await asyncio.to_thread(self.count, target_ids)
+
+    async def scroll_async(
+        self,
+        target_ids: list[str],
+        max_points: int,
+        payload_fields: list[str] | None = None,
+    ) -> list[tuple[list[float], dict[str, Any]]] | None:
+        return await asyncio.to_thread(self.scroll, target_ids, max_points, payload_fields)
+
+    @abstractmethod
+    def count(self, target_ids: list[str]) -> int:
+        """Exact number of points stored for the targets."""
+
+    @abstractmethod
+    def scroll(
+        self,
+        target_ids: list[str],
+        max_points: int,
+        payload_fields: list[str] | None = None,
+    ) -> list[tuple[list[float], dict[str, Any]]] | None:
+        """Every `(vector, payload)` for the targets, or None above `max_points`."""
+
+    def close(self) -> None:  # noqa: B027 - optional hook, no-op by default
+        """Release connections or file handles."""
+
+
+def create_backend(
+    name: str | None = None,
+    *,
+    collection_name: str,
+    dimension: int,
+    url: str | None = None,
+) -> VectorBackend:
+    """Build the configured backend (`settings.rag_vector_backend`)."""
+    name = (name or settings.rag_vector_backend).strip().lower()
+    if name == "qdrant":
+        # Imported lazily so local deployments need no Qdrant client.
+        from .qdrant_backend import QdrantBackend
+
+        return QdrantBackend(collection_name, dimension, url=url)
+    if name == "local":
+        from .local_backend import LocalVectorBackend
+
+        return LocalVectorBackend(dimension)
+    raise ValueError(f"Unknown vector backend: {name!r} (expected 'qdrant' or 'local')")
@@ -1,7 +1,13 @@
-"""Qdrant vector store for RAG pipeline.
+"""Vector store for RAG pipeline.
 
 Manages template-specific document embeddings and retrieval.
-Following backend-specialist agent: Qdrant for vector search.
+Following backend-specialist agent: Qdrant for vector search. Storage is
+pluggable (`rag_vector_backend`): a Qdrant server by default, or an
+embedded local index for single-node deployments and tests.
+
+Constructing the store does no network I/O; backends connect on first use.
+Event-loop callers use the async methods, which await the backend's async
+client and only leave the loop to compute embeddings.
 """
 
 from __future__ import annotations
@@ -10,25 +16,31 @@ import asyncio
 import logging
 import threading
 import time
+import uuid
 from typing import Any
 
-from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qdrant_models
 from sentence_transformers import SentenceTransformer
 
 from ..settings import settings
+from .embedder import embedder_variant, load_embedder
+from .embedding_cache import get_embedding_cache
+from .embedding_service import EmbeddingServiceError, get_embedding_service_client
+from .ingestion import ingest_chunks
 from .schemas import DocumentChunk, TemplateContext, InterviewMode
+from .session_index import SessionVectorIndex
+from .vector_backend import SearchOptions, VectorBackend, VectorPoint, create_backend
 
 logger = logging.getLogger(__name__)
 
+# Namespace for content-derived point ids; changing it orphans every point.
+_POINT_ID_NAMESPACE = uuid.UUID("5b0f3c2e-7d4a-5e61-9c38-2f1a6b4d8e70")
+
 
 class TemplateVectorStore:
-    """Qdrant-based vector store for interview templates.
+    """Vector store for interview templates.
     
     Features:
-    - Template-specific document storage
+    - Template-specific document storage (Qdrant or embedded local backend)
     - Semantic search for relevant context
     - Embedding generation via sentence-transformers
     """
@@ -37,18 +49,21 @@ class TemplateVectorStore:
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION = 384  # MiniLM dimension
 
-    def __init__(self, url: str | None = None):
+    def __init__(self, url: str | None = None, backend: VectorBackend | None = None):
         self.url = url or settings.qdrant_url
-        self.client = QdrantClient(
+        self.backend = backend or create_backend(
+            collection_name=self.COLLECTION_NAME,
+            dimension=self.EMBEDDING_DIMENSION,
             url=self.url,
-            timeout=settings.qdrant_timeout_seconds,
         )
         self._embedder: SentenceTransformer | None = None
+        self._embedder_lock = threading.Lock()
+        self._embedder_loader: threading.Thread | None = None
         self._query_embedding_cache: dict[str, tuple[float, list[float]]] = {}
         self._query_embedding_cache_lock = threading.Lock()
         self._query_embedding_cache_ttl_seconds = 120.0
         self._query_embedding_cache_max_entries = 256
-        self._ensure_collection()
+        self._session_indexes: dict[frozenset[str], SessionVectorIndex] = {}
 
     def _normalize_query(self, query: str) -> str:
         return " ".join(str(query or "").lower().split())[:500]
@@ -64,7 +79,8 @@ class TemplateVectorStore:
             if cached:
                 self._query_embedding_cache.pop(cache_key, None)
 
-        vector = self.embedder.encode([query], show_progress_bar=False)[0].tolist()
+        # Live turns never load the model inline; see `_encode`.
+        vector = self._encode_cached([query], load_model=False)[0]
 
         with self._query_embedding_cache_lock:
             if len(self._query_embedding_cache) >= self._query_embedding_cache_max_entries:
@@ -77,6 +93,15 @@ class TemplateVectorStore:
 
         return list(vector)
 
+    async def _get_query_embedding_async(self, query: str) -> list[float]:
+        cache_key = self._normalize_query(query)
+        with self._query_embedding_cache_lock:
+            cached = self._query_embedding_cache.get(cache_key)
+            if cached and time.time() - cached[0] <= self._query_embedding_cache_ttl_seconds:
+                return list(cached[1])
+        # Encoding is CPU-bound; keep it off the loop.
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
     def query_for_interview_sync(
         self,
         template_id: str,
@@ -84,64 +109,159 @@ class TemplateVectorStore:
         k: int = 5,
     ) -> list[str]:
         """Synchronous interview query helper used by both async and sync call sites."""
+        return self.query_targets_sync([template_id], query, k)
+
+    def query_targets_sync(
+        self,
+        target_ids: list[str],
+        query: str,
+        k: int = 5,
+    ) -> list[str]:
+        """Query several targets (templates or sessions) in one round-trip.
+
+        The query is embedded once and a single backend search covers every
+        target (a `MatchAny` filter on Qdrant), so hits are ranked across
+        all of them. Returns up to `k * len(target_ids)` chunks overall,
+        best first, without duplicate text; one strong target may supply
+        most of them. Only the `content` payload is fetched; hits
+        below `rag_min_score` are dropped and, with `rag_group_by_doc`, at
+        most `rag_group_size` (default `k`) chunks come from any one document.
+        """
+        target_ids = _unique_targets(target_ids)
+        if not target_ids:
+            return []
         query_embedding = self._get_query_embedding(query)
+        limit = k * len(target_ids)
+        options = self._search_options(k)
 
-        query_filter = qdrant_models.Filter(
-            must=[
-                qdrant_models.FieldCondition(
-                    key="template_id",
-                    match=qdrant_models.MatchValue(value=template_id),
-                )
-            ]
+        # A preloaded session index answers locally, without Qdrant.
+        session_index = self._session_indexes.get(frozenset(target_ids))
+        if session_index is not None:
+            return session_index.search(query_embedding, limit, options)
+
+        payloads = self.backend.search(target_ids, query_embedding, limit, options)
+        return _unique_contents(payloads)
+
+    async def query_targets(
+        self,
+        target_ids: list[str],
+        query: str,
+        k: int = 5,
+    ) -> list[str]:
+        """Async `query_targets_sync`: the backend query runs on the event loop."""
+        target_ids = _unique_targets(target_ids)
+        if not target_ids:
+            return []
+        query_embedding = await self._get_query_embedding_async(query)
+        limit = k * len(target_ids)
+        options = self._search_options(k)
+
+        session_index = self._session_indexes.get(frozenset(target_ids))
+        if session_index is not None:
+            return session_index.search(query_embedding, limit, options)
+
+        payloads = await self.backend.search_async(target_ids, query_embedding, limit, options)
+        return _unique_contents(payloads)
+
+    def _search_options(self, k: int) -> SearchOptions:
+        return SearchOptions(
+            payload_fields=["content"],
+            score_threshold=settings.rag_min_score,
+            group_by="doc_id" if settings.rag_group_by_doc else None,
+            # A single-document template must still be able to fill `k`.
+            group_size=settings.rag_group_size or k,
         )
 
-        if hasattr(self.client, "query_points"):
-            response = self.client.query_points(
-                collection_name=self.COLLECTION_NAME,
-                query=query_embedding,
-                query_filter=query_filter,
-                limit=k,
-                with_payload=True,
+    def count_target_points(self, target_ids: list[str]) -> int:
+        """Exact number of points stored for the targets (blocking)."""
+        return self.backend.count(target_ids)
+
+    async def count_target_points_async(self, target_ids: list[str]) -> int:
+        return await self.backend.count_async(target_ids)
+
+    def load_session_index(self, target_ids: list[str]) -> SessionVectorIndex | None:
+        """Load every point for the targets into an in-memory index (blocking).
+
+        Returns None and leaves queries on the backend when the targets hold
+        more than `rag_session_index_max_points` points.
+        """
+        target_ids = _unique_targets(target_ids)
+        if not target_ids:
+            return None
+        points = self.backend.scroll(
+            target_ids,
+            settings.rag_session_index_max_points,
+            payload_fields=["content", "doc_id"],
+        )
+        return self._install_session_index(target_ids, points)
+
+    async def load_session_index_async(self, target_ids: list[str]) -> SessionVectorIndex | None:
+        """Async `load_session_index`; only building the matrix leaves the loop."""
+        target_ids = _unique_targets(target_ids)
+        if not target_ids:
+            return None
+        points = await self.backend.scroll_async(
+            target_ids,
+            settings.rag_session_index_max_points,
+            payload_fields=["content", "doc_id"],
+        )
+        return await asyncio.to_thread(self._install_session_index, target_ids, points)
+
+    def _install_session_index(
+        self,
+        target_ids: list[str],
+        points: list[tuple[list[float], dict[str, Any]]] | None,
+    ) -> SessionVectorIndex | None:
+        if points is None:
+            logger.info(
+                "Targets %s exceed %d points; session index disabled",
+                target_ids,
+                settings.rag_session_index_max_points,
             )
-            points = getattr(response, "points", [])
-            return [
-                point.payload.get("content", "")
-                for point in points
-                if getattr(point, "payload", None) and point.payload.get("content")
-            ]
-
-        results = self.client.search(
-            collection_name=self.COLLECTION_NAME,
-            query_vector=query_embedding,
-            query_filter=query_filter,
-            limit=k,
+            self.drop_session_index(target_ids)
+            return None
+
+        index = SessionVectorIndex(
+            target_ids,
+            [vector for vector, _ in points],
+            [payload for _, payload in points],
         )
-        return [hit.payload.get("content", "") for hit in results if hit.payload.get("content")]
+        self._session_indexes[index.target_ids] = index
+        return index
+
+    def session_index(self, target_ids: list[str]) -> SessionVectorIndex | None:
+        return self._session_indexes.get(frozenset(target_ids))
+
+    def drop_session_index(self, target_ids: list[str]) -> None:
+        self._session_indexes.pop(frozenset(target_ids), None)
 
     @property
     def embedder(self) -> SentenceTransformer:
-        """Lazy load embedder."""
+        """Lazy load embedder on the configured backend (`rag_embedder_backend`)."""
         if self._embedder is None:
-            self._embedder = SentenceTransformer(self.EMBEDDING_MODEL)
+            with self._embedder_lock:
+                if self._embedder is None:
+                    self._embedder = load_embedder(self.EMBEDDING_MODEL)
         return self._embedder
 
-    def _ensure_collection(self) -> None:
-        """Create collection if it doesn't exist."""
+    def _load_embedder_in_background(self) -> None:
+        with self._embedder_lock:
+            if self._embedder is not None or self._embedder_loader is not None:
+                return
+            self._embedder_loader = threading.Thread(
+                target=self._load_embedder, name="rag-embedder-load", daemon=True
+            )
+            self._embedder_loader.start()
+        logger.warning("Embedding service unavailable; loading the embedder in-process")
+
+    def _load_embedder(self) -> None:
         try:
-            collections = self.client.get_collections()
-            exists = any(c.name == self.COLLECTION_NAME for c in collections.collections)
-            
-            if not exists:
-                self.client.create_collection(
-                    collection_name=self.COLLECTION_NAME,
-                    vectors_config=qdrant_models.VectorParams(
-                        size=self.EMBEDDING_DIMENSION,
-                        distance=qdrant_models.Distance.COSINE,
-                    ),
-                )
-                logger.info(f"Created Qdrant collection: {self.COLLECTION_NAME}")
+            _ = self.embedder
         except Exception as e:
-            logger.warning(f"Could not ensure Qdrant collection: {e}")
+            logger.warning("Failed to load RAG embedder: %s", e)
+        finally:
+            with self._embedder_lock:
+                self._embedder_loader = None
 
     async def add_template_documents(
         self,
@@ -154,40 +274,159 @@ class TemplateVectorStore:
             template_id: Template ID to associate chunks with
             chunks: List of document chunks
             
+        Chunks already stored for the template are not embedded again.
+
         Returns:
-            Number of chunks added
+            Number of chunks embedded and upserted
         """
         if not chunks:
             return 0
 
-        # Generate embeddings
-        texts = [chunk.content for chunk in chunks]
-        embeddings = self.embedder.encode(texts, show_progress_bar=False)
-
-        # Prepare points for Qdrant
-        points = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            points.append(
-                qdrant_models.PointStruct(
-                    id=hash(chunk.id) & 0xFFFFFFFFFFFFFFFF,  # Positive int64
-                    vector=embedding.tolist(),
-                    payload={
-                        "chunk_id": chunk.id,
-                        "template_id": template_id,
-                        "content": chunk.content,
-                        **chunk.metadata,
-                    },
-                )
+        # Embedding and upserts run off the event loop in bounded batches
+        added = await ingest_chunks(self, template_id, chunks)
+        logger.info(f"Added {added} chunks for template {template_id}")
+        return added
+
+    def point_id(self, template_id: str, chunk: DocumentChunk) -> str:
+        """Deterministic point id for a chunk.
+
+        Derived from the template, source document, embedding model and
+        chunk text, so re-ingesting unchanged text maps to the same point.
+        """
+        name = "\x1f".join(
+            (
+                template_id,
+                str(chunk.metadata.get("source", "")),
+                self.EMBEDDING_MODEL,
+                chunk.content,
             )
+        )
+        return str(uuid.uuid5(_POINT_ID_NAMESPACE, name))
 
-        # Upsert to Qdrant
-        self.client.upsert(
-            collection_name=self.COLLECTION_NAME,
-            points=points,
+    def existing_point_ids(self, template_id: str, point_ids: list[str]) -> set[str]:
+        """Ids among `point_ids` already stored for the template (blocking)."""
+        return self.backend.existing_ids(template_id, point_ids)
+
+    async def existing_point_ids_async(self, template_id: str, point_ids: list[str]) -> set[str]:
+        return await self.backend.existing_ids_async(template_id, point_ids)
+
+    def delete_stale_points(
+        self,
+        template_id: str,
+        source: str,
+        keep_ids: list[str],
+    ) -> None:
+        """Delete a document's points that are not in `keep_ids` (blocking).
+
+        Removes chunks left over from an earlier version of the same file.
+        """
+        self.backend.delete_stale(template_id, source, keep_ids)
+
+    async def delete_stale_points_async(
+        self,
+        template_id: str,
+        source: str,
+        keep_ids: list[str],
+    ) -> None:
+        await self.backend.delete_stale_async(template_id, source, keep_ids)
+
+    def update_point_payloads(
+        self,
+        template_id: str,
+        payloads: dict[str, dict[str, Any]],
+    ) -> None:
+        """Merge payload fields into stored points by id (blocking)."""
+        self.backend.update_payloads(template_id, payloads)
+
+    async def update_point_payloads_async(
+        self,
+        template_id: str,
+        payloads: dict[str, dict[str, Any]],
+    ) -> None:
+        await self.backend.update_payloads_async(template_id, payloads)
+
+    def chunk_payload(self, template_id: str, chunk: DocumentChunk) -> dict[str, Any]:
+        """Payload stored with a chunk's point."""
+        return {
+            "chunk_id": chunk.id,
+            "template_id": template_id,
+            "content": chunk.content,
+            **chunk.metadata,
+        }
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode one batch of texts (blocking; call from a worker thread)."""
+        return self._encode_cached(texts)
+
+    def _encode_cached(self, texts: list[str], load_model: bool = True) -> list[list[float]]:
+        """Encode texts, reusing vectors from the persistent embedding cache."""
+        cache = get_embedding_cache(
+            self.EMBEDDING_MODEL,
+            self.EMBEDDING_DIMENSION,
+            embedder_variant(self.EMBEDDING_MODEL),
         )
-        
-        logger.info(f"Added {len(points)} chunks for template {template_id}")
-        return len(points)
+        vectors = cache.get_many(texts) if cache is not None else [None] * len(texts)
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[index] for index in missing]
+            encoded = self._encode(missing_texts, load_model)
+            for index, vector in zip(missing, encoded, strict=True):
+                vectors[index] = vector
+            if cache is not None:
+                try:
+                    cache.put_many(missing_texts, encoded)
+                except (OSError, ValueError) as e:
+                    logger.warning("Failed to write embedding cache: %s", e)
+        return vectors
+
+    def _encode(self, texts: list[str], load_model: bool = True) -> list[list[float]]:
+        """Encode on the host's embedding service when configured, else in-process.
+
+        When the service fails and the in-process model is not loaded yet,
+        `load_model=False` starts loading it in the background and raises
+        `EmbeddingServiceError` instead of blocking the caller on the load.
+        """
+        service = get_embedding_service_client(self.EMBEDDING_MODEL, self.EMBEDDING_DIMENSION)
+        if service is not None:
+            try:
+                if not service.available():
+                    raise EmbeddingServiceError("backing off after a failed call")
+                return service.encode(texts)
+            except EmbeddingServiceError as e:
+                if not load_model and self._embedder is None:
+                    self._load_embedder_in_background()
+                    raise
+                logger.warning("Embedding service unavailable, encoding in-process: %s", e)
+        embeddings = self.embedder.encode(
+            texts,
+            batch_size=len(texts),
+            show_progress_bar=False,
+        )
+        return [embedding.tolist() for embedding in embeddings]
+
+    def build_points(
+        self,
+        template_id: str,
+        chunks: list[DocumentChunk],
+        vectors: list[list[float]],
+        point_ids: list[str],
+    ) -> list[VectorPoint]:
+        """Prepare points for embedded chunks."""
+        return [
+            VectorPoint(
+                id=point_id,
+                vector=vector,
+                payload=self.chunk_payload(template_id, chunk),
+            )
+            for chunk, vector, point_id in zip(chunks, vectors, point_ids, strict=True)
+        ]
+
+    def upsert_points(self, points: list[VectorPoint]) -> None:
+        """Upsert one batch of points (blocking; call from a worker thread)."""
+        self.backend.upsert(points)
+
+    async def upsert_points_async(self, points: list[VectorPoint]) -> None:
+        await self.backend.upsert_async(points)
 
     async def query_for_interview(
         self,
@@ -206,12 +445,7 @@ class TemplateVectorStore:
             List of relevant content strings
         """
         try:
-            return await asyncio.to_thread(
-                self.query_for_interview_sync,
-                template_id,
-                query,
-                k,
-            )
+            return await self.query_targets([template_id], query, k)
         except Exception as e:
             logger.warning("Failed RAG query for template %s: %s", template_id, e)
             return []
@@ -262,30 +496,43 @@ class TemplateVectorStore:
         Returns:
             Number of documents deleted
         """
-        result = self.client.delete(
-            collection_name=self.COLLECTION_NAME,
-            points_selector=qdrant_models.FilterSelector(
-                filter=qdrant_models.Filter(
-                    must=[
-                        qdrant_models.FieldCondition(
-                            key="template_id",
-                            match=qdrant_models.MatchValue(value=template_id),
-                        )
-                    ]
-                )
-            ),
-        )
+        await self.backend.delete_template_async(template_id)
         logger.info(f"Deleted documents for template {template_id}")
-        return 1  # Qdrant doesn't return count
+        return 1  # Backends don't return a count
+
+
+def _unique_targets(target_ids: list[str]) -> list[str]:
+    return list(dict.fromkeys(target_id for target_id in target_ids if target_id))
+
+
+def _unique_contents(payloads: list[dict[str, Any]]) -> list[str]:
+    # The same document uploaded to a template and a session yields
+    # identical chunks under both targets.
+    contents = (payload.get("content", "") for payload in payloads)
+    return list(dict.fromkeys(content for content in contents if content))
 
 
 # Singleton instance
 _vector_store: TemplateVectorStore | None = None
+_vector_store_lock = threading.Lock()
 
 
 def get_vector_store() -> TemplateVectorStore:
     """Get or create vector store singleton."""
     global _vector_store
     if _vector_store is None:
-        _vector_store = TemplateVectorStore()
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = TemplateVectorStore()
     return _vector_store
+
+
+async def get_vector_store_async() -> TemplateVectorStore:
+    """`get_vector_store` for the event loop.
+
+    The first call builds the store on a worker thread, since importing the
+    backend client can take a while; later calls return it directly.
+    """
+    if _vector_store is not None:
+        return _vector_store
+    return await asyncio.to_thread(get_vector_store)
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from .settings import settings
@@ -13,19 +14,20 @@ from .voice_helpers import _compact_text
 
 logger = logging.getLogger("voice-agent")
 
-_RAG_EXECUTOR = ThreadPoolExecutor(max_workers=4)
 _RAG_CACHE_LOCK = threading.Lock()
 _RAG_RESULT_CACHE: dict[str, tuple[float, list[str]]] = {}
 _RAG_CACHE_TTL_SECONDS = 45.0
 _RAG_CACHE_MAX_ENTRIES = 256
+# Async lookups outliving their caller; referenced until they finish.
+_RAG_BACKGROUND_LOOKUPS: set[asyncio.Task[list[str]]] = set()
 
 
 def _normalize_rag_query(query: str) -> str:
     return _compact_text(query.lower(), settings.rag_query_max_chars)
 
 
-def _rag_cache_key(target_id: str, query: str, k: int) -> str:
-    return f"{target_id}|{k}|{_normalize_rag_query(query)}"
+def _rag_cache_key(target_ids: list[str], query: str, k: int) -> str:
+    return f"{','.join(target_ids)}|{k}|{_normalize_rag_query(query)}"
 
 
 def _get_cached_rag_results(cache_key: str) -> list[str] | None:
@@ -51,32 +53,59 @@ def _set_cached_rag_results(cache_key: str, chunks: list[str]) -> None:
         _RAG_RESULT_CACHE[cache_key] = (now, list(chunks))
 
 
-def _lookup_rag_chunks_with_cache(store: Any, target_id: str, query: str, k: int) -> list[str]:
-    cache_key = _rag_cache_key(target_id, query, k)
+def _rag_targets(template_id: str | None, session_id: str | None) -> list[str]:
+    """Vector store targets for a turn: the template and the session's uploads."""
+    targets: list[str] = []
+    if template_id:
+        targets.append(template_id)
+    if session_id:
+        targets.append(session_id)
+        targets.append(f"session_{session_id}")
+    return list(dict.fromkeys(targets))
+
+
+async def _lookup_rag_chunks_async(
+    store_factory: Callable[[], Awaitable[Any]],
+    target_ids: list[str],
+    query: str,
+    k: int,
+) -> list[str]:
+    """One embedding and one vector query across all `target_ids`, result-cached.
+
+    The query awaits the store's async backend client. The caller owns the
+    deadline: a lookup abandoned by `wait_for` keeps running as a background
+    task and still fills the cache for the next turn.
+    """
+    target_ids = list(dict.fromkeys(target_ids))
+    if not target_ids:
+        return []
+    cache_key = _rag_cache_key(target_ids, query, k)
     cached = _get_cached_rag_results(cache_key)
     if cached is not None:
-        logger.debug("RAG cache hit for target '%s'", target_id)
+        logger.debug("RAG cache hit for targets %s", target_ids)
         return cached
 
-    future = _RAG_EXECUTOR.submit(
-        store.query_for_interview_sync,
-        target_id,
-        query,
-        k,
+    task = asyncio.create_task(
+        _query_and_cache_async(store_factory, target_ids, query, k, cache_key)
     )
+    _RAG_BACKGROUND_LOOKUPS.add(task)
+    task.add_done_callback(_RAG_BACKGROUND_LOOKUPS.discard)
+    return await asyncio.shield(task)
+
+
+async def _query_and_cache_async(
+    store_factory: Callable[[], Awaitable[Any]],
+    target_ids: list[str],
+    query: str,
+    k: int,
+    cache_key: str,
+) -> list[str]:
     try:
-        chunks = future.result(timeout=settings.rag_lookup_timeout_seconds)
-    except FutureTimeoutError:
-        logger.warning(
-            "Qdrant RAG lookup timed out for target '%s' after %.1fs",
-            target_id,
-            settings.rag_lookup_timeout_seconds,
-        )
-        return []
+        store = await store_factory()
+        chunks = await store.query_targets(target_ids, query, k)
     except Exception as rag_err:
-        logger.warning("Qdrant RAG lookup failed for target '%s': %s", target_id, rag_err)
+        logger.warning("Qdrant RAG lookup failed for targets %s: %s", target_ids, rag_err)
         return []
-
     _set_cached_rag_results(cache_key, chunks)
-    logger.info("Qdrant RAG: Found %d hits for target '%s'", len(chunks), target_id)
+    logger.info("Qdrant RAG: Found %d hits for targets %s", len(chunks), target_ids)
     return chunks
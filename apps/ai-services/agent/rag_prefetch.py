@@ -0,0 +1,127 @@
+"""Speculative RAG retrieval on interim transcripts.
+
+The LLM interceptor only knows the user's question once the final
+transcript lands, so retrieval used to sit between end-of-speech and the
+first LLM token. `RagPrefetcher` starts the lookup while the candidate is
+still talking: once the interim transcript has been stable for the debounce
+window, it launches retrieval for the turn text so far (earlier final
+segments plus the interim). A newer transcript cancels and replaces the
+pending prefetch. When the interceptor runs, `take()` hands over the
+prefetch if its text is close enough to the final query.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import difflib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .rag_cache import _lookup_rag_chunks_async, _normalize_rag_query
+from .settings import settings
+
+logger = logging.getLogger("voice-agent")
+
+
+class RagPrefetcher:
+    """Debounced, cancellable retrieval driven by STT transcripts."""
+
+    def __init__(
+        self,
+        store_factory: Callable[[], Awaitable[Any]],
+        target_ids: list[str],
+        k: int,
+    ):
+        self.store_factory = store_factory
+        self.target_ids = target_ids
+        self.k = k
+        self.debounce_seconds = settings.rag_prefetch_debounce_ms / 1000
+        self.min_chars = settings.rag_prefetch_min_chars
+        self.reuse_similarity = settings.rag_prefetch_reuse_similarity
+
+        self._turn_finals: list[str] = []
+        self._pending_text = ""
+        self._debounce: asyncio.TimerHandle | None = None
+        self._query = ""
+        self._task: asyncio.Task[list[str]] | None = None
+        self._started_at = 0.0
+
+    def on_transcript(self, transcript: str, is_final: bool) -> None:
+        """Feed an STT event; schedules a prefetch once the text settles."""
+        transcript = transcript.strip()
+        if not transcript or not self.target_ids:
+            return
+        if is_final:
+            self._turn_finals.append(transcript)
+            text = " ".join(self._turn_finals)
+        else:
+            text = " ".join([*self._turn_finals, transcript])
+        if text == self._pending_text:
+            return
+        self._pending_text = text
+
+        if self._debounce is not None:
+            self._debounce.cancel()
+        loop = asyncio.get_running_loop()
+        # Finals are as stable as the text gets; only interims wait out the debounce.
+        delay = 0.0 if is_final else self.debounce_seconds
+        self._debounce = loop.call_later(delay, self._launch, text)
+
+    def take(self, query: str) -> asyncio.Task[list[str]] | None:
+        """Hand over the prefetch if it matches `query`; resets the turn."""
+        if self._debounce is not None:
+            self._debounce.cancel()
+            self._debounce = None
+        task, prefetched = self._task, self._query
+        self._task = None
+        self._query = ""
+        self._pending_text = ""
+        self._turn_finals.clear()
+
+        if task is None:
+            return None
+        if task.cancelled() or not self._similar(prefetched, query):
+            task.cancel()
+            logger.debug("Discarded RAG prefetch for %r (final query %r)", prefetched, query)
+            return None
+        logger.info(
+            "Reusing RAG prefetch started %.0f ms before the LLM turn",
+            (time.monotonic() - self._started_at) * 1000,
+        )
+        return task
+
+    def cancel(self) -> None:
+        """Drop any pending prefetch and reset the turn (a turn that skips RAG)."""
+        if self._debounce is not None:
+            self._debounce.cancel()
+            self._debounce = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._query = ""
+        self._pending_text = ""
+        self._turn_finals.clear()
+
+    def _launch(self, text: str) -> None:
+        self._debounce = None
+        query = _normalize_rag_query(text)
+        if len(query) < self.min_chars or query == self._query:
+            return
+        if self._task is not None:
+            # An in-flight lookup keeps running in the background and still
+            # fills the result cache; only the handle is dropped.
+            self._task.cancel()
+        self._query = query
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(
+            _lookup_rag_chunks_async(self.store_factory, self.target_ids, text, self.k)
+        )
+
+    def _similar(self, prefetched: str, query: str) -> bool:
+        query = _normalize_rag_query(query)
+        if prefetched == query:
+            return True
+        ratio = difflib.SequenceMatcher(None, prefetched.split(), query.split()).ratio()
+        return ratio >= self.reuse_similarity
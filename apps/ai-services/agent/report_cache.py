@@ -0,0 +1,303 @@
+"""Content-addressed cache for generated interview reports.
+
+Reports are keyed by a hash of the session content plus the analyzer
+version, and indexed by report id. A bounded in-memory LRU tier sits in
+front of a JSON file tier on disk, so repeat fetches never re-run analysis
+and identical sessions are analyzed once. The disk tier is purged by age
+and entry count as reports are written.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from .analysis import ReportGenerator
+from .serialization import dumps, encode_session, loads
+from .session_collector import SessionData
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_REPORT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Purge the disk tier once every this many writes.
+_PURGE_EVERY_WRITES = 64
+
+
+def session_content_hash(session_data: SessionData) -> str:
+    """Stable hash of the session content and the analyzer version."""
+    hasher = hashlib.sha256()
+    hasher.update(ReportGenerator.ANALYZER_VERSION.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(encode_session(session_data, sort_keys=True))
+    return hasher.hexdigest()
+
+
+class ReportCache:
+    """Two-tier (memory LRU + disk) report cache.
+
+    Entries are report dicts as produced by `InterviewReport.to_dict`.
+    Lookups return deep copies, so callers may modify what they get back.
+    """
+
+    def __init__(self, cache_dir: str | None = None, max_memory_entries: int | None = None):
+        self.cache_dir = Path(
+            cache_dir
+            or settings.report_cache_dir
+            or os.path.join(tempfile.gettempdir(), "ai-services-report-cache")
+        )
+        self.max_memory_entries = max(
+            1, max_memory_entries or settings.report_cache_memory_entries
+        )
+        self._reports_dir = self.cache_dir / "reports"
+        self._ids_dir = self.cache_dir / "ids"
+        self._reports_dir.mkdir(parents=True, exist_ok=True)
+        self._ids_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._by_content: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._content_by_id: dict[str, str] = {}
+        self._inflight: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._writes = 0
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_by_content(self, content_hash: str) -> dict[str, Any] | None:
+        """Return the cached report for a content hash, if any."""
+        with self._lock:
+            report = self._by_content.get(content_hash)
+            if report is not None:
+                self._by_content.move_to_end(content_hash)
+        if report is None:
+            report = self._read_disk(content_hash)
+            if report is None:
+                return None
+            self._remember(content_hash, report)
+        return copy.deepcopy(report)
+
+    def get_by_id(self, report_id: str) -> dict[str, Any] | None:
+        """Return the cached report for a report id, if any."""
+        if not _REPORT_ID_RE.match(report_id):
+            return None
+
+        with self._lock:
+            content_hash = self._content_by_id.get(report_id)
+        if content_hash is None:
+            id_path = self._ids_dir / report_id
+            try:
+                content_hash = id_path.read_text(encoding="utf-8").strip()
+            except OSError:
+                return None
+        return self.get_by_content(content_hash)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put(self, content_hash: str, report: dict[str, Any]) -> None:
+        """Store a copy of a report in both tiers."""
+        self._remember(content_hash, copy.deepcopy(report))
+        try:
+            self._write_atomic(
+                self._reports_dir / f"{content_hash}.json",
+                dumps(report),
+            )
+            report_id = str(report.get("id") or "")
+            if _REPORT_ID_RE.match(report_id):
+                self._write_atomic(self._ids_dir / report_id, content_hash.encode("ascii"))
+        except OSError as e:
+            logger.warning("Failed to persist report %s to disk cache: %s", content_hash[:12], e)
+            return
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % _PURGE_EVERY_WRITES == 0
+        if purge:
+            self.purge_disk()
+
+    def purge_disk(
+        self,
+        max_age_hours: float | None = None,
+        max_entries: int | None = None,
+    ) -> int:
+        """Delete disk-tier files past the retention window or over the entry cap.
+
+        Oldest files go first when the cap is exceeded. Returns the number of
+        files removed.
+        """
+        if max_age_hours is None:
+            max_age_hours = settings.report_cache_retention_hours
+        if max_entries is None:
+            max_entries = settings.report_cache_max_disk_entries
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        for directory in (self._reports_dir, self._ids_dir):
+            kept: list[tuple[float, str]] = []
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    mtime = entry.stat().st_mtime
+                    if mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                    elif not entry.name.startswith("."):
+                        kept.append((mtime, entry.path))
+                except OSError:
+                    continue
+            kept.sort()
+            for _, path in kept[: max(0, len(kept) - max_entries)]:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    async def get_or_generate(
+        self,
+        session_data: SessionData,
+        generator: ReportGenerator | None = None,
+    ) -> dict[str, Any]:
+        """Return the cached report for a session, generating it at most once.
+
+        Concurrent calls for identical content share one in-flight generation.
+        """
+        content_hash = await asyncio.to_thread(session_content_hash, session_data)
+        cached = await asyncio.to_thread(self.get_by_content, content_hash)
+        if cached is not None:
+            logger.info("Report cache hit for content %s", content_hash[:12])
+            return cached
+
+        inflight = self._inflight.get(content_hash)
+        if inflight is not None:
+            return copy.deepcopy(await asyncio.shield(inflight))
+
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._inflight[content_hash] = future
+        try:
+            report = await (generator or ReportGenerator()).generate_async(session_data)
+            payload = report.to_dict()
+            payload.setdefault("metadata", {})["contentHash"] = content_hash
+            await asyncio.to_thread(self.put, content_hash, payload)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log noise.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(content_hash, None)
+
+    async def stream_sections(
+        self,
+        session_data: SessionData,
+        generator: ReportGenerator | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Yield report sections progressively, caching the finished report.
+
+        A cached report is replayed section by section without re-analysis.
+        The stream shares in-flight generation with `get_or_generate`: it
+        either waits for a running analysis and replays its result, or
+        registers its own so concurrent callers wait for it.
+        """
+        content_hash = await asyncio.to_thread(session_content_hash, session_data)
+        cached = await asyncio.to_thread(self.get_by_content, content_hash)
+        if cached is None:
+            inflight = self._inflight.get(content_hash)
+            if inflight is not None:
+                cached = copy.deepcopy(await asyncio.shield(inflight))
+        if cached is not None:
+            for section in ReportGenerator.sections_from_report(cached):
+                yield section
+            return
+
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._inflight[content_hash] = future
+        try:
+            generator = generator or ReportGenerator()
+            async for name, section in generator.iter_sections(session_data):
+                if name == "scores":
+                    report = section["report"]
+                    report.setdefault("metadata", {})["contentHash"] = content_hash
+                    await asyncio.to_thread(self.put, content_hash, report)
+                    future.set_result(copy.deepcopy(report))
+                yield name, section
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure does not log noise.
+                future.exception()
+            raise
+        finally:
+            # Closed before the scores section (client went away): waiters
+            # see the same cancellation as with `get_or_generate`.
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(content_hash, None)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _remember(self, content_hash: str, report: dict[str, Any]) -> None:
+        with self._lock:
+            self._by_content[content_hash] = report
+            self._by_content.move_to_end(content_hash)
+            report_id = report.get("id")
+            if isinstance(report_id, str):
+                self._content_by_id[report_id] = content_hash
+            while len(self._by_content) > self.max_memory_entries:
+                _, evicted = self._by_content.popitem(last=False)
+                evicted_id = evicted.get("id")
+                if isinstance(evicted_id, str):
+                    self._content_by_id.pop(evicted_id, None)
+
+    def _read_disk(self, content_hash: str) -> dict[str, Any] | None:
+        path = self._reports_dir / f"{content_hash}.json"
+        try:
+            report = loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable cached report %s: %s", path.name, e)
+            return None
+        return report if isinstance(report, dict) else None
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+_report_cache: ReportCache | None = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """Get or create the report cache singleton."""
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                _report_cache = ReportCache()
+    return _report_cache
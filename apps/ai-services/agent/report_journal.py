@@ -0,0 +1,402 @@
+"""Durable SQLite journal for report generation and delivery jobs.
+
+Tracks every report job through queued -> running -> generated -> delivered
+(or failed) in a WAL-mode SQLite file, so a restarted process can resume
+jobs that were accepted but never delivered. Ownership is a lease: claims
+are atomic UPDATEs, and a lease held by a dead process expires or is
+released on startup, so work is resumed without being duplicated. Every
+state transition renews the lease and the owner renews it while a job runs;
+a transition by a process that lost its lease raises `ReportLeaseLostError`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .serialization import loads
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+GENERATED = "generated"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    session_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    session_data TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_state ON report_jobs (state, lease_expires);
+"""
+
+
+def default_owner() -> str:
+    """Lease owner id for this process (`host:pid`)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class ReportLeaseLostError(Exception):
+    """Another process took over the lease of a report job."""
+
+
+@dataclass
+class JournalJob:
+    """A claimed report job."""
+    session_id: str
+    state: str
+    session_data: dict[str, Any]
+    attempts: int
+
+
+class ReportJournal:
+    """SQLite-backed report job journal.
+
+    All methods are synchronous and short; async callers should run them via
+    `asyncio.to_thread`.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        lease_seconds: float | None = None,
+        max_attempts: int | None = None,
+    ):
+        self.path = (
+            path
+            or settings.report_journal_path
+            or os.path.join(tempfile.gettempdir(), "ai-services-report-journal.sqlite3")
+        )
+        self.lease_seconds = lease_seconds or settings.report_journal_lease_seconds
+        self.max_attempts = max_attempts or settings.report_journal_max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # isolation_level=None: explicit BEGIN IMMEDIATE for atomic claims.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, session_id: str, session_data: bytes, owner: str) -> bool:
+        """Record a job and lease it to `owner`.
+
+        `session_data` is the encoded session (see `serialization.encode_session`).
+
+        Returns:
+            True when the caller owns the job and should run it, False when the
+            job is already leased elsewhere, delivered, or failed permanently.
+        """
+        now = time.time()
+        payload = session_data.decode("utf-8")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, owner, lease_expires FROM report_jobs WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO report_jobs (session_id, state, session_data, owner,"
+                        " lease_expires, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (session_id, QUEUED, payload, owner, now + self.lease_seconds, now, now),
+                    )
+                    self._conn.execute("COMMIT")
+                    return True
+
+                leased_elsewhere = (
+                    row["owner"] not in (None, owner)
+                    and (row["lease_expires"] or 0) > now
+                )
+                if row["state"] in (DELIVERED, FAILED) or leased_elsewhere:
+                    self._conn.execute("COMMIT")
+                    return False
+
+                # Resubmission of a pending job: keep the freshest data.
+                self._conn.execute(
+                    "UPDATE report_jobs SET session_data = ?, owner = ?, lease_expires = ?,"
+                    " updated_at = ? WHERE session_id = ?",
+                    (payload, owner, now + self.lease_seconds, now, session_id),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim_batch(
+        self,
+        owner: str,
+        limit: int,
+        exclude: list[str] | None = None,
+    ) -> list[JournalJob]:
+        """Atomically lease up to `limit` unowned or expired pending jobs.
+
+        Session ids in `exclude` (jobs the caller already runs) are skipped.
+        """
+        if limit <= 0:
+            return []
+        exclude = exclude or []
+        excluded = (
+            f" AND session_id NOT IN ({', '.join('?' * len(exclude))})" if exclude else ""
+        )
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT session_id, state, session_data, attempts FROM report_jobs"
+                    " WHERE state IN (?, ?, ?)"
+                    " AND (lease_expires IS NULL OR lease_expires < ?)"
+                    f"{excluded} ORDER BY created_at LIMIT ?",
+                    (QUEUED, RUNNING, GENERATED, now, *exclude, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE report_jobs SET owner = ?, lease_expires = ?, updated_at = ?"
+                    " WHERE session_id = ?",
+                    [(owner, now + self.lease_seconds, now, row["session_id"]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        jobs: list[JournalJob] = []
+        for row in rows:
+            try:
+                session_data = loads(row["session_data"])
+            except ValueError:
+                logger.warning("Dropping report job with unreadable data: %s", row["session_id"])
+                self.mark_failed(row["session_id"], owner, "unreadable session data", final=True)
+                continue
+            jobs.append(
+                JournalJob(
+                    session_id=row["session_id"],
+                    state=row["state"],
+                    session_data=session_data,
+                    attempts=row["attempts"],
+                )
+            )
+        return jobs
+
+    def mark_running(self, session_id: str, owner: str) -> None:
+        """Generation started; counts as one attempt."""
+        self._transition(
+            session_id,
+            owner,
+            "state = ?, attempts = attempts + 1",
+            (RUNNING,),
+        )
+
+    def mark_generated(self, session_id: str, owner: str) -> None:
+        """Report generated (or fallback built); delivery pending."""
+        self._transition(session_id, owner, "state = ?", (GENERATED,))
+
+    def mark_delivered(self, session_id: str, owner: str) -> None:
+        """Webhook delivered; the job is done and the lease released.
+
+        The session payload is dropped: only the row is kept, so a late
+        resubmission is still recognised as delivered until it is purged.
+        """
+        self._transition(
+            session_id,
+            owner,
+            "state = ?, session_data = '', owner = NULL, lease_expires = NULL,"
+            " last_error = NULL",
+            (DELIVERED,),
+            renew=False,
+        )
+
+    def requeue(self, session_id: str, session_data: bytes, owner: str) -> None:
+        """Queue a follow-up run with newer session data, leased to `owner`.
+
+        Used when a session is resubmitted while its job is running; the
+        attempt count starts over for the new data.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET state = ?, session_data = ?, attempts = 0, owner = ?,"
+                " lease_expires = ?, last_error = NULL, updated_at = ?"
+                " WHERE session_id = ? AND (owner = ? OR owner IS NULL)",
+                (
+                    QUEUED,
+                    session_data.decode("utf-8"),
+                    owner,
+                    now + self.lease_seconds,
+                    now,
+                    session_id,
+                    owner,
+                ),
+            )
+
+    def mark_failed(self, session_id: str, owner: str, error: str, final: bool = False) -> None:
+        """Release the lease after a failed attempt.
+
+        The job returns to the pending pool unless `final` is set or it has
+        used up `max_attempts`, in which case it is parked as failed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET"
+                " state = CASE WHEN ? OR attempts >= ? THEN ? ELSE state END,"
+                " owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?"
+                " WHERE session_id = ? AND (owner = ? OR owner IS NULL)",
+                (final, self.max_attempts, FAILED, error[:500], now, session_id, owner),
+            )
+
+    def release(self, owner: str, session_ids: list[str]) -> None:
+        """Give `owner`'s leases on `session_ids` back without counting a failure."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE report_jobs SET owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE session_id = ? AND owner = ?",
+                [(time.time(), session_id, owner) for session_id in session_ids],
+            )
+
+    def renew_leases(self, owner: str, session_ids: list[str]) -> set[str]:
+        """Extend `owner`'s leases on `session_ids`.
+
+        Returns:
+            The session ids whose job `owner` no longer holds.
+        """
+        if not session_ids:
+            return set()
+        now = time.time()
+        placeholders = ", ".join("?" * len(session_ids))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE report_jobs SET lease_expires = ? WHERE session_id = ? AND owner = ?",
+                [(now + self.lease_seconds, session_id, owner) for session_id in session_ids],
+            )
+            rows = self._conn.execute(
+                f"SELECT session_id FROM report_jobs WHERE session_id IN ({placeholders})"
+                " AND owner IS NOT ?",
+                (*session_ids, owner),
+            ).fetchall()
+        return {row["session_id"] for row in rows}
+
+    def release_dead_owners(self) -> int:
+        """Release leases held by dead processes on this host.
+
+        Lets a restarted process resume its predecessor's jobs immediately
+        instead of waiting for the lease to expire.
+        """
+        host = socket.gethostname()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT owner FROM report_jobs WHERE owner LIKE ?",
+                (f"{host}:%",),
+            ).fetchall()
+            dead = []
+            for row in rows:
+                try:
+                    pid = int(str(row["owner"]).rsplit(":", 1)[1])
+                except (IndexError, ValueError):
+                    continue
+                if pid != os.getpid() and not _pid_alive(pid):
+                    dead.append(row["owner"])
+            released = 0
+            for owner in dead:
+                cursor = self._conn.execute(
+                    "UPDATE report_jobs SET owner = NULL, lease_expires = NULL"
+                    " WHERE owner = ? AND state NOT IN (?, ?)",
+                    (owner, DELIVERED, FAILED),
+                )
+                released += cursor.rowcount
+        if released:
+            logger.info("Released %d report job lease(s) from dead processes", released)
+        return released
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """Delete delivered and permanently failed jobs older than the retention window."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM report_jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (DELIVERED, FAILED, time.time() - older_than_seconds),
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        """Number of jobs per state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) AS n FROM report_jobs GROUP BY state"
+            ).fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def _transition(
+        self,
+        session_id: str,
+        owner: str,
+        assignments: str,
+        params: tuple[Any, ...],
+        renew: bool = True,
+    ) -> None:
+        now = time.time()
+        if renew:
+            assignments += ", lease_expires = ?"
+            params = (*params, now + self.lease_seconds)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE report_jobs SET {assignments}, updated_at = ?"
+                " WHERE session_id = ? AND owner = ?",
+                (*params, now, session_id, owner),
+            )
+            if cursor.rowcount:
+                return
+            row = self._conn.execute(
+                "SELECT owner FROM report_jobs WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        # No row at all means the job was never journaled; nothing to guard.
+        if row is not None:
+            raise ReportLeaseLostError(
+                f"report job {session_id} is leased to {row['owner']}, not {owner}"
+            )
+
+
+_report_journal: ReportJournal | None = None
+_report_journal_lock = threading.Lock()
+
+
+def get_report_journal() -> ReportJournal:
+    """Get or create the report journal singleton."""
+    global _report_journal
+    if _report_journal is None:
+        with _report_journal_lock:
+            if _report_journal is None:
+                _report_journal = ReportJournal()
+    return _report_journal
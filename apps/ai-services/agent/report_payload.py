@@ -0,0 +1,201 @@
+"""Compact wire format and content encoding for report payloads.
+
+Long machine-coding rounds repeat near-identical 20k-char code snapshots in
+every `codeHistory` entry. The compact format moves snapshots into a
+`codeSnapshots` side table keyed by content hash (identical snapshots are
+stored once) and, optionally, stores a snapshot as line ops against the
+previous one, with a full keyframe every few snapshots to bound rebuilds.
+
+    codeSnapshots[ref] = {"code": "..."}                        # keyframe
+    codeSnapshots[ref] = {"base": ref, "ops": [[0, 12], "x\\n"]}  # line diff
+
+An op `[start, end]` copies base lines `start:end`; a string op inserts
+text. `expand_report` restores the regular payload.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+from typing import Any
+
+from .code_history import apply_line_ops, diff_lines
+from .serialization import dumps
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPACT_FORMAT = "compact-v1"
+
+# Detail keys the session collector treats as full code snapshots.
+SNAPSHOT_DETAIL_KEYS = ("codeSnapshot", "code", "snapshotCode", "fullCode")
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+
+def snapshot_ref(code: str) -> str:
+    """Short content hash used as a snapshot reference."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+
+
+def compact_report(
+    report: dict[str, Any],
+    diffs: bool = True,
+    keyframe_interval: int = 16,
+) -> dict[str, Any]:
+    """Return a copy of `report` with code snapshots deduplicated (and diffed)."""
+    history = report.get("codeHistory")
+    if not isinstance(history, list) or report.get("payloadFormat") == COMPACT_FORMAT:
+        return report
+
+    snapshots: dict[str, dict[str, Any]] = {}
+    compact_history: list[dict[str, Any]] = []
+    previous_code: str | None = None
+    previous_ref: str | None = None
+    chain_length = 0
+
+    for entry in history:
+        if not isinstance(entry, dict):
+            compact_history.append(entry)
+            continue
+        entry = dict(entry)
+        details = dict(entry.get("details") or {})
+        code = entry.pop("code", "")
+        if not isinstance(code, str):
+            code = ""
+        if not code:
+            for key in SNAPSHOT_DETAIL_KEYS:
+                if isinstance(details.get(key), str) and details[key]:
+                    code = details[key]
+                    break
+
+        if code:
+            ref = snapshot_ref(code)
+            # Drop detail copies of the snapshot; remember which keys held it.
+            ref_keys = [key for key in SNAPSHOT_DETAIL_KEYS if details.get(key) == code]
+            for key in ref_keys:
+                del details[key]
+            entry["codeRef"] = ref
+            if ref_keys:
+                entry["codeRefKeys"] = ref_keys
+
+            if ref not in snapshots:
+                record: dict[str, Any] = {"code": code}
+                if (
+                    diffs
+                    and previous_code is not None
+                    and previous_ref is not None
+                    and chain_length < keyframe_interval
+                ):
+                    ops = diff_lines(previous_code, code)
+                    encoded_ops = json.dumps(ops, ensure_ascii=False)
+                    if len(encoded_ops) < len(code):
+                        record = {"base": previous_ref, "ops": ops}
+                snapshots[ref] = record
+                chain_length = chain_length + 1 if "base" in record else 0
+            previous_code, previous_ref = code, ref
+        else:
+            entry["code"] = ""
+
+        entry["details"] = details
+        compact_history.append(entry)
+
+    compact = dict(report)
+    compact["codeHistory"] = compact_history
+    compact["codeSnapshots"] = snapshots
+    compact["payloadFormat"] = COMPACT_FORMAT
+    return compact
+
+
+def expand_report(report: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of `compact_report`; other payloads are returned unchanged."""
+    if report.get("payloadFormat") != COMPACT_FORMAT:
+        return report
+
+    snapshots: dict[str, dict[str, Any]] = report.get("codeSnapshots") or {}
+    resolved: dict[str, str] = {}
+
+    def resolve(ref: str) -> str:
+        # Walk back to the nearest keyframe, then replay diffs forward.
+        chain: list[str] = []
+        current = ref
+        while current not in resolved and "code" not in snapshots[current]:
+            chain.append(current)
+            current = snapshots[current]["base"]
+        if current not in resolved:
+            resolved[current] = snapshots[current]["code"]
+        for pending in reversed(chain):
+            record = snapshots[pending]
+            resolved[pending] = apply_line_ops(resolved[record["base"]], record["ops"])
+        return resolved[ref]
+
+    history: list[Any] = []
+    for entry in report.get("codeHistory") or []:
+        if isinstance(entry, dict) and entry.get("codeRef"):
+            entry = dict(entry)
+            code = resolve(entry.pop("codeRef"))
+            details = dict(entry.get("details") or {})
+            for key in entry.pop("codeRefKeys", []):
+                details[key] = code
+            entry["details"] = details
+            entry["code"] = code
+        history.append(entry)
+
+    expanded = {
+        key: value
+        for key, value in report.items()
+        if key not in ("codeSnapshots", "payloadFormat")
+    }
+    expanded["codeHistory"] = history
+    return expanded
+
+
+def zstd_available() -> bool:
+    """Whether the optional `zstandard` package is installed."""
+    return zstandard is not None
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str:
+    """Pick the best supported content encoding from an Accept-Encoding header."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    if ZSTD in accepted and zstd_available():
+        return ZSTD
+    if GZIP in accepted or "*" in accepted:
+        return GZIP
+    return IDENTITY
+
+
+def encode_body(data: bytes, encoding: str, min_bytes: int = 0) -> tuple[bytes, str]:
+    """Compress `data` with `encoding`.
+
+    Returns:
+        The body and the encoding actually applied: `identity` when the body
+        is below `min_bytes`, `gzip` when zstd is requested but not installed.
+    """
+    if encoding == IDENTITY or len(data) < min_bytes:
+        return data, IDENTITY
+    if encoding == ZSTD:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compress(data), ZSTD
+        logger.warning("zstd encoding requested but zstandard is not installed; using gzip")
+        encoding = GZIP
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=6), GZIP
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Compact JSON encoding used for report bodies."""
+    return dumps(payload)
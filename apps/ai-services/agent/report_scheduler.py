@@ -0,0 +1,416 @@
+"""Bounded report job scheduler for the AI service.
+
+Runs report generation + webhook delivery on a fixed-size worker pool fed by
+a bounded queue, deduplicated by session id, so bursts of interview endings
+apply backpressure instead of spawning unbounded background work. A session
+resubmitted while its job is running gets one follow-up run with the newest
+data once the current run finishes.
+
+With a `ReportJournal` attached, every accepted job is also recorded on disk
+and leased to this process; pending jobs left behind by a restart are
+claimed back in batches as queue capacity frees up, and finished jobs are
+purged once they are older than `report_journal_retention_seconds`. Leases
+on queued and running jobs are renewed every third of the lease time; a job
+whose lease was taken over by another process is abandoned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .report_journal import ReportJournal, ReportLeaseLostError, default_owner
+from .serialization import encode_session
+from .session_collector import SessionData
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+ReportJobHandler = Callable[[str, SessionData], Awaitable[None]]
+
+
+class ReportQueueFullError(Exception):
+    """Raised when the report queue cannot accept more jobs."""
+
+    def __init__(self, retry_after_seconds: int):
+        super().__init__("Report queue is full")
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass
+class ReportJob:
+    """A queued report generation request."""
+    session_id: str
+    session_data: SessionData
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    # Newest data submitted while this job was running; run again after it.
+    follow_up: SessionData | None = None
+    # Another process took over the journal lease; do not run or deliver.
+    lease_lost: bool = False
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ReportScheduler:
+    """Fixed worker pool over a bounded, session-deduplicated job queue."""
+
+    def __init__(
+        self,
+        handler: ReportJobHandler,
+        workers: int | None = None,
+        max_queue_size: int | None = None,
+        journal: ReportJournal | None = None,
+    ):
+        self.handler = handler
+        self.journal = journal
+        self.owner = default_owner()
+        self.workers = max(1, workers or settings.report_queue_workers)
+        self.max_queue_size = max(1, max_queue_size or settings.report_queue_max_size)
+        self._queue: asyncio.Queue[ReportJob] | None = None
+        self._jobs: dict[str, ReportJob] = {}
+        self._worker_tasks: list[asyncio.Task[None]] = []
+        self._resume_task: asyncio.Task[None] | None = None
+        self._last_purge: float | None = None
+        self._last_renew: float | None = None
+        self._accepting = True
+        self._completed = 0
+        self._resumed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._deduplicated = 0
+        self._wait_ms: deque[float] = deque(maxlen=256)
+        self._run_ms: deque[float] = deque(maxlen=256)
+
+    def start(self) -> None:
+        """Start workers (and journal resume) on the running event loop."""
+        self._ensure_started()
+
+    def _ensure_started(self) -> asyncio.Queue[ReportJob]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker_tasks = [
+                asyncio.create_task(self._worker(index), name=f"report-worker-{index}")
+                for index in range(self.workers)
+            ]
+            if self.journal is not None:
+                self._resume_task = asyncio.create_task(
+                    self._resume_loop(), name="report-journal-resume"
+                )
+            logger.info(
+                "Report scheduler started (workers=%d, max_queue=%d)",
+                self.workers,
+                self.max_queue_size,
+            )
+        return self._queue
+
+    async def submit(self, session_id: str, session_data: SessionData) -> bool:
+        """Queue a report job.
+
+        Returns:
+            True when a new job was queued, False when it was merged into an
+            existing job for the same session: a queued job takes the new
+            data, a running job gets a follow-up run with it.
+
+        Raises:
+            ReportQueueFullError: when the queue is full or draining.
+        """
+        if not self._accepting:
+            raise ReportQueueFullError(settings.report_queue_retry_after_seconds)
+
+        queue = self._ensure_started()
+        existing = self._jobs.get(session_id)
+        if existing is not None:
+            if existing.started_at is None:
+                # Not picked up yet: generate from the freshest data.
+                existing.session_data = session_data
+                logger.info("Deduplicated report job for session_id=%s", session_id)
+            else:
+                existing.follow_up = session_data
+                logger.info("Queued follow-up report run for session_id=%s", session_id)
+            self._deduplicated += 1
+            return False
+
+        if queue.full():
+            self._rejected += 1
+            raise ReportQueueFullError(settings.report_queue_retry_after_seconds)
+
+        if self.journal is not None:
+            owns = await asyncio.to_thread(
+                self.journal.enqueue, session_id, encode_session(session_data), self.owner
+            )
+            if not owns:
+                self._deduplicated += 1
+                logger.info("Report job for session_id=%s is already journaled", session_id)
+                return False
+            if session_id in self._jobs:
+                # Another submit for this session won the race while journaling.
+                self._deduplicated += 1
+                return False
+
+        job = ReportJob(session_id=session_id, session_data=session_data)
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            if self.journal is not None:
+                # Give the lease back so the resume loop can pick it up later.
+                await asyncio.to_thread(
+                    self.journal.mark_failed, session_id, self.owner, "queue full"
+                )
+            raise ReportQueueFullError(settings.report_queue_retry_after_seconds) from None
+        self._jobs[session_id] = job
+        return True
+
+    async def mark_generated(self, session_id: str) -> None:
+        """Record that a job's report exists and only delivery is pending."""
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.mark_generated, session_id, self.owner)
+
+    async def _worker(self, index: int) -> None:
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            job.started_at = time.monotonic()
+            self._wait_ms.append((job.started_at - job.enqueued_at) * 1000)
+            try:
+                if self.journal is not None:
+                    if job.lease_lost:
+                        raise ReportLeaseLostError(f"lease on {job.session_id} was taken over")
+                    await asyncio.to_thread(self.journal.mark_running, job.session_id, self.owner)
+                await self.handler(job.session_id, job.session_data)
+                if self.journal is not None:
+                    await asyncio.to_thread(
+                        self.journal.mark_delivered, job.session_id, self.owner
+                    )
+                self._completed += 1
+            except ReportLeaseLostError as e:
+                # The new lease holder runs (or already ran) the job.
+                logger.warning("Abandoning report job session_id=%s: %s", job.session_id, e)
+            except Exception as e:
+                self._failed += 1
+                logger.error(
+                    "Report worker %d failed for session_id=%s: %s",
+                    index,
+                    job.session_id,
+                    e,
+                )
+                if self.journal is not None:
+                    try:
+                        await asyncio.to_thread(
+                            self.journal.mark_failed, job.session_id, self.owner, str(e)
+                        )
+                    except Exception as journal_err:
+                        logger.warning("Failed to journal report failure: %s", journal_err)
+            finally:
+                self._run_ms.append((time.monotonic() - job.started_at) * 1000)
+                try:
+                    if job.follow_up is None:
+                        self._jobs.pop(job.session_id, None)
+                    else:
+                        await self._queue_follow_up(job)
+                finally:
+                    # After the follow-up is queued, so `drain` waits for it.
+                    self._queue.task_done()
+
+    async def _queue_follow_up(self, job: ReportJob) -> None:
+        """Run a finished job again with the data submitted while it ran."""
+        assert self._queue is not None and job.follow_up is not None
+        follow_up = ReportJob(session_id=job.session_id, session_data=job.follow_up)
+        # Registered before any await: further submits update this job.
+        self._jobs[job.session_id] = follow_up
+        try:
+            if self.journal is not None:
+                await asyncio.to_thread(
+                    self.journal.requeue,
+                    job.session_id,
+                    encode_session(follow_up.session_data),
+                    self.owner,
+                )
+            self._queue.put_nowait(follow_up)
+        except asyncio.QueueFull:
+            self._jobs.pop(job.session_id, None)
+            self._rejected += 1
+            logger.warning("Report queue full; deferring follow-up for %s", job.session_id)
+            if self.journal is not None:
+                # Give the lease back so the resume loop can pick it up later.
+                await asyncio.to_thread(
+                    self.journal.mark_failed, job.session_id, self.owner, "queue full"
+                )
+        except Exception as e:
+            self._jobs.pop(job.session_id, None)
+            logger.error("Failed to queue follow-up report for %s: %s", job.session_id, e)
+
+    async def _resume_loop(self) -> None:
+        """Claim journaled jobs nobody owns into free queue slots."""
+        assert self._queue is not None and self.journal is not None
+        try:
+            await asyncio.to_thread(self.journal.release_dead_owners)
+        except Exception as e:
+            logger.warning("Failed to release stale report job leases: %s", e)
+
+        while self._accepting:
+            try:
+                await self._renew_leases()
+                await self._purge_journal()
+                more = await self._resume_batch()
+            except Exception as e:
+                # One bad iteration must not end resumption for the process.
+                logger.warning("Report journal resume failed: %s", e)
+                more = False
+            if not more:
+                await asyncio.sleep(settings.report_journal_poll_seconds)
+
+    async def _resume_batch(self) -> bool:
+        """Claim one batch into free queue slots; True when more may be waiting."""
+        assert self._queue is not None and self.journal is not None
+        batch_size = min(
+            self.max_queue_size - self._queue.qsize(), settings.report_journal_claim_batch
+        )
+        if batch_size <= 0:
+            return False
+        # Jobs already in memory hold their lease (same owner); don't claim them twice.
+        claimed = await asyncio.to_thread(
+            self.journal.claim_batch, self.owner, batch_size, list(self._jobs)
+        )
+
+        for position, journal_job in enumerate(claimed):
+            if journal_job.session_id in self._jobs:
+                # Submitted while claiming; that job runs under the same lease.
+                continue
+            try:
+                session_data = SessionData.from_dict(journal_job.session_data)
+            except Exception as e:
+                await asyncio.to_thread(
+                    self.journal.mark_failed,
+                    journal_job.session_id,
+                    self.owner,
+                    f"invalid session data: {e}",
+                    True,
+                )
+                continue
+            job = ReportJob(session_id=journal_job.session_id, session_data=session_data)
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                # Submits filled the slots while claiming; hand the rest back.
+                unqueued = [
+                    pending.session_id
+                    for pending in claimed[position:]
+                    if pending.session_id not in self._jobs
+                ]
+                await asyncio.to_thread(self.journal.release, self.owner, unqueued)
+                return False
+            self._jobs[job.session_id] = job
+            self._resumed += 1
+            logger.info(
+                "Resumed journaled report job session_id=%s (state=%s, attempts=%d)",
+                job.session_id,
+                journal_job.state,
+                journal_job.attempts,
+            )
+        return len(claimed) == batch_size
+
+    async def _renew_leases(self) -> None:
+        """Heartbeat: extend the leases of this process's jobs, at most every third of a lease."""
+        assert self.journal is not None
+        now = time.monotonic()
+        if (
+            self._last_renew is not None
+            and now - self._last_renew < self.journal.lease_seconds / 3
+        ):
+            return
+        self._last_renew = now
+        jobs = dict(self._jobs)
+        if not jobs:
+            return
+        try:
+            lost = await asyncio.to_thread(self.journal.renew_leases, self.owner, list(jobs))
+        except Exception as e:
+            logger.warning("Report journal lease renewal failed: %s", e)
+            return
+        for session_id in lost:
+            jobs[session_id].lease_lost = True
+            logger.warning("Report job lease for session_id=%s was taken over", session_id)
+
+    async def _purge_journal(self) -> None:
+        """Drop finished journal rows, at most once per purge interval."""
+        assert self.journal is not None
+        now = time.monotonic()
+        if (
+            self._last_purge is not None
+            and now - self._last_purge < settings.report_journal_purge_interval_seconds
+        ):
+            return
+        self._last_purge = now
+        try:
+            purged = await asyncio.to_thread(
+                self.journal.purge_finished, settings.report_journal_retention_seconds
+            )
+        except Exception as e:
+            logger.warning("Report journal purge failed: %s", e)
+            return
+        if purged:
+            logger.info("Purged %d finished report job(s) from the journal", purged)
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, throughput counters and latency percentiles."""
+        wait_ms = list(self._wait_ms)
+        run_ms = list(self._run_ms)
+        running = sum(1 for job in self._jobs.values() if job.started_at is not None)
+        return {
+            "workers": self.workers,
+            "maxQueueSize": self.max_queue_size,
+            "queueDepth": self._queue.qsize() if self._queue is not None else 0,
+            "running": running,
+            "accepting": self._accepting,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "deduplicated": self._deduplicated,
+            "resumed": self._resumed,
+            "queueWaitMs": {
+                "p50": round(_percentile(wait_ms, 0.5), 1),
+                "p95": round(_percentile(wait_ms, 0.95), 1),
+            },
+            "runMs": {
+                "p50": round(_percentile(run_ms, 0.5), 1),
+                "p95": round(_percentile(run_ms, 0.95), 1),
+            },
+        }
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Stop accepting jobs, finish queued work, then stop the workers."""
+        self._accepting = False
+        if self._queue is None:
+            return
+
+        timeout = settings.report_queue_drain_timeout_seconds if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except TimeoutError:
+            logger.warning(
+                "Report queue drain timed out after %.0fs with %d job(s) outstanding",
+                timeout,
+                len(self._jobs),
+            )
+
+        tasks = list(self._worker_tasks)
+        if self._resume_task is not None:
+            tasks.append(self._resume_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._resume_task = None
@@ -12,7 +12,7 @@ from typing import Annotated
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile, status
 
 from ..rag.document_processor import DocumentProcessor
-from ..rag.vector_store import get_vector_store
+from ..rag.vector_store import get_vector_store_async
 from ..rag.schemas import (
     DocumentType,
     DocumentUploadRequest,
@@ -83,7 +83,7 @@ async def upload_template_document(
             )
         
         # Store in vector database
-        vector_store = get_vector_store()
+        vector_store = await get_vector_store_async()
         await vector_store.add_template_documents(template_id, result.chunks)
         
         logger.info(
@@ -159,7 +159,7 @@ async def upload_user_document(
         )
     
     # Store with session_id as template_id for filtering
-    vector_store = get_vector_store()
+    vector_store = await get_vector_store_async()
     await vector_store.add_template_documents(session_id, result.chunks)
     
     return DocumentUploadResponse(
@@ -181,7 +181,7 @@ async def delete_template_documents(template_id: str) -> dict:
     Returns:
         Confirmation message
     """
-    vector_store = get_vector_store()
+    vector_store = await get_vector_store_async()
     await vector_store.delete_template_documents(template_id)
     
     return {"message": f"Documents deleted for template {template_id}"}
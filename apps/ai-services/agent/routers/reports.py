@@ -11,11 +11,19 @@ import os
 from datetime import datetime, timezone
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from ..report_cache import get_report_cache
+from ..report_journal import get_report_journal
+from ..report_payload import compact_report, dumps_json, encode_body, negotiate_encoding
+from ..report_scheduler import ReportQueueFullError, ReportScheduler
+from ..serialization import dumps, loads
+from ..session_cache import get_session_cache
 from ..session_collector import SessionData, SessionMetadata
-from ..analysis import ReportGenerator
+from ..settings import settings
+from ..webhook_client import close_webhook_client, get_webhook_client
 
 logger = logging.getLogger(__name__)
 
@@ -42,36 +50,53 @@ class ReportResponse(BaseModel):
     transcript: list[dict[str, Any]]
     fillerWordsAnalysis: list[dict[str, int]]
     pacingAnalysis: list[dict[str, Any]]
-    behavioralAnalysis: dict[str, str]
+    behavioralAnalysis: dict[str, Any]
     swot: dict[str, list[str]]
     resources: list[dict[str, str]]
 
 
-# In-memory session storage (for demo - use Redis/DB in production)
-_session_cache: dict[str, SessionData] = {}
-
 REPORT_GENERATION_TIMEOUT_SECONDS = int(
     os.getenv("REPORT_GENERATION_TIMEOUT_SECONDS", "180")
 )
-REPORT_WEBHOOK_MAX_ATTEMPTS = int(os.getenv("REPORT_WEBHOOK_MAX_ATTEMPTS", "3"))
-REPORT_WEBHOOK_RETRY_BASE_DELAY_SECONDS = float(
-    os.getenv("REPORT_WEBHOOK_RETRY_BASE_DELAY_SECONDS", "1.0")
-)
-REPORT_WEBHOOK_URL = os.getenv(
-    "REPORT_WEBHOOK_URL", "http://api:8000/api/reports/webhook"
-)
 
+# Fixed times for the development mock session: identical mock sessions hash
+# the same, so the report cache serves them instead of storing a new entry
+# on every request.
+_MOCK_SESSION_STARTED_AT = datetime(2024, 1, 1, 9, 0, 0)
+_MOCK_SESSION_ENDED_AT = datetime(2024, 1, 1, 9, 2, 0)
+
+
+_report_scheduler: ReportScheduler | None = None
+
+
+def get_report_scheduler() -> ReportScheduler:
+    """Get or create the report job scheduler."""
+    global _report_scheduler
+    if _report_scheduler is None:
+        _report_scheduler = ReportScheduler(run_and_push_webhook, journal=get_report_journal())
+    return _report_scheduler
 
-def store_session(session_data: SessionData, session_id: str | None = None) -> None:
+
+async def start_report_scheduler() -> None:
+    """Start report workers and resume journaled jobs on application startup."""
+    get_report_scheduler().start()
+
+
+async def shutdown_report_scheduler() -> None:
+    """Drain queued report jobs on application shutdown."""
+    if _report_scheduler is not None:
+        await _report_scheduler.drain()
+    await close_webhook_client()
+
+
+async def store_session(session_data: SessionData, session_id: str | None = None) -> None:
     """Store session data for later report generation."""
-    _session_cache[session_data.metadata.room_name] = session_data
-    if session_id:
-        _session_cache[session_id] = session_data
+    await get_session_cache().put_async(session_data, session_id, session_data.metadata.room_name)
 
 
-def get_session(session_id: str) -> SessionData | None:
+async def get_session(session_id: str) -> SessionData | None:
     """Retrieve stored session data."""
-    return _session_cache.get(session_id)
+    return await get_session_cache().get_async(session_id)
 
 
 class ProcessSessionRequest(BaseModel):
@@ -158,37 +183,76 @@ def _build_fallback_payload(
     }
 
 
-@router.post("/process")
-async def process_session_endpoint(request: ProcessSessionRequest) -> dict[str, Any]:
-    """Process a completed session and push the webhook in background."""
-    logger.info(f"Received session data for fast background processing: {request.session_id}")
+@router.post(
+    "/process",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": ProcessSessionRequest.model_json_schema()}
+            },
+        }
+    },
+)
+async def process_session_endpoint(http_request: Request) -> dict[str, Any]:
+    """Process a completed session and push the webhook in background.
+
+    Jobs go through the bounded report scheduler; a full queue answers 429
+    with Retry-After, and repeated submissions for a session are merged.
+    The body (a `ProcessSessionRequest`) is decoded straight from bytes.
+    """
     try:
-        if not request.session_id:
+        body = loads(await http_request.body())
+        session_id = body.get("session_id") if isinstance(body, dict) else None
+        logger.info(f"Received session data for fast background processing: {session_id}")
+        if not session_id or not isinstance(session_id, str):
             raise HTTPException(status_code=400, detail="session_id is required")
-        session_data = SessionData.from_dict(request.session_data)
-        store_session(session_data, request.session_id)
-        asyncio.create_task(run_and_push_webhook(request.session_id, session_data))
-        return {"status": "accepted"}
+        if not isinstance(body.get("session_data"), dict):
+            raise HTTPException(status_code=400, detail="session_data must be an object")
+        session_data = SessionData.from_dict(body["session_data"])
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing session data: {e}")
-        raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    await store_session(session_data, session_id)
+    try:
+        queued = await get_report_scheduler().submit(session_id, session_data)
+    except ReportQueueFullError as e:
+        logger.warning("Report queue full; rejecting session_id=%s", session_id)
+        raise HTTPException(
+            status_code=429,
+            detail="Report queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after_seconds)},
+        ) from e
+    return {"status": "accepted", "deduplicated": not queued}
+
+
+@router.get("/queue")
+async def get_report_queue_stats() -> dict[str, Any]:
+    """Report job queue depth, webhook delivery and latency metrics."""
+    stats = get_report_scheduler().stats()
+    stats["webhook"] = get_webhook_client().stats()
+    stats["sessionCache"] = get_session_cache().stats()
+    return stats
 
 
 async def run_and_push_webhook(session_id: str, session_data: SessionData) -> None:
-    """Generates the report from LLM and sends webhook."""
-    import aiohttp
+    """Generates the report from LLM and sends webhook.
 
+    Raises WebhookDeliveryError when every delivery attempt fails.
+    """
     payload: dict[str, Any]
 
     try:
-        generator = ReportGenerator()
         report = await asyncio.wait_for(
-            asyncio.to_thread(generator.generate, session_data),
+            get_report_cache().get_or_generate(session_data),
             timeout=REPORT_GENERATION_TIMEOUT_SECONDS,
         )
-        payload = report.to_dict()
+        payload = dict(report)
         payload["session_id"] = session_id
-    except asyncio.TimeoutError:
+    except TimeoutError:
         logger.error(
             "Report generation timed out after %ss for session_id=%s",
             REPORT_GENERATION_TIMEOUT_SECONDS,
@@ -199,66 +263,83 @@ async def run_and_push_webhook(session_id: str, session_data: SessionData) -> No
         logger.error(f"Failed to generate report for session_id={session_id}: {e}")
         payload = _build_fallback_payload(session_id, session_data, "generation_error")
 
-    timeout = aiohttp.ClientTimeout(total=15)
+    await get_report_scheduler().mark_generated(session_id)
 
-    for attempt in range(1, REPORT_WEBHOOK_MAX_ATTEMPTS + 1):
-        try:
-            async with aiohttp.ClientSession(timeout=timeout) as http_session:
-                async with http_session.post(REPORT_WEBHOOK_URL, json=payload) as response:
-                    if response.status >= 400:
-                        body = await response.text()
-                        raise RuntimeError(f"{response.status} - {body}")
-
-                    logger.info(
-                        "Webhook pushed successfully from background task: status=%s, session_id=%s",
-                        response.status,
-                        session_id,
-                    )
-                    return
-        except Exception as e:
-            if attempt >= REPORT_WEBHOOK_MAX_ATTEMPTS:
-                logger.error(
-                    "Failed to push report webhook after %s attempts for session_id=%s: %s",
-                    REPORT_WEBHOOK_MAX_ATTEMPTS,
-                    session_id,
-                    e,
-                )
-                return
-
-            backoff = REPORT_WEBHOOK_RETRY_BASE_DELAY_SECONDS * attempt
-            logger.warning(
-                "Webhook push attempt %s/%s failed for session_id=%s; retrying in %.1fs: %s",
-                attempt,
-                REPORT_WEBHOOK_MAX_ATTEMPTS,
-                session_id,
-                backoff,
-                e,
+    status = await get_webhook_client().deliver(payload)
+    logger.info(
+        "Webhook pushed successfully from background task: status=%s, session_id=%s",
+        status,
+        session_id,
+    )
+
+
+async def _report_response(
+    report: dict[str, Any],
+    http_request: Request,
+    compact: bool,
+    validate: bool = False,
+) -> Any:
+    """Serialize a report to bytes, compacting and compressing it when asked to.
+
+    With `validate`, plain requests get the dict back so FastAPI validates it
+    against the endpoint's response model.
+    """
+    encoding = negotiate_encoding(http_request.headers.get("accept-encoding"))
+    if validate and not compact and encoding == "identity":
+        return report
+
+    def encode() -> tuple[bytes, str]:
+        payload = (
+            compact_report(
+                report,
+                settings.report_payload_diffs,
+                settings.report_payload_keyframe_interval,
             )
-            await asyncio.sleep(backoff)
+            if compact
+            else report
+        )
+        return encode_body(
+            dumps_json(payload), encoding, settings.report_payload_compression_min_bytes
+        )
+
+    body, applied = await asyncio.to_thread(encode)
+    headers = {"Vary": "Accept-Encoding"}
+    if applied != "identity":
+        headers["Content-Encoding"] = applied
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/generate", response_model=ReportResponse)
-async def generate_report(request: GenerateReportRequest) -> dict[str, Any]:
+async def generate_report(
+    request: GenerateReportRequest,
+    http_request: Request,
+    compact: bool = False,
+) -> Any:
     """Generate an interview performance report.
     
     This endpoint is called by the NestJS backend after an interview ends.
     It uses the analysis modules to process the session data.
+    With `?compact=true` code snapshots are deduplicated into `codeSnapshots`.
     """
+    report = await _generate_session_report(request)
+    return await _report_response(report, http_request, compact, validate=True)
+
+
+async def _generate_session_report(request: GenerateReportRequest) -> dict[str, Any]:
     logger.info(f"Generating report for session: {request.session_id}")
     
     # Try to find session data
-    session_data = get_session(request.session_id)
+    session_data = await get_session(request.session_id)
     
     if not session_data:
         # Create mock session data for development
-        from datetime import datetime
         session_data = SessionData(
             metadata=SessionMetadata(
                 room_name=request.session_id,
                 template_id=request.template_id,
                 template_title="Interview Session",
                 mode="strict",
-                started_at=datetime.now(),
+                started_at=_MOCK_SESSION_STARTED_AT,
             )
         )
         # Add some mock transcript
@@ -269,53 +350,77 @@ async def generate_report(request: GenerateReportRequest) -> dict[str, Any]:
             TranscriptEntry(SpeakerRole.INTERVIEWER, "What are your strengths?", 60.0),
             TranscriptEntry(SpeakerRole.CANDIDATE, "I am good at problem solving and teamwork.", 90.0),
         ]
-        session_data.metadata.ended_at = datetime.now()
-    
-    # Generate report
-    generator = ReportGenerator()
-    report = generator.generate(session_data)
+        session_data.metadata.ended_at = _MOCK_SESSION_ENDED_AT
     
-    return report.to_dict()
+    # Generate report (cached by session content)
+    report = await get_report_cache().get_or_generate(session_data)
+    return dict(report)
 
 
 @router.get("/latest")
-async def get_latest_report() -> dict[str, Any]:
+async def get_latest_report(http_request: Request, compact: bool = False) -> Any:
     """Get the most recently generated report or generate a mock from the latest session.
     
     This is called by the Next.js frontend to display the final interview summary.
     """
     logger.info("Fetching latest report")
-    if not _session_cache:
+    # Get the most recently stored session
+    latest_session = get_session_cache().latest()
+    if latest_session is None:
         # Fallback to mock report if no live sessions exist yet
         request = GenerateReportRequest(session_id="latest_mock")
         # Reuse the mock generation block from generate_report
-        return await generate_report(request)
-        
-    # Get the most recently stored session
-    latest_session_id = list(_session_cache.keys())[-1]
-    latest_session = _session_cache[latest_session_id]
-    
-    generator = ReportGenerator()
-    report = generator.generate(latest_session)
-    return report.to_dict()
+        report = await _generate_session_report(request)
+        return await _report_response(report, http_request, compact)
+
+    report = await get_report_cache().get_or_generate(latest_session)
+    return await _report_response(dict(report), http_request, compact)
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> bytes:
+    """Encode one server-sent event frame."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@router.get("/{session_id}/stream")
+async def stream_report(session_id: str) -> StreamingResponse:
+    """Stream report sections as server-sent events while analyzers finish.
+
+    Emits `transcript` immediately, then one event per analyzer section in
+    completion order, ending with `scores` (composite scores and full report).
+    """
+    session_data = await get_session(session_id)
+    if session_data is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    async def event_stream():
+        try:
+            async for name, section in get_report_cache().stream_sections(session_data):
+                yield _sse_event(name, section)
+        except Exception as e:
+            logger.error(f"Report stream failed for session_id={session_id}: {e}")
+            yield _sse_event("error", {"detail": "Report generation failed"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering so sections reach the client as emitted.
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @router.get("/{report_id}")
-async def get_report(report_id: str) -> dict[str, Any]:
-    """Get a previously generated report."""
-    # In production, fetch from database
-    # For now, return a mock
+async def get_report(report_id: str, http_request: Request, compact: bool = False) -> Any:
+    """Get a previously generated report from the report cache."""
     logger.info(f"Fetching report: {report_id}")
-    
+
     if not report_id.startswith("rep_"):
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    # Return mock data (would fetch from DB in production)
-    from datetime import datetime
-    return {
-        "id": report_id,
-        "date": datetime.now().isoformat(),
-        "overallScore": 82,
-        "duration": "42:15",
-        "status": "completed",
-    }
+
+    report = await asyncio.to_thread(get_report_cache().get_by_id, report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return await _report_response(dict(report), http_request, compact)
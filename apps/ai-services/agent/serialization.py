@@ -0,0 +1,65 @@
+"""Fast JSON serialization for reports and session data.
+
+Built on orjson, which encodes the session dataclasses (datetimes, enums,
+nested dataclasses) natively, so `SessionData` goes straight to bytes
+without first building the intermediate dict from `SessionData.to_dict`.
+Both encodings produce the same JSON document.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+from .session_collector import SessionData
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    # Mirror json.dumps(default=str) for anything the codec cannot encode.
+    return str(value)
+
+
+def dumps(payload: Any, sort_keys: bool = False) -> bytes:
+    """Encode `payload` as compact UTF-8 JSON bytes."""
+    options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return orjson.dumps(payload, default=_default, option=options)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """Decode JSON from bytes or str."""
+    return orjson.loads(data)
+
+
+def encode_session(session_data: SessionData, sort_keys: bool = False) -> bytes:
+    """Encode a session to the `SessionData.to_dict` JSON shape.
+
+    Use `sort_keys=True` for canonical bytes (hashing); that path goes through
+    the dict because orjson keeps dataclass fields in declaration order.
+    """
+    if not sort_keys:
+        # Metadata and transcript dataclasses match `to_dict` field for field;
+        # code entries need their delta-compressed snapshots materialized.
+        return dumps(
+            {
+                "metadata": session_data.metadata,
+                "transcript": session_data.transcript,
+                "code_history": [
+                    session_data.code_entry_dict(entry) for entry in session_data.code_history
+                ],
+                "scores": session_data.scores,
+                "question_count": session_data.question_count,
+                "follow_up_count": session_data.follow_up_count,
+            }
+        )
+    return dumps(session_data.to_dict(), sort_keys=sort_keys)
+
+
+def decode_session(data: bytes | str) -> SessionData:
+    """Decode a session previously encoded with `encode_session` or `to_dict`."""
+    payload = loads(data)
+    if not isinstance(payload, dict):
+        raise ValueError("session payload must be a JSON object")
+    return SessionData.from_dict(payload)
@@ -0,0 +1,345 @@
+"""Bounded cache of completed interview sessions.
+
+Holds `SessionData` for report generation. The cache is bounded by
+estimated bytes and entry count, evicting least recently used sessions
+first. Each entry expires after a TTL. A session stored under several keys
+(room name and session id) is held once. Evicted sessions can optionally
+spill to disk and be loaded back, under all their keys, on the next lookup.
+Async callers should use `put_async`/`get_async`, which do the disk I/O in a
+worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from .serialization import decode_session, dumps, encode_session, loads
+from .session_collector import SessionData
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough per-object overheads used by the size estimate.
+_ENTRY_OVERHEAD_BYTES = 512
+_ITEM_OVERHEAD_BYTES = 160
+# Spill files are JSON Lines: the session's keys, then the encoded session.
+_SPILL_SUFFIX = ".session.jsonl"
+
+
+def estimate_session_bytes(session_data: SessionData) -> int:
+    """Cheap estimate of the memory held by a session."""
+    size = _ENTRY_OVERHEAD_BYTES
+    for entry in session_data.transcript:
+        size += _ITEM_OVERHEAD_BYTES + len(entry.text)
+    for entry in session_data.code_history:
+        size += _ITEM_OVERHEAD_BYTES + len(entry.summary)
+        for value in entry.details.values():
+            if isinstance(value, str):
+                size += len(value)
+    size += session_data.code_snapshots.stored_chars()
+    size += 32 * len(session_data.scores)
+    return size
+
+
+@dataclass
+class _Entry:
+    key: str
+    session_data: SessionData
+    size: int
+    expires_at: float
+    aliases: set[str] = field(default_factory=set)
+
+
+class SessionCache:
+    """LRU session cache bounded by estimated bytes, with TTL and disk spill."""
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        spill_dir: str | None = None,
+    ):
+        self.max_bytes = max(1, max_bytes or settings.session_cache_max_bytes)
+        self.max_entries = max(1, max_entries or settings.session_cache_max_entries)
+        self.ttl_seconds = ttl_seconds or settings.session_cache_ttl_seconds
+        self.spill_dir = spill_dir or settings.session_cache_spill_dir
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Primary key -> entry, in LRU order (most recently used last).
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # Primary keys in insertion order (most recently stored last). Sessions
+        # restored from disk are left out; they expire on lookup or LRU eviction.
+        self._stored: OrderedDict[str, None] = OrderedDict()
+        self._aliases: dict[str, str] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        self._expired = 0
+        self._spilled = 0
+        self._loaded = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, session_data: SessionData, *keys: str | None) -> None:
+        """Store a session under one or more keys (the first is primary)."""
+        self._spill_all(self._put(session_data, keys))
+
+    async def put_async(self, session_data: SessionData, *keys: str | None) -> None:
+        """`put()` with evicted sessions spilled to disk in a worker thread."""
+        spill = self._put(session_data, keys)
+        if spill:
+            await asyncio.to_thread(self._spill_all, spill)
+
+    def get(self, key: str) -> SessionData | None:
+        """Return the session stored under `key`, refreshing its LRU position."""
+        session_data = self._get_cached(key)
+        if session_data is None:
+            session_data = self._get_spilled(key)
+        return session_data
+
+    async def get_async(self, key: str) -> SessionData | None:
+        """`get()` with a spilled session loaded from disk in a worker thread."""
+        session_data = self._get_cached(key)
+        if session_data is not None:
+            return session_data
+        if not self.spill_dir:
+            return self._get_spilled(key)  # No disk tier; just counts the miss
+        return await asyncio.to_thread(self._get_spilled, key)
+
+    def latest(self) -> SessionData | None:
+        """The most recently stored, unexpired session."""
+        now = time.monotonic()
+        with self._lock:
+            while self._stored:
+                key = next(reversed(self._stored))
+                entry = self._entries[key]
+                if entry.expires_at > now:
+                    return entry.session_data
+                self._remove(entry)
+                self._expired += 1
+        return None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "spilled": self._spilled,
+                "loadedFromDisk": self._loaded,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold the lock unless noted)
+    # ------------------------------------------------------------------
+
+    def _put(
+        self,
+        session_data: SessionData,
+        keys: tuple[str | None, ...],
+        restore_ttl: float | None = None,
+    ) -> list[_Entry]:
+        """Store in memory; returns the evicted entries to spill (lock not held).
+
+        With `restore_ttl` the session is one loaded back from disk: it keeps
+        its remaining TTL, never replaces newer data under any of its keys and
+        is not recorded as stored, so `latest()` only reflects real puts.
+        """
+        unique_keys = list(dict.fromkeys(key for key in keys if key))
+        if not unique_keys:
+            return []
+        primary = unique_keys[0]
+        size = estimate_session_bytes(session_data)
+        now = time.monotonic()
+
+        with self._lock:
+            existing: dict[str, _Entry] = {}
+            for key in unique_keys:
+                entry = self._resolve(key)
+                if entry is not None:
+                    existing[entry.key] = entry
+            if restore_ttl is not None and existing:
+                return []
+            for entry in existing.values():
+                self._remove(entry)
+            entry = _Entry(
+                key=primary,
+                session_data=session_data,
+                size=size,
+                expires_at=now + (self.ttl_seconds if restore_ttl is None else restore_ttl),
+                aliases=set(unique_keys[1:]),
+            )
+            self._entries[primary] = entry
+            if restore_ttl is None:
+                self._stored[primary] = None
+            for alias in entry.aliases:
+                self._aliases[alias] = primary
+            self._bytes += size
+            return self._evict(now)
+
+    def _get_cached(self, key: str) -> SessionData | None:
+        """In-memory lookup (lock not held)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._resolve(key)
+            if entry is not None:
+                if entry.expires_at <= now:
+                    self._remove(entry)
+                    self._expired += 1
+                else:
+                    self._entries.move_to_end(entry.key)
+                    self._hits += 1
+                    return entry.session_data
+        return None
+
+    def _get_spilled(self, key: str) -> SessionData | None:
+        """Disk lookup after an in-memory miss (lock not held)."""
+        session_data = self._load_spilled(key)
+        with self._lock:
+            if session_data is None:
+                self._misses += 1
+            else:
+                self._loaded += 1
+        return session_data
+
+    def _resolve(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            primary = self._aliases.get(key)
+            if primary is not None:
+                entry = self._entries.get(primary)
+        return entry
+
+    def _remove(self, entry: _Entry) -> None:
+        self._entries.pop(entry.key, None)
+        self._stored.pop(entry.key, None)
+        for alias in entry.aliases:
+            if self._aliases.get(alias) == entry.key:
+                del self._aliases[alias]
+        self._bytes -= entry.size
+
+    def _evict(self, now: float) -> list[_Entry]:
+        # Expire from the insertion-ordered front first: TTLs are uniform,
+        # so the oldest stored entries are the first to expire.
+        while self._stored:
+            entry = self._entries[next(iter(self._stored))]
+            if entry.expires_at > now:
+                break
+            self._remove(entry)
+            self._expired += 1
+
+        evicted: list[_Entry] = []
+        while len(self._entries) > 1 and (
+            self._bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, entry = next(iter(self._entries.items()))
+            self._remove(entry)
+            self._evicted += 1
+            evicted.append(entry)
+        return evicted
+
+    def _spill_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.spill_dir or "", f"{digest}{_SPILL_SUFFIX}")
+
+    def _spill_all(self, entries: list[_Entry]) -> None:
+        for entry in entries:
+            self._spill(entry)
+
+    def _spill(self, entry: _Entry) -> None:
+        """Write an evicted session to disk (lock not held)."""
+        if not self.spill_dir:
+            return
+        path = self._spill_path(entry.key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(dumps([entry.key, *sorted(entry.aliases)]))
+                fh.write(b"\n")
+                fh.write(encode_session(entry.session_data))
+            os.replace(tmp_path, path)
+            for alias in entry.aliases:
+                alias_path = self._spill_path(alias)
+                try:
+                    os.unlink(alias_path)
+                except FileNotFoundError:
+                    pass
+                os.link(path, alias_path)
+        except OSError as e:
+            logger.warning("Failed to spill session %s to disk: %s", entry.key, e)
+            return
+        with self._lock:
+            self._spilled += 1
+            purge = self._spilled % 64 == 0
+        if purge:
+            self._purge_spilled()
+
+    def _purge_spilled(self) -> None:
+        """Delete spilled sessions older than the TTL (lock not held)."""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            entries = list(os.scandir(self.spill_dir))
+        except OSError:
+            return
+        for dir_entry in entries:
+            if not dir_entry.name.endswith(_SPILL_SUFFIX):
+                continue
+            try:
+                if dir_entry.stat().st_mtime < cutoff:
+                    os.unlink(dir_entry.path)
+            except OSError:
+                continue
+
+    def _load_spilled(self, key: str) -> SessionData | None:
+        """Load a spilled session back into memory under all its keys (lock not held)."""
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            remaining_ttl = self.ttl_seconds - (time.time() - os.path.getmtime(path))
+            if remaining_ttl <= 0:
+                os.unlink(path)
+                return None
+            with open(path, "rb") as fh:
+                keys = loads(fh.readline())
+                session_data = decode_session(fh.read())
+            if not isinstance(keys, list) or key not in keys:
+                raise ValueError("spilled session keys do not match")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable spilled session %s: %s", path, e)
+            return None
+        # Primary key first, so the entry is restored with all its aliases.
+        self._spill_all(self._put(session_data, tuple(keys), restore_ttl=remaining_ttl))
+        return session_data
+
+
+_session_cache: SessionCache | None = None
+_session_cache_lock = threading.Lock()
+
+
+def get_session_cache() -> SessionCache:
+    """Get or create the session cache singleton."""
+    global _session_cache
+    if _session_cache is None:
+        with _session_cache_lock:
+            if _session_cache is None:
+                _session_cache = SessionCache()
+    return _session_cache
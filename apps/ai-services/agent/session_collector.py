@@ -6,15 +6,23 @@ post-interview analysis and report generation.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Any
 
+from .code_history import CodeSnapshotHistory
+from .settings import settings
+
 logger = logging.getLogger(__name__)
 
+# `details` keys that carry a full editor snapshot, in lookup order.
+CODE_SNAPSHOT_KEYS = ("codeSnapshot", "code", "snapshotCode", "fullCode")
+
 
 class SpeakerRole(str, Enum):
     """Speaker role in the conversation."""
@@ -42,6 +50,11 @@ class CodeHistoryEntry:
     timestamp: float
     language: str | None = None
     details: dict[str, Any] = field(default_factory=dict)
+    # Index into `SessionData.code_snapshots`; the snapshot text itself is
+    # kept out of `details` (it came from `snapshot_key`) and stored
+    # delta-compressed.
+    snapshot_index: int | None = None
+    snapshot_key: str = "codeSnapshot"
 
 
 @dataclass
@@ -65,7 +78,62 @@ class SessionData:
     scores: list[float] = field(default_factory=list)
     question_count: int = 0
     follow_up_count: int = 0
-    
+
+    def __post_init__(self) -> None:
+        # Underscored so fast codecs skip it when encoding the dataclass.
+        self._code_snapshots = CodeSnapshotHistory(settings.code_snapshot_keyframe_interval)
+
+    @property
+    def code_snapshots(self) -> CodeSnapshotHistory:
+        """Delta-compressed code snapshots referenced by `code_history`."""
+        return self._code_snapshots
+
+    def store_code_snapshot(self, entry: CodeHistoryEntry) -> bool:
+        """Move the code snapshot in `entry.details` into the snapshot store.
+
+        The first string value under `CODE_SNAPSHOT_KEYS` is moved; its key is
+        kept so `entry_details` restores it unchanged.
+
+        Returns:
+            True when a snapshot was stored (identical to the previous one or not).
+        """
+        key = _snapshot_key(entry.details)
+        if key is None:
+            return False
+        details = dict(entry.details)
+        snapshot = details.pop(key)
+        entry.details = details
+        entry.snapshot_key = key
+        entry.snapshot_index = self._code_snapshots.append(snapshot)
+        return True
+
+    def code_snapshot(self, entry: CodeHistoryEntry) -> str | None:
+        """Full code snapshot recorded with `entry`, if any."""
+        if entry.snapshot_index is not None:
+            return self._code_snapshots.get(entry.snapshot_index)
+        key = _snapshot_key(entry.details)
+        return entry.details[key] if key is not None else None
+
+    def entry_details(self, entry: CodeHistoryEntry) -> dict[str, Any]:
+        """`entry.details` with the code snapshot materialized."""
+        if entry.snapshot_index is None:
+            return entry.details
+        details = dict(entry.details)
+        details[entry.snapshot_key] = self._code_snapshots.get(entry.snapshot_index)
+        return details
+
+    def code_entry_dict(self, entry: CodeHistoryEntry) -> dict[str, Any]:
+        """Serialized form of one code history entry."""
+        return {
+            "event_id": entry.event_id,
+            "actor": entry.actor,
+            "event_type": entry.event_type,
+            "summary": entry.summary,
+            "timestamp": entry.timestamp,
+            "language": entry.language,
+            "details": self.entry_details(entry),
+        }
+
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary for serialization."""
         return {
@@ -87,18 +155,7 @@ class SessionData:
                 }
                 for entry in self.transcript
             ],
-            "code_history": [
-                {
-                    "event_id": entry.event_id,
-                    "actor": entry.actor,
-                    "event_type": entry.event_type,
-                    "summary": entry.summary,
-                    "timestamp": entry.timestamp,
-                    "language": entry.language,
-                    "details": entry.details,
-                }
-                for entry in self.code_history
-            ],
+            "code_history": [self.code_entry_dict(entry) for entry in self.code_history],
             "scores": self.scores,
             "question_count": self.question_count,
             "follow_up_count": self.follow_up_count,
@@ -148,7 +205,7 @@ class SessionData:
                 )
             )
 
-        return cls(
+        session = cls(
             metadata=metadata,
             transcript=transcript,
             code_history=code_history,
@@ -156,6 +213,16 @@ class SessionData:
             question_count=data.get("question_count", 0),
             follow_up_count=data.get("follow_up_count", 0)
         )
+        for entry in code_history:
+            session.store_code_snapshot(entry)
+        return session
+
+
+def _snapshot_key(details: dict[str, Any]) -> str | None:
+    for key in CODE_SNAPSHOT_KEYS:
+        if isinstance(details.get(key), str):
+            return key
+    return None
 
 
 class SessionCollector:
@@ -163,6 +230,12 @@ class SessionCollector:
     
     Used by the voice agent to record transcript and events
     for post-session analysis and report generation.
+
+    In journal mode every event is also appended to an on-disk session
+    journal and `data` only keeps a bounded tail of the transcript and code
+    history, plus the code snapshots that tail references; `end_session()`
+    rebuilds the full session from the journal. A collector created for a
+    room with an unfinished journal resumes it.
     """
 
     def __init__(
@@ -172,6 +245,7 @@ class SessionCollector:
         template_title: str = "",
         mode: str = "strict",
         participant_name: str = "",
+        journal: bool | None = None,
     ):
         self.session_start = datetime.now()
         self.data = SessionData(
@@ -184,38 +258,136 @@ class SessionCollector:
                 participant_name=participant_name,
             )
         )
+        self._journal = None
+        self._journal_path: str | None = None
+        self._tail_size = max(1, settings.session_journal_tail_entries)
+        self._code_event_count = 0
+        self._has_code_snapshot = False
+        if settings.session_journal_enabled if journal is None else journal:
+            self._open_journal()
         logger.info(f"SessionCollector initialized for room: {room_name}, mode: {mode}")
 
+    def _open_journal(self) -> None:
+        from .session_journal import (
+            SessionJournal,
+            journal_path,
+            metadata_record,
+            purge_stale_journals,
+            replay_journal,
+        )
+
+        path = journal_path(self.data.metadata.room_name)
+        truncate_to: int | None = None
+        resumed = False
+        try:
+            if os.path.exists(path):
+                replay = replay_journal(path)
+                if replay.data is not None and not replay.ended:
+                    self._resume_from(replay.data)
+                    truncate_to = replay.valid_length
+                    resumed = True
+                else:
+                    os.unlink(path)
+            else:
+                purge_stale_journals()
+            self._journal = SessionJournal(path, truncate_to=truncate_to)
+        except OSError as e:
+            logger.warning(f"Session journal unavailable, keeping session in memory: {e}")
+            return
+
+        self._journal_path = path
+        if resumed:
+            logger.info(
+                f"Resumed session journal for room {self.data.metadata.room_name}: "
+                f"{len(self.data.transcript)} transcript entries in tail, "
+                f"{self._code_event_count} code events"
+            )
+        else:
+            self._append_record(metadata_record(self.data.metadata))
+
+    def _resume_from(self, data: SessionData) -> None:
+        self.data = data
+        self.session_start = data.metadata.started_at
+        self._code_event_count = len(data.code_history)
+        self._has_code_snapshot = any(
+            bool((data.code_snapshot(event) or "").strip()) for event in data.code_history
+        )
+        self._trim_tail(force=True)
+
+    def _append_record(self, record: dict[str, Any]) -> None:
+        if self._journal is None:
+            return
+        try:
+            self._journal.append(record)
+        except Exception as e:
+            logger.error(f"Failed to append session journal record: {e}")
+
+    def _trim_tail(self, force: bool = False) -> None:
+        """Keep only the newest entries in memory (amortized O(1))."""
+        if self._journal is None and not force:
+            return
+        trimmed = False
+        for entries in (self.data.transcript, self.data.code_history):
+            if len(entries) > (self._tail_size if force else 2 * self._tail_size):
+                del entries[:-self._tail_size]
+                trimmed = True
+        if trimmed or force:
+            # Snapshots only the tail still references stay in memory.
+            snapshots = self.data.code_snapshots
+            referenced = [
+                entry.snapshot_index
+                for entry in self.data.code_history
+                if entry.snapshot_index is not None
+            ]
+            snapshots.discard_before(min(referenced, default=len(snapshots) - 1))
+
+    @property
+    def journal_path(self) -> str | None:
+        """Path of the session journal, when journal mode is active."""
+        return self._journal_path
+
     def add_interviewer_message(self, text: str, is_question: bool = False, is_followup: bool = False):
         """Record an interviewer message."""
         timestamp = (datetime.now() - self.session_start).total_seconds()
-        self.data.transcript.append(
-            TranscriptEntry(
-                speaker=SpeakerRole.INTERVIEWER,
-                text=text,
-                timestamp=timestamp,
-            )
+        entry = TranscriptEntry(
+            speaker=SpeakerRole.INTERVIEWER,
+            text=text,
+            timestamp=timestamp,
         )
+        self.data.transcript.append(entry)
         if is_question:
             self.data.question_count += 1
         if is_followup:
             self.data.follow_up_count += 1
+        if self._journal is not None:
+            from .session_journal import transcript_record
+
+            self._append_record(transcript_record(entry, is_question, is_followup))
+            self._trim_tail()
 
     def add_candidate_message(self, text: str, duration: float = 0.0):
         """Record a candidate's response."""
         timestamp = (datetime.now() - self.session_start).total_seconds()
-        self.data.transcript.append(
-            TranscriptEntry(
-                speaker=SpeakerRole.CANDIDATE,
-                text=text,
-                timestamp=timestamp,
-                duration=duration,
-            )
+        entry = TranscriptEntry(
+            speaker=SpeakerRole.CANDIDATE,
+            text=text,
+            timestamp=timestamp,
+            duration=duration,
         )
+        self.data.transcript.append(entry)
+        if self._journal is not None:
+            from .session_journal import transcript_record
+
+            self._append_record(transcript_record(entry, False, False))
+            self._trim_tail()
 
     def add_score(self, score: float):
         """Record a score for the current question."""
         self.data.scores.append(score)
+        if self._journal is not None:
+            from .session_journal import SCORE
+
+            self._append_record({"k": SCORE, "v": score})
 
     def add_code_history_event(
         self,
@@ -249,12 +421,7 @@ class SessionCollector:
                     break
 
                 safe_key = str(key)[:64]
-                is_code_snapshot_key = safe_key in {
-                    "codeSnapshot",
-                    "code",
-                    "snapshotCode",
-                    "fullCode",
-                }
+                is_code_snapshot_key = safe_key in CODE_SNAPSHOT_KEYS
                 if isinstance(value, (str, int, float, bool)) or value is None:
                     safe_value: Any = value
                 else:
@@ -270,35 +437,116 @@ class SessionCollector:
                 normalized_details[safe_key] = safe_value
 
         timestamp = (datetime.now() - self.session_start).total_seconds()
-        event_id = f"SNAP-{len(self.data.code_history) + 1:04d}"
+        self._code_event_count += 1
+        event_id = f"SNAP-{self._code_event_count:04d}"
         normalized_details.setdefault("snapshotId", event_id)
-        self.data.code_history.append(
-            CodeHistoryEntry(
-                event_id=event_id,
-                actor=safe_actor,
-                event_type=safe_event_type,
-                summary=safe_summary,
-                timestamp=timestamp,
-                language=safe_language,
-                details=normalized_details,
-            )
+        snapshot = normalized_details.get("codeSnapshot")
+        if isinstance(snapshot, str) and snapshot.strip():
+            self._has_code_snapshot = True
+        entry = CodeHistoryEntry(
+            event_id=event_id,
+            actor=safe_actor,
+            event_type=safe_event_type,
+            summary=safe_summary,
+            timestamp=timestamp,
+            language=safe_language,
+            details=normalized_details,
         )
+        snapshots = self.data.code_snapshots
+        stored_before = len(snapshots)
+        self.data.store_code_snapshot(entry)
+        self.data.code_history.append(entry)
+        if self._journal is not None:
+            from .session_journal import code_record
+
+            # Journal the stored (keyframe or diff) form of new snapshots only.
+            new_snapshot = len(snapshots) > stored_before
+            snapshot_record = snapshots.record(entry.snapshot_index) if new_snapshot else None
+            self._append_record(code_record(entry, snapshot_record))
+            self._trim_tail()
+
+    def has_code_snapshot(self) -> bool:
+        """Whether any recorded code event carries a full `codeSnapshot`."""
+        return self._has_code_snapshot
 
     def end_session(self) -> SessionData:
-        """Mark session as ended and return collected data."""
+        """Mark session as ended and return collected data.
+
+        In journal mode the full session is rebuilt by streaming the journal;
+        on the event loop use `end_session_async()`.
+        """
+        journal = self._mark_ended()
+        if journal is not None:
+            self._rebuild_from_journal(journal)
+        return self._session_ended()
+
+    async def end_session_async(self) -> SessionData:
+        """`end_session()` with the journal close and replay run in a worker thread."""
+        journal = self._mark_ended()
+        if journal is not None:
+            await asyncio.to_thread(self._rebuild_from_journal, journal)
+        return self._session_ended()
+
+    def _mark_ended(self) -> Any:
+        """Record the end time; returns the detached journal, if any."""
         self.data.metadata.ended_at = datetime.now()
+        if self._journal is None:
+            return None
+        from .session_journal import END
+
+        self._append_record({"k": END, "ended_at": self.data.metadata.ended_at.isoformat()})
+        journal, self._journal = self._journal, None
+        return journal
+
+    def _rebuild_from_journal(self, journal: Any) -> None:
+        from .session_journal import load_session
+
+        try:
+            journal.close()
+            rebuilt = load_session(journal.path)
+            if rebuilt is not None:
+                self.data = rebuilt
+        except Exception as e:
+            logger.error(f"Failed to rebuild session from journal, using in-memory tail: {e}")
+
+    def _session_ended(self) -> SessionData:
         logger.info(
             f"Session ended: {self.data.question_count} questions, "
             f"{len(self.data.transcript)} transcript entries"
         )
         return self.data
 
+    async def get_transcript_text_async(self) -> str:
+        """`get_transcript_text()` with the journal flush and read run in a worker thread."""
+        if self._journal is None:
+            return self.get_transcript_text()
+        return await asyncio.to_thread(self.get_transcript_text)
+
     def get_transcript_text(self) -> str:
-        """Get full transcript as formatted text."""
+        """Get full transcript as formatted text.
+
+        In journal mode this fsyncs and streams the journal; on the event
+        loop use `get_transcript_text_async()`.
+        """
+        if self._journal is not None:
+            from .session_journal import TRANSCRIPT, iter_records
+
+            # The in-memory list is only a tail; stream the full transcript.
+            self._journal.flush()
+            rows = (
+                (record["speaker"], record["timestamp"], record["text"])
+                for record, _ in iter_records(self._journal.path)
+                if record.get("k") == TRANSCRIPT
+            )
+        else:
+            rows = (
+                (entry.speaker.value, entry.timestamp, entry.text)
+                for entry in self.data.transcript
+            )
         lines = []
-        for entry in self.data.transcript:
-            speaker = "Interviewer" if entry.speaker == SpeakerRole.INTERVIEWER else "Candidate"
-            lines.append(f"[{entry.timestamp:.1f}s] {speaker}: {entry.text}")
+        for speaker_role, timestamp, text in rows:
+            speaker = "Interviewer" if speaker_role == SpeakerRole.INTERVIEWER.value else "Candidate"
+            lines.append(f"[{timestamp:.1f}s] {speaker}: {text}")
         return "\n".join(lines)
 
     def is_learning_mode(self) -> bool:
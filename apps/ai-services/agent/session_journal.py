@@ -0,0 +1,322 @@
+"""Append-only on-disk journal for interview sessions.
+
+`SessionCollector` can write every transcript entry, code event and score
+to a per-session journal instead of keeping the whole session in memory.
+Records are length-prefixed frames:
+
+    [u32 length][u32 crc32][JSON record]
+
+A background thread writes and fsyncs pending frames in batches (every
+`fsync_interval` seconds or once `fsync_bytes` are pending), so the event
+loop never blocks on disk. A torn frame at the tail, left by a crash
+mid-write, fails its CRC and ends the replay, so a journal can always be
+streamed back into `SessionData`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from .serialization import dumps, loads
+from .session_collector import (
+    CodeHistoryEntry,
+    SessionData,
+    SessionMetadata,
+    SpeakerRole,
+    TranscriptEntry,
+)
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">II")
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# Record kinds
+META = "m"
+TRANSCRIPT = "t"
+CODE = "c"
+SCORE = "s"
+END = "e"
+
+
+def journal_dir() -> str:
+    """Directory holding session journals."""
+    return settings.session_journal_dir or os.path.join(
+        tempfile.gettempdir(), "ai-services-session-journals"
+    )
+
+
+def journal_path(room_name: str, directory: str | None = None) -> str:
+    """Journal file path for a room."""
+    safe_name = _SAFE_NAME_RE.sub("_", room_name)[:128] or "session"
+    return os.path.join(directory or journal_dir(), f"{safe_name}.journal")
+
+
+def iter_records(path: str) -> Iterator[tuple[dict[str, Any], int]]:
+    """Stream `(record, end_offset)` pairs until EOF or the first torn frame."""
+    with open(path, "rb") as fh:
+        offset = 0
+        while True:
+            header = fh.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, checksum = _HEADER.unpack(header)
+            data = fh.read(length)
+            if len(data) < length or zlib.crc32(data) != checksum:
+                logger.warning("Session journal %s has a torn record at offset %d", path, offset)
+                return
+            offset += _HEADER.size + length
+            try:
+                record = loads(data)
+            except ValueError:
+                logger.warning("Session journal %s has an unreadable record at offset %d", path, offset)
+                return
+            if isinstance(record, dict):
+                yield record, offset
+
+
+def metadata_record(metadata: SessionMetadata) -> dict[str, Any]:
+    return {
+        "k": META,
+        "room_name": metadata.room_name,
+        "template_id": metadata.template_id,
+        "template_title": metadata.template_title,
+        "mode": metadata.mode,
+        "started_at": metadata.started_at.isoformat(),
+        "participant_name": metadata.participant_name,
+    }
+
+
+def transcript_record(entry: TranscriptEntry, is_question: bool, is_followup: bool) -> dict[str, Any]:
+    record: dict[str, Any] = {
+        "k": TRANSCRIPT,
+        "speaker": entry.speaker.value,
+        "text": entry.text,
+        "timestamp": entry.timestamp,
+        "duration": entry.duration,
+    }
+    if is_question:
+        record["q"] = True
+    if is_followup:
+        record["f"] = True
+    return record
+
+
+def code_record(entry: CodeHistoryEntry, snapshot_record: Any = None) -> dict[str, Any]:
+    """Journal record for a code event.
+
+    `snapshot_record` is the stored form (keyframe text or line ops) of a
+    snapshot first seen with this event; repeats only carry the index.
+    """
+    record: dict[str, Any] = {
+        "k": CODE,
+        "event_id": entry.event_id,
+        "actor": entry.actor,
+        "event_type": entry.event_type,
+        "summary": entry.summary,
+        "timestamp": entry.timestamp,
+        "language": entry.language,
+        "details": entry.details,
+    }
+    if entry.snapshot_index is not None:
+        record["snapshot_index"] = entry.snapshot_index
+        if entry.snapshot_key != "codeSnapshot":
+            record["snapshot_key"] = entry.snapshot_key
+        if snapshot_record is not None:
+            record["snapshot"] = snapshot_record
+    return record
+
+
+class SessionReplay:
+    """Incrementally rebuilds `SessionData` from journal records."""
+
+    def __init__(self) -> None:
+        self.data: SessionData | None = None
+        self.ended = False
+        self.valid_length = 0
+
+    def apply(self, record: dict[str, Any]) -> None:
+        kind = record.get("k")
+        if kind == META:
+            self.data = SessionData(
+                metadata=SessionMetadata(
+                    room_name=record.get("room_name", ""),
+                    template_id=record.get("template_id"),
+                    template_title=record.get("template_title", ""),
+                    mode=record.get("mode", "strict"),
+                    started_at=datetime.fromisoformat(record["started_at"]),
+                    participant_name=record.get("participant_name", ""),
+                )
+            )
+            return
+        if self.data is None:
+            return
+        if kind == TRANSCRIPT:
+            self.data.transcript.append(
+                TranscriptEntry(
+                    speaker=SpeakerRole(record["speaker"]),
+                    text=record["text"],
+                    timestamp=record["timestamp"],
+                    duration=record.get("duration", 0.0),
+                )
+            )
+            if record.get("q"):
+                self.data.question_count += 1
+            if record.get("f"):
+                self.data.follow_up_count += 1
+        elif kind == CODE:
+            entry = CodeHistoryEntry(
+                event_id=record["event_id"],
+                actor=record["actor"],
+                event_type=record["event_type"],
+                summary=record["summary"],
+                timestamp=record["timestamp"],
+                language=record.get("language"),
+                details=record.get("details") or {},
+                snapshot_index=record.get("snapshot_index"),
+                snapshot_key=record.get("snapshot_key", "codeSnapshot"),
+            )
+            if "snapshot" in record:
+                entry.snapshot_index = self.data.code_snapshots.append_record(record["snapshot"])
+            self.data.code_history.append(entry)
+        elif kind == SCORE:
+            self.data.scores.append(record["v"])
+        elif kind == END:
+            self.data.metadata.ended_at = datetime.fromisoformat(record["ended_at"])
+            self.ended = True
+
+
+def replay_journal(path: str) -> SessionReplay:
+    """Stream a journal file into a `SessionReplay`."""
+    replay = SessionReplay()
+    for record, offset in iter_records(path):
+        replay.apply(record)
+        replay.valid_length = offset
+    return replay
+
+
+def load_session(path: str) -> SessionData | None:
+    """Rebuild the full `SessionData` recorded in a journal."""
+    return replay_journal(path).data
+
+
+class SessionJournal:
+    """Append-only, batch-fsynced writer for one session journal."""
+
+    def __init__(
+        self,
+        path: str,
+        fsync_interval: float | None = None,
+        fsync_bytes: int | None = None,
+        truncate_to: int | None = None,
+    ):
+        self.path = path
+        self.fsync_interval = (
+            fsync_interval
+            if fsync_interval is not None
+            else settings.session_journal_fsync_interval_ms / 1000
+        )
+        self.fsync_bytes = fsync_bytes or settings.session_journal_fsync_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if truncate_to is not None:
+            # Drop a torn tail before appending after it.
+            os.ftruncate(self._fd, truncate_to)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="session-journal", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, record: dict[str, Any]) -> None:
+        """Queue one record; it reaches disk with the next batch."""
+        data = dumps(record)
+        frame = _HEADER.pack(len(data), zlib.crc32(data)) + data
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("session journal is closed")
+            self._pending.append(frame)
+            self._pending_bytes += len(frame)
+            if self._pending_bytes >= self.fsync_bytes:
+                self._wake.set()
+
+    def flush(self) -> None:
+        """Write and fsync everything appended so far."""
+        # Take and write under the write lock so concurrent flushes (writer
+        # thread and close or explicit flushes) keep frames in append order;
+        # the diff chain depends on it. Appenders only wait on `_lock`.
+        with self._write_lock:
+            with self._lock:
+                frames = self._pending
+                self._pending = []
+                self._pending_bytes = 0
+            if frames:
+                buffer = memoryview(b"".join(frames))
+                while buffer:
+                    written = os.write(self._fd, buffer)
+                    buffer = buffer[written:]
+            os.fsync(self._fd)
+
+    def close(self) -> None:
+        """Flush pending records and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        os.close(self._fd)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("Session journal write failed for %s: %s", self.path, e)
+
+
+def purge_stale_journals(directory: str | None = None, max_age_hours: float | None = None) -> int:
+    """Delete journals not modified within the retention window."""
+    directory = directory or journal_dir()
+    max_age_hours = (
+        max_age_hours if max_age_hours is not None else settings.session_journal_retention_hours
+    )
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.endswith(".journal"):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
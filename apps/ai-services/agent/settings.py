@@ -43,6 +43,22 @@ class Settings(BaseSettings):
     # Qdrant Vector Store for RAG
     qdrant_url: str = "http://qdrant:6333"
     qdrant_timeout_seconds: float = 3.0
+    qdrant_prefer_grpc: bool = True
+    qdrant_grpc_port: int = 6334
+    qdrant_pool_size: int | None = None  # connections per client; None uses the client default
+    qdrant_hnsw_m: int = 16
+    qdrant_hnsw_ef_construct: int = 100
+    qdrant_hnsw_ef: int | None = None  # search-time ef; None uses the server default
+    qdrant_scalar_quantization: bool = False
+    qdrant_quantization_quantile: float = 0.99
+    qdrant_quantization_rescore: bool = True
+    qdrant_quantization_oversampling: float = 2.0
+    rag_vector_backend: str = "qdrant"  # qdrant | local
+    rag_local_index_dir: str | None = None
+    rag_local_hnsw_min_points: int = 50_000
+    rag_local_hnsw_m: int = 16
+    rag_local_hnsw_ef_construction: int = 200
+    rag_local_hnsw_ef_search: int = 64
     rag_lookup_timeout_seconds: float = 2.0
     rag_prewarm_embedder: bool = True
     rag_lookup_k: int = 3
@@ -50,12 +66,96 @@ class Settings(BaseSettings):
     rag_chunk_max_chars: int = 900
     rag_context_max_chars: int = 2500
     rag_query_max_chars: int = 500
+    rag_ingest_parse_workers: int = 2
+    rag_ingest_embed_batch_size: int = 64
+    rag_ingest_upsert_batch_size: int = 128
+    rag_ingest_queue_depth: int = 2
+    rag_embedding_cache_enabled: bool = True
+    rag_embedding_cache_dir: str | None = None
+    rag_embedding_cache_max_rows: int = 250_000
+    rag_embedder_backend: str = "torch"  # torch | onnx (int8 ONNX Runtime, needs the onnx extra)
+    rag_embedder_quantization: str = "auto"  # auto | avx2 | avx512 | avx512_vnni | arm64 | none
+    rag_embedder_dir: str | None = None
+    rag_embedder_threads: int | None = None  # intra-op threads; None splits the CPUs across job processes
+    rag_embedder_parity_min_cosine: float = 0.99
+    rag_embed_service_socket: str | None = None  # host embedding service; None embeds in-process
+    rag_embed_service_autostart: bool = True
+    rag_embed_service_max_batch: int = 64
+    rag_embed_service_max_wait_ms: float = 5.0
+    rag_embed_service_timeout_seconds: float = 10.0
+    rag_prefetch_enabled: bool = True
+    rag_prefetch_debounce_ms: int = 250
+    rag_prefetch_min_chars: int = 24
+    rag_prefetch_reuse_similarity: float = 0.85
+    rag_session_index_enabled: bool = True
+    rag_session_index_max_points: int = 20_000
+    rag_session_index_refresh_seconds: float = 60.0
+    rag_min_score: float | None = None
+    rag_group_by_doc: bool = True
+    rag_group_size: int | None = None  # chunks per document; None allows up to k
     llm_chat_max_items: int = 12
     llm_timeout_connect_seconds: float = 15.0
     llm_timeout_read_seconds: float = 45.0
     llm_timeout_write_seconds: float = 20.0
     llm_timeout_pool_seconds: float = 20.0
 
+    # Generated report cache (memory LRU + disk)
+    report_cache_dir: str | None = None
+    report_cache_memory_entries: int = 128
+    report_cache_retention_hours: float = 168.0
+    report_cache_max_disk_entries: int = 4096
+
+    # Completed session cache (LRU by estimated bytes, TTL, optional disk spill)
+    session_cache_max_bytes: int = 268435456
+    session_cache_max_entries: int = 512
+    session_cache_ttl_seconds: float = 21600.0
+    session_cache_spill_dir: str | None = None
+
+    # Report job scheduler (bounded queue + worker pool)
+    report_queue_workers: int = 2
+    report_queue_max_size: int = 32
+    report_queue_retry_after_seconds: int = 15
+    report_queue_drain_timeout_seconds: float = 30.0
+
+    # Durable report job journal (SQLite, WAL). Voice workers and the API must
+    # share the path: the API's report scheduler resumes unfinished jobs.
+    report_journal_path: str | None = None
+    report_journal_lease_seconds: float = 600.0
+    report_journal_max_attempts: int = 3
+    report_journal_claim_batch: int = 8
+    report_journal_poll_seconds: float = 5.0
+    report_journal_retention_seconds: float = 7 * 24 * 3600.0  # Finished rows kept this long
+    report_journal_purge_interval_seconds: float = 3600.0
+
+    # Report webhook delivery (shared pooled client)
+    report_webhook_url: str = "http://api:8000/api/reports/webhook"
+    report_webhook_batch_url: str | None = None  # Coalesce reports per POST when set
+    report_webhook_batch_max_size: int = 10
+    report_webhook_batch_linger_ms: float = 200.0
+    report_webhook_max_attempts: int = 3
+    report_webhook_retry_base_delay_seconds: float = 1.0
+    report_webhook_retry_max_delay_seconds: float = 30.0
+    report_webhook_timeout_seconds: float = 15.0
+    report_webhook_pool_size: int = 8
+    report_webhook_content_encoding: str = "identity"  # identity, gzip or zstd
+
+    # Compact report payloads (code snapshot dedupe + diffs)
+    report_payload_compact: bool = False
+    report_payload_diffs: bool = True
+    report_payload_keyframe_interval: int = 16
+    report_payload_compression_min_bytes: int = 1024
+
+    # Append-only session journal (SessionCollector journal mode)
+    session_journal_enabled: bool = False
+    session_journal_dir: str | None = None
+    session_journal_tail_entries: int = 200
+    session_journal_fsync_interval_ms: float = 500.0
+    session_journal_fsync_bytes: int = 262144
+    session_journal_retention_hours: float = 48.0
+
+    # Code snapshot history: full keyframe every N snapshots, line diffs between
+    code_snapshot_keyframe_interval: int = 20
+
     # --- Modular Provider Configuration ---
     llm_provider: str = "openai"
     stt_provider: str = "openai"
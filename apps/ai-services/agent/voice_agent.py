@@ -16,7 +16,6 @@ import asyncio
 import json
 import logging
 import time
-import urllib.request
 import uuid
 from typing import Any, Awaitable, Callable
 
@@ -36,15 +35,24 @@ from livekit.plugins import silero
 
 from .analysis.sentiment_analyzer import SentimentAnalyzer
 from .model_factory import create_model_components
-from .rag_cache import _lookup_rag_chunks_with_cache, _normalize_rag_query
+from .rag_cache import (
+    _lookup_rag_chunks_async,
+    _normalize_rag_query,
+    _rag_targets,
+)
 from .room_metadata import parse_room_metadata
+from .report_journal import ReportLeaseLostError, default_owner, get_report_journal
+from .rag_prefetch import RagPrefetcher
 from .settings import settings
-from .session_collector import SessionCollector
+from .serialization import encode_session
+from .session_collector import SessionCollector, SessionData
+from .webhook_client import get_webhook_client
 from .voice_helpers import (
     _cap_context_chunks,
     _clone_chat_item,
     _collect_text_content,
     _compact_text,
+    _DeferredChatStream,
     _extract_context_items,
     _filter_internal_tool_markup,
     _install_asyncio_loop_destructor_guard,
@@ -56,6 +64,9 @@ from .voice_helpers import (
 
 logger = logging.getLogger("voice-agent")
 
+# Strong references to report finalization tasks; the loop only keeps weak ones.
+_REPORT_FINALIZE_TASKS: set[asyncio.Task[None]] = set()
+
 load_dotenv()
 
 
@@ -482,7 +493,7 @@ class InterviewCoach(Agent):
         Args:
             query: The specific topic or detail you need to find in their document (e.g., 'Python experience', 'education').
         """
-        from .rag.vector_store import get_vector_store
+        from .rag.vector_store import get_vector_store_async
 
         query_key = _normalize_rag_query(query)
         now = time.monotonic()
@@ -496,26 +507,24 @@ class InterviewCoach(Agent):
             oldest_key = min(self._doc_query_last_seen, key=self._doc_query_last_seen.get)
             self._doc_query_last_seen.pop(oldest_key, None)
 
-        store = get_vector_store()
         try:
             # Query both the template (if applicable) and this specific session's uploaded docs.
-            results: list[str] = []
-            targets: list[str] = []
-            if self.template_id:
-                targets.append(self.template_id)
-            if self.session_id:
-                targets.append(self.session_id)
-                targets.append(f"session_{self.session_id}")
-
-            for target_id in list(dict.fromkeys(targets)):
-                hits = _lookup_rag_chunks_with_cache(
-                    store,
-                    target_id,
-                    query,
-                    settings.rag_lookup_k,
+            try:
+                results = await asyncio.wait_for(
+                    _lookup_rag_chunks_async(
+                        get_vector_store_async,
+                        _rag_targets(self.template_id, self.session_id),
+                        query,
+                        settings.rag_lookup_k,
+                    ),
+                    timeout=settings.rag_lookup_timeout_seconds,
+                )
+            except TimeoutError:
+                logger.warning(
+                    "Document context lookup timed out after %.1fs",
+                    settings.rag_lookup_timeout_seconds,
                 )
-                if hits:
-                    results.extend(hits)
+                results = []
 
             if not results:
                 return "I couldn't find any relevant information about that in the uploaded documents."
@@ -534,6 +543,111 @@ class InterviewCoach(Agent):
             logger.error(f"Failed to query RAG: {e}")
             return "Failed to retrieve document context at this moment."
 
+async def _journal_call(method_name: str, *args: Any) -> Any:
+    """Run a report journal operation off-loop; journal problems never block delivery.
+
+    A lost lease is not a journal problem: it propagates so the job stops.
+    """
+    try:
+        journal = get_report_journal()
+        return await asyncio.to_thread(getattr(journal, method_name), *args)
+    except ReportLeaseLostError:
+        raise
+    except Exception as e:
+        logger.warning("Report journal %s failed: %s", method_name, e)
+        return None
+
+
+async def _run_report_job(job_session_id: str, session_data: SessionData) -> None:
+    """Generate a report and push it to the API webhook, journaling each step.
+
+    Jobs this process leaves unfinished are resumed by the API's report
+    scheduler, which shares the journal (`report_journal_path`).
+    """
+    owner = default_owner()
+    owns = await _journal_call("enqueue", job_session_id, encode_session(session_data), owner)
+    if owns is False:
+        logger.info("Report job for %s is already journaled; skipping", job_session_id)
+        return
+
+    heartbeat = asyncio.create_task(_renew_report_lease(job_session_id, owner))
+    try:
+        from .analysis import ReportGenerator
+
+        await _journal_call("mark_running", job_session_id, owner)
+        generator = ReportGenerator()
+        report = await generator.generate_async(session_data)
+        payload = report.to_dict()
+        payload["session_id"] = job_session_id
+        payload["sessionId"] = job_session_id
+        await _journal_call("mark_generated", job_session_id, owner)
+
+        status = await get_webhook_client().deliver(payload)
+        logger.info("Webhook pushed successfully: %s", status)
+        await _journal_call("mark_delivered", job_session_id, owner)
+    except ReportLeaseLostError as e:
+        # Another process holds the job now and delivers it.
+        logger.warning("Abandoning report job for %s: %s", job_session_id, e)
+    except Exception as e:
+        logger.error("Failed to push webhook: %s", e)
+        await _journal_call("mark_failed", job_session_id, owner, str(e))
+    finally:
+        heartbeat.cancel()
+
+
+async def _renew_report_lease(job_session_id: str, owner: str) -> None:
+    """Keep this process's journal lease on a running report job alive."""
+    while True:
+        await asyncio.sleep(settings.report_journal_lease_seconds / 3)
+        lost = await _journal_call("renew_leases", owner, [job_session_id])
+        if lost:
+            logger.warning("Report job lease for %s was taken over", job_session_id)
+            return
+
+
+async def _maintain_session_index(target_ids: list[str]) -> None:
+    """Preload the session's RAG chunks into memory and reload them when uploads change."""
+    from .rag.vector_store import get_vector_store_async
+
+    if not target_ids:
+        return
+    store = None
+    try:
+        store = await get_vector_store_async()
+        started = time.perf_counter()
+        index = await store.load_session_index_async(target_ids)
+        if index is not None:
+            logger.info(
+                "Loaded session RAG index: %d chunks for %s in %.0f ms",
+                len(index),
+                target_ids,
+                (time.perf_counter() - started) * 1000,
+            )
+
+        while True:
+            await asyncio.sleep(settings.rag_session_index_refresh_seconds)
+            try:
+                count = await store.count_target_points_async(target_ids)
+                current = store.session_index(target_ids)
+                if current is not None and current.point_count == count:
+                    continue
+                if current is None and count > settings.rag_session_index_max_points:
+                    continue
+                index = await store.load_session_index_async(target_ids)
+                if index is not None:
+                    logger.info("Reloaded session RAG index: %d chunks", len(index))
+            except Exception as e:
+                # Keep serving the loaded index; Qdrant may only be slow.
+                logger.warning("Session RAG index refresh failed: %s", e)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("Session RAG index unavailable; using Qdrant per turn: %s", e)
+    finally:
+        if store is not None:
+            store.drop_session_index(target_ids)
+
+
 server = AgentServer(
     # Keep the process pool small in containerized runs.
     num_idle_processes=settings.livekit_num_idle_processes,
@@ -552,6 +666,12 @@ def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
 
     def _prewarm_rag_embedder() -> None:
+        if settings.rag_embed_service_socket:
+            # Embeddings come from the host service; no private model copy.
+            # If the service fails, the model loads in the background and
+            # the affected turns answer without documents.
+            logger.info("RAG embeddings served by %s", settings.rag_embed_service_socket)
+            return
         try:
             from .rag.vector_store import get_vector_store
 
@@ -635,6 +755,12 @@ async def voice_agent(ctx: JobContext):
         ide_enabled,
     )
 
+    session_index_task: asyncio.Task | None = None
+    if settings.rag_session_index_enabled:
+        session_index_task = asyncio.create_task(
+            _maintain_session_index(_rag_targets(template_id, session_id))
+        )
+
     # Initialize session collector
     collector = SessionCollector(
         room_name=ctx.room.name,
@@ -663,6 +789,15 @@ async def voice_agent(ctx: JobContext):
     
     # Define a wrapper for the chat method that handles the async nature of LLMStream
     original_chat = llm.chat
+    rag_prefetcher: RagPrefetcher | None = None
+    if settings.rag_prefetch_enabled and not ide_enabled:
+        from .rag.vector_store import get_vector_store_async as _get_vector_store_async
+
+        rag_prefetcher = RagPrefetcher(
+            _get_vector_store_async,
+            _rag_targets(template_id, session_id),
+            settings.rag_lookup_k,
+        )
     last_proactive_rag_query = ""
     last_proactive_rag_at = 0.0
     
@@ -734,7 +869,6 @@ async def voice_agent(ctx: JobContext):
                     query = _compact_text(query, settings.rag_query_max_chars)
                     if not query:
                         return original_chat(*args, **kwargs)
-
                     delivery_signal_block = ""
                     if agent.mode == "learning" or settings.guide_mode:
                         sentiment_signal = agent.sentiment_analyzer.analyze(query)
@@ -781,6 +915,8 @@ async def voice_agent(ctx: JobContext):
                         return original_chat(*args, **kwargs)
 
                     if _looks_like_editor_write_request(query):
+                        if rag_prefetcher:
+                            rag_prefetcher.cancel()
                         if delivery_signal_block:
                             user_msg.content = _compose_augmented_prompt(query)
                         logger.debug("Skipping proactive RAG for editor-write intent query.")
@@ -789,6 +925,8 @@ async def voice_agent(ctx: JobContext):
                     now_monotonic = time.monotonic()
                     query_key = query.lower()
                     if query_key == last_proactive_rag_query and (now_monotonic - last_proactive_rag_at) < 2.5:
+                        if rag_prefetcher:
+                            rag_prefetcher.cancel()
                         if delivery_signal_block:
                             user_msg.content = _compose_augmented_prompt(query)
                         logger.debug("Skipping duplicate proactive RAG lookup for repeated query.")
@@ -798,59 +936,73 @@ async def voice_agent(ctx: JobContext):
                     last_proactive_rag_at = now_monotonic
                     
                     # We need to reach into the vector store
-                    from .rag.vector_store import get_vector_store
-                    
-                    store = get_vector_store()
-
-                    results: list[str] = []
-                    targets: list[str] = []
-                    if template_id:
-                        targets.append(template_id)
-                    if session_id and session_id != template_id:
-                        targets.append(session_id)
-                    if session_id:
-                        targets.append(f"session_{session_id}")
-                    targets = list(dict.fromkeys(targets))
+                    from .rag.vector_store import get_vector_store_async
 
                     logger.info("Proactive RAG intercept triggered. Query: %s", query)
-                    for target_id in targets:
-                        chunks = _lookup_rag_chunks_with_cache(
-                            store,
-                            target_id,
+                    if sanitized_context_items:
+                        logger.debug(
+                            "Proactive RAG sanitized %d previously injected context messages.",
+                            sanitized_context_items,
+                        )
+
+                    # Retrieval runs as a task; the LLM stream is opened once it
+                    # finishes or the per-turn deadline passes, so the event loop
+                    # never blocks on Qdrant.
+                    rag_deadline = time.monotonic() + settings.rag_lookup_timeout_seconds
+                    # Retrieval speculatively started on interim transcripts, if
+                    # it matches this query; taken only once the turn uses RAG.
+                    prefetched_task = rag_prefetcher.take(query) if rag_prefetcher else None
+                    rag_task = prefetched_task or asyncio.create_task(
+                        _lookup_rag_chunks_async(
+                            get_vector_store_async,
+                            _rag_targets(template_id, session_id),
                             query,
                             settings.rag_lookup_k,
                         )
-                        if chunks:
-                            results.extend(chunks)
-                    
-                    # Deduplicate
-                    unique_results = []
-                    for r in results:
-                        if r not in unique_results:
-                            unique_results.append(r)
-                            
-                    if unique_results:
-                        limited_results = _cap_context_chunks(
-                            unique_results,
-                            max_chunks=settings.rag_injected_chunks,
-                            chunk_max_chars=settings.rag_chunk_max_chars,
-                            total_max_chars=settings.rag_context_max_chars,
-                        )
-                        if limited_results:
-                            context_str = "\n---\n".join(limited_results)
-                            user_msg.content = _compose_augmented_prompt(query, context_str)
-                            logger.info("Injected %d proactive RAG chunks into prompt.", len(limited_results))
+                    )
+
+                    async def _open_augmented_stream():
+                        try:
+                            # Merged and deduplicated across targets by the store.
+                            unique_results = await asyncio.wait_for(
+                                rag_task,
+                                timeout=max(0.0, rag_deadline - time.monotonic()),
+                            )
+                        except TimeoutError:
+                            logger.warning(
+                                "Proactive RAG missed the %.1fs turn deadline; answering without documents.",
+                                settings.rag_lookup_timeout_seconds,
+                            )
+                            unique_results = []
+                        except Exception as e:
+                            logger.error(f"Failed proactive RAG injection: {e}")
+                            return original_chat(*args, **kwargs)
+
+                        if unique_results:
+                            limited_results = _cap_context_chunks(
+                                unique_results,
+                                max_chunks=settings.rag_injected_chunks,
+                                chunk_max_chars=settings.rag_chunk_max_chars,
+                                total_max_chars=settings.rag_context_max_chars,
+                            )
+                            if limited_results:
+                                context_str = "\n---\n".join(limited_results)
+                                user_msg.content = _compose_augmented_prompt(query, context_str)
+                                logger.info("Injected %d proactive RAG chunks into prompt.", len(limited_results))
+                            else:
+                                logger.info("Proactive RAG skipped injection due to prompt budget limits.")
                         else:
-                            logger.info("Proactive RAG skipped injection due to prompt budget limits.")
-                    else:
-                        logger.info(
-                            "Proactive RAG found zero chunks for query '%s' (target IDs: %s, %s)",
-                            query,
-                            template_id,
-                            session_id,
-                        )
-                        if delivery_signal_block:
-                            user_msg.content = _compose_augmented_prompt(query)
+                            logger.info(
+                                "Proactive RAG found zero chunks for query '%s' (target IDs: %s, %s)",
+                                query,
+                                template_id,
+                                session_id,
+                            )
+                            if delivery_signal_block:
+                                user_msg.content = _compose_augmented_prompt(query)
+                        return original_chat(*args, **kwargs)
+
+                    return _DeferredChatStream(_open_augmented_stream, on_close=rag_task.cancel)
 
                 if sanitized_context_items:
                     logger.debug(
@@ -948,6 +1100,8 @@ async def voice_agent(ctx: JobContext):
         nonlocal last_editor_write_request_at
         transcript = getattr(ev, "transcript", "")
         is_final = getattr(ev, "is_final", True)
+        if rag_prefetcher and transcript and not _looks_like_editor_write_request(transcript):
+            rag_prefetcher.on_transcript(transcript, is_final)
         if is_final and transcript:
             collector.add_candidate_message(transcript)
 
@@ -994,13 +1148,7 @@ async def voice_agent(ctx: JobContext):
         if not current_code.strip():
             return
 
-        has_existing_snapshot = any(
-            isinstance(getattr(event, "details", None), dict)
-            and isinstance(event.details.get("codeSnapshot"), str)
-            and bool(event.details.get("codeSnapshot", "").strip())
-            for event in collector.data.code_history
-        )
-        if has_existing_snapshot:
+        if collector.has_code_snapshot():
             return
 
         collector.add_code_history_event(
@@ -1029,47 +1177,24 @@ async def voice_agent(ctx: JobContext):
         report_generation_started = True
         logger.info("Finalizing interview report (%s)...", reason)
         ensure_final_code_snapshot_for_report()
-        session_data = collector.end_session()
+        # Fire and forget; the report journal makes the job survive restarts.
+        task = asyncio.create_task(finalize_report())
+        _REPORT_FINALIZE_TASKS.add(task)
+        task.add_done_callback(_REPORT_FINALIZE_TASKS.discard)
+
+    async def finalize_report() -> None:
+        # The session journal close and replay run off the event loop.
+        session_data = await collector.end_session_async()
 
         # Store it locally just in case
         try:
             from .routers.reports import store_session
 
-            store_session(session_data)
+            await store_session(session_data)
         except ImportError:
             pass
 
-        async def push_webhook():
-            try:
-                from .analysis import ReportGenerator
-
-                generator = ReportGenerator()
-                report = await asyncio.to_thread(generator.generate, session_data)
-                payload = report.to_dict()
-                payload["session_id"] = session_id
-                payload["sessionId"] = session_id
-
-                # Use standard library to avoid missing httpx/aiohttp in worker
-                api_url = "http://api:8000/api/reports/webhook"
-                req = urllib.request.Request(
-                    api_url,
-                    data=json.dumps(payload).encode("utf-8"),
-                    headers={"Content-Type": "application/json"},
-                    method="POST"
-                )
-
-                # Run in thread so it doesn't block
-                def make_req():
-                    with urllib.request.urlopen(req, timeout=30) as response:
-                        return response.status
-
-                status = await asyncio.to_thread(make_req)
-                logger.info("Webhook pushed successfully: %s", status)
-            except Exception as e:
-                logger.error("Failed to push webhook: %s", e)
-
-        # Fire and forget
-        asyncio.create_task(push_webhook())
+        await _run_report_job(session_id or ctx.room.name, session_data)
 
     @ctx.room.on("data_received")
     def on_data_received(data_packet):
@@ -1277,10 +1402,16 @@ async def voice_agent(ctx: JobContext):
 
     @ctx.room.on("disconnected")
     def on_disconnected(*args):
+        if session_index_task is not None:
+            session_index_task.cancel()
         trigger_report_generation("room_disconnected")
 
     logger.info(f"Connected to room: {ctx.room.name} in {mode} mode")
 
 
 if __name__ == "__main__":
+    if settings.rag_embed_service_autostart:
+        from .rag.embedding_service import spawn_embedding_service
+
+        spawn_embedding_service()
     cli.run_app(server)
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import asyncio
 import re
-from collections.abc import AsyncIterable
+from collections.abc import AsyncIterable, Awaitable, Callable
 from typing import Any
 
 
@@ -152,6 +152,58 @@ async def _filter_internal_tool_markup(text: AsyncIterable[str]) -> AsyncIterabl
         yield tail
 
 
+class _DeferredChatStream:
+    """Stand-in for an `LLMStream` whose request is finished asynchronously.
+
+    `llm.chat()` has to return a stream synchronously. This wrapper runs
+    `open_stream` (which may await retrieval, then calls the real `chat()`)
+    when the stream is first entered or iterated, and delegates to the real
+    stream from then on.
+    """
+
+    def __init__(self, open_stream: Callable[[], Awaitable[Any]], on_close: Callable[[], None] | None = None):
+        self._open_stream = open_stream
+        self._on_close = on_close
+        self._stream: Any = None
+
+    async def _ensure_stream(self) -> Any:
+        if self._stream is None:
+            self._stream = await self._open_stream()
+        return self._stream
+
+    async def __aenter__(self) -> _DeferredChatStream:
+        await (await self._ensure_stream()).__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> Any:
+        if self._stream is None:
+            self._close_pending()
+            return None
+        return await self._stream.__aexit__(exc_type, exc, tb)
+
+    def __aiter__(self) -> _DeferredChatStream:
+        return self
+
+    async def __anext__(self) -> Any:
+        return await (await self._ensure_stream()).__anext__()
+
+    async def aclose(self) -> None:
+        if self._stream is None:
+            self._close_pending()
+            return
+        await self._stream.aclose()
+
+    def _close_pending(self) -> None:
+        if self._on_close is not None:
+            self._on_close()
+
+    def __getattr__(self, name: str) -> Any:
+        stream = self.__dict__.get("_stream")
+        if stream is None:
+            raise AttributeError(name)
+        return getattr(stream, name)
+
+
 def _cap_context_chunks(
     chunks: list[str],
     *,
@@ -0,0 +1,305 @@
+"""Shared report webhook delivery client.
+
+One long-lived, pooled aiohttp session per process (keep-alive connections
+to the API) with jittered exponential backoff. Both the reports router and
+the voice worker deliver through it. When a batch endpoint is configured,
+reports arriving within a short linger window are coalesced into one POST.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any
+
+import aiohttp
+
+from .report_payload import compact_report, dumps_json, encode_body
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; other 4xx responses will not succeed on retry.
+_RETRYABLE_STATUSES = {408, 425, 429}
+
+
+class WebhookDeliveryError(Exception):
+    """Raised when a webhook payload could not be delivered."""
+
+    def __init__(self, message: str, status: int | None = None, retryable: bool = True):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class WebhookClient:
+    """Pooled webhook sender with retries, optional batching and latency metrics."""
+
+    def __init__(
+        self,
+        url: str | None = None,
+        batch_url: str | None = None,
+        max_attempts: int | None = None,
+        base_delay_seconds: float | None = None,
+        max_delay_seconds: float | None = None,
+        timeout_seconds: float | None = None,
+        pool_size: int | None = None,
+        batch_max_size: int | None = None,
+        batch_linger_seconds: float | None = None,
+        content_encoding: str | None = None,
+        compact: bool | None = None,
+    ):
+        self.url = url or settings.report_webhook_url
+        self.batch_url = batch_url or settings.report_webhook_batch_url
+        self.max_attempts = max(1, max_attempts or settings.report_webhook_max_attempts)
+        self.base_delay_seconds = (
+            base_delay_seconds or settings.report_webhook_retry_base_delay_seconds
+        )
+        self.max_delay_seconds = max_delay_seconds or settings.report_webhook_retry_max_delay_seconds
+        self.timeout_seconds = timeout_seconds or settings.report_webhook_timeout_seconds
+        self.pool_size = max(1, pool_size or settings.report_webhook_pool_size)
+        self.batch_max_size = max(1, batch_max_size or settings.report_webhook_batch_max_size)
+        self.batch_linger_seconds = (
+            batch_linger_seconds
+            if batch_linger_seconds is not None
+            else settings.report_webhook_batch_linger_ms / 1000
+        )
+
+        self.content_encoding = content_encoding or settings.report_webhook_content_encoding
+        self.compact = settings.report_payload_compact if compact is None else compact
+
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._batch: list[tuple[dict[str, Any], asyncio.Future[int]]] = []
+        self._batch_task: asyncio.Task[None] | None = None
+        self._send_tasks: set[asyncio.Task[None]] = set()
+
+        self._delivered = 0
+        self._failed = 0
+        self._retries = 0
+        self._batches = 0
+        self._bytes_raw = 0
+        self._bytes_sent = 0
+        self._latency_ms: deque[float] = deque(maxlen=256)
+        self._attempt_ms: deque[float] = deque(maxlen=256)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def deliver(self, payload: dict[str, Any]) -> int:
+        """Deliver one report payload, retrying transient failures.
+
+        Returns:
+            The HTTP status of the successful POST.
+
+        Raises:
+            WebhookDeliveryError: when every attempt failed.
+        """
+        if self.compact:
+            payload = await asyncio.to_thread(
+                compact_report,
+                payload,
+                settings.report_payload_diffs,
+                settings.report_payload_keyframe_interval,
+            )
+        if not self.batch_url:
+            return await self._post_with_retry(self.url, payload, count=1)
+
+        self._bind_loop()
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._batch.append((payload, future))
+        if len(self._batch) >= self.batch_max_size:
+            self._flush_batch()
+        elif self._batch_task is None:
+            self._batch_task = asyncio.create_task(self._linger_then_flush())
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict[str, Any]:
+        """Delivery counters and latency percentiles."""
+        latency = list(self._latency_ms)
+        attempts = list(self._attempt_ms)
+        return {
+            "delivered": self._delivered,
+            "failed": self._failed,
+            "retries": self._retries,
+            "batches": self._batches,
+            "pendingBatch": len(self._batch),
+            "bytesRaw": self._bytes_raw,
+            "bytesSent": self._bytes_sent,
+            "deliveryMs": {
+                "p50": round(_percentile(latency, 0.5), 1),
+                "p95": round(_percentile(latency, 0.95), 1),
+            },
+            "attemptMs": {
+                "p50": round(_percentile(attempts, 0.5), 1),
+                "p95": round(_percentile(attempts, 0.95), 1),
+            },
+        }
+
+    async def close(self) -> None:
+        """Flush any pending batch and close pooled connections."""
+        if self._batch:
+            self._flush_batch()
+        if self._send_tasks:
+            await asyncio.gather(*self._send_tasks, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions and futures are loop-bound; start fresh on a new loop.
+            self._session = None
+            self._batch = []
+            self._batch_task = None
+            self._send_tasks = set()
+            self._loop = loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        self._bind_loop()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=30,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+            )
+        return self._session
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) attempt."""
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _post_with_retry(self, url: str, body: Any, count: int) -> int:
+        started = time.perf_counter()
+        # Encode and compress once; retries resend the same bytes.
+        data, encoding = await asyncio.to_thread(self._encode, body)
+        headers = {"Content-Type": "application/json"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                status = await self._post_once(url, data, headers)
+                self._latency_ms.append((time.perf_counter() - started) * 1000)
+                self._delivered += count
+                return status
+            except WebhookDeliveryError as e:
+                error = e
+            except (aiohttp.ClientError, TimeoutError, OSError) as e:
+                error = WebhookDeliveryError(f"{type(e).__name__}: {e}")
+
+            if not error.retryable or attempt >= self.max_attempts:
+                self._failed += count
+                logger.error(
+                    "Webhook delivery to %s failed after %d attempt(s): %s",
+                    url,
+                    attempt,
+                    error,
+                )
+                raise error
+
+            self._retries += 1
+            backoff = self._backoff_seconds(attempt)
+            logger.warning(
+                "Webhook attempt %d/%d failed; retrying in %.2fs: %s",
+                attempt,
+                self.max_attempts,
+                backoff,
+                error,
+            )
+            await asyncio.sleep(backoff)
+        raise AssertionError("unreachable")
+
+    def _encode(self, body: Any) -> tuple[bytes, str]:
+        data = dumps_json(body)
+        encoded, encoding = encode_body(
+            data, self.content_encoding, settings.report_payload_compression_min_bytes
+        )
+        self._bytes_raw += len(data)
+        self._bytes_sent += len(encoded)
+        return encoded, encoding
+
+    async def _post_once(self, url: str, data: bytes, headers: dict[str, str]) -> int:
+        started = time.perf_counter()
+        try:
+            async with self._get_session().post(url, data=data, headers=headers) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise WebhookDeliveryError(
+                        f"{response.status} - {text[:500]}",
+                        status=response.status,
+                        retryable=response.status >= 500 or response.status in _RETRYABLE_STATUSES,
+                    )
+                await response.read()
+                return response.status
+        finally:
+            self._attempt_ms.append((time.perf_counter() - started) * 1000)
+
+    async def _linger_then_flush(self) -> None:
+        await asyncio.sleep(self.batch_linger_seconds)
+        self._batch_task = None
+        self._flush_batch()
+
+    def _flush_batch(self) -> None:
+        batch, self._batch = self._batch, []
+        if self._batch_task is not None and self._batch_task is not asyncio.current_task():
+            self._batch_task.cancel()
+        self._batch_task = None
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(self, batch: list[tuple[dict[str, Any], asyncio.Future[int]]]) -> None:
+        self._batches += 1
+        body = {"reports": [payload for payload, _ in batch]}
+        try:
+            status = await self._post_with_retry(self.batch_url, body, count=len(batch))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(status)
+
+
+_webhook_client: WebhookClient | None = None
+
+
+def get_webhook_client() -> WebhookClient:
+    """Get or create the webhook client singleton."""
+    global _webhook_client
+    if _webhook_client is None:
+        _webhook_client = WebhookClient()
+    return _webhook_client
+
+
+async def close_webhook_client() -> None:
+    """Close the webhook client's pooled connections, if it was created."""
+    if _webhook_client is not None:
+        await _webhook_client.close()
@@ -0,0 +1,91 @@
+"""Benchmark report/session serialization against the stdlib dict round-trip.
+
+Usage: python bench_serialization.py [--turns 400] [--snapshots 60] [--repeat 20]
+"""
+
+import argparse
+import json
+import timeit
+
+from agent.analysis import ReportGenerator
+from agent.serialization import (
+    decode_session,
+    dumps,
+    encode_session,
+    loads,
+)
+from agent.session_collector import SessionCollector
+
+
+def build_session(turns: int, snapshots: int):
+    collector = SessionCollector("bench-room", "tmpl", "Benchmark Interview")
+    for index in range(turns):
+        collector.add_interviewer_message(f"Question {index}: explain your approach?", is_question=True)
+        collector.add_candidate_message(
+            "Um, so basically I would start with a hash map and then, like, iterate "
+            f"over the input once to keep it linear. Turn {index}.",
+            duration=6.5,
+        )
+    lines = [f"    total += compute(values[{i}])  # step {i}\n" for i in range(400)]
+    for index in range(snapshots):
+        lines.insert(index * 3 % len(lines), f"    log('edit {index}')\n")
+        code = "def solve(values):\n    total = 0\n" + "".join(lines)
+        collector.add_code_history_event(
+            "user", "edit", f"Edit {index}", language="python", details={"codeSnapshot": code}
+        )
+    return collector.end_session()
+
+
+def timed(label: str, repeat: int, fn) -> float:
+    # Best of 5 runs to keep GC and scheduler noise out of the comparison.
+    elapsed_ms = min(timeit.repeat(fn, number=repeat, repeat=5)) * 1000 / repeat
+    print(f"  {label:<38} {elapsed_ms:8.2f} ms")
+    return elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--snapshots", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    session = build_session(args.turns, args.snapshots)
+    report = ReportGenerator().generate(session)
+
+    session_json = json.dumps(session.to_dict(), ensure_ascii=False, default=str).encode("utf-8")
+    print(f"\nSessionData ({len(session_json) / 1024:.0f} KiB)")
+    base_enc = timed(
+        "to_dict + json.dumps",
+        args.repeat,
+        lambda: json.dumps(session.to_dict(), ensure_ascii=False, default=str).encode("utf-8"),
+    )
+    fast_enc = timed("encode_session", args.repeat, lambda: encode_session(session))
+    from agent.session_collector import SessionData
+
+    base_dec = timed(
+        "json.loads + from_dict", args.repeat, lambda: SessionData.from_dict(json.loads(session_json))
+    )
+    fast_dec = timed("decode_session", args.repeat, lambda: decode_session(session_json))
+
+    report_dict = report.to_dict()
+    report_json = json.dumps(report_dict, ensure_ascii=False, default=str).encode("utf-8")
+    print(f"\nInterviewReport ({len(report_json) / 1024:.0f} KiB)")
+    base_rep = timed(
+        "to_dict + json.dumps",
+        args.repeat,
+        lambda: json.dumps(report.to_dict(), ensure_ascii=False, default=str).encode("utf-8"),
+    )
+    fast_rep = timed("to_dict + serialization.dumps", args.repeat, lambda: dumps(report.to_dict()))
+    timed("json.loads", args.repeat, lambda: json.loads(report_json))
+    timed("serialization.loads", args.repeat, lambda: loads(report_json))
+
+    assert decode_session(encode_session(session)).to_dict() == session.to_dict()
+    print(
+        f"\nSpeedup: session encode {base_enc / fast_enc:.1f}x, "
+        f"decode {base_dec / fast_dec:.1f}x, report encode {base_rep / fast_rep:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
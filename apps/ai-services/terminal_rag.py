@@ -1,7 +1,7 @@
 """Terminal RAG Test — Document-Augmented Interview Coach
 
 Test the RAG pipeline locally without requiring external Qdrant.
-Uses in-memory Qdrant, local embeddings (all-MiniLM-L6-v2), and
+Uses an embedded local vector index, local embeddings (all-MiniLM-L6-v2), and
 the existing STT/LLM/TTS pipeline from terminal_chat.py.
 
 Usage:
@@ -39,7 +39,7 @@ def parse_args():
     parser.add_argument("--voice", action="store_true", help="Enable voice mode (mic + TTS)")
     parser.add_argument("--guide", action="store_true", help="Enable Guide Mode (speech analysis)")
     parser.add_argument("--chunks", type=int, default=5, help="Number of RAG chunks to retrieve (default: 5)")
-    parser.add_argument("--qdrant", action="store_true", help="Use real Qdrant vector store (instead of in-memory)")
+    parser.add_argument("--qdrant", action="store_true", help="Use real Qdrant vector store (instead of the embedded local index)")
     return parser.parse_args()
 
 
@@ -85,59 +85,38 @@ async def load_document(filepath: str) -> list[dict]:
     return result.chunks
 
 
-def build_vector_store(chunks):
-    """Build an in-memory vector store from document chunks."""
-    from sentence_transformers import SentenceTransformer
-    
-    print("🧠 Generating embeddings...")
-    embedder = SentenceTransformer("all-MiniLM-L6-v2")
-    
-    texts = [c.content for c in chunks]
-    embeddings = embedder.encode(texts, show_progress_bar=True)
-    
-    # Store as simple list for in-memory retrieval
-    store = []
-    for chunk, embedding in zip(chunks, embeddings):
-        store.append({
-            "content": chunk.content,
-            "embedding": embedding,
-            "metadata": chunk.metadata,
-        })
-    
-    print(f"✅ Vector store ready: {len(store)} vectors")
-    return store, embedder
-
-
-def retrieve_context(query: str, store: list, embedder, k: int = 5, use_qdrant: bool = False) -> list[str]:
-    """Retrieve top-k relevant chunks for a query."""
+async def build_vector_store(chunks, use_qdrant: bool = False):
+    """Index document chunks in Qdrant or in a throwaway embedded local index."""
+    from agent.rag.vector_store import TemplateVectorStore, get_vector_store
+
     if use_qdrant:
-        from agent.rag.vector_store import get_vector_store
-        v_store = get_vector_store()
-        # Note: We use 'terminal_test' as the template_id (hardcoded in load_document)
-        return asyncio.run(v_store.query_for_interview("terminal_test", query, k=k))
-
-    query_embedding = embedder.encode([query])[0]
-    
-    # Cosine similarity
-    scores = []
-    for item in store:
-        vec = item["embedding"]
-        similarity = np.dot(query_embedding, vec) / (
-            np.linalg.norm(query_embedding) * np.linalg.norm(vec) + 1e-8
+        print("🗄️ Persisting to Qdrant...")
+        store = get_vector_store()
+    else:
+        import tempfile
+
+        from agent.rag.local_backend import LocalVectorBackend
+
+        store = TemplateVectorStore(
+            backend=LocalVectorBackend(
+                TemplateVectorStore.EMBEDDING_DIMENSION,
+                directory=tempfile.mkdtemp(prefix="terminal-rag-"),
+            )
         )
-        scores.append((similarity, item["content"]))
-    
-    # Sort by similarity descending
-    scores.sort(key=lambda x: x[0], reverse=True)
-    
-    results = []
-    for score, content in scores[:k]:
-        results.append(content)
-        
-    return results
+
+    print("🧠 Generating embeddings...")
+    await store.add_template_documents("terminal_test", chunks)
+    print(f"✅ Vector store ready: {len(chunks)} chunks")
+    return store
+
+
+def retrieve_context(query: str, store, k: int = 5) -> list[str]:
+    """Retrieve top-k relevant chunks for a query."""
+    # Note: We use 'terminal_test' as the template_id (hardcoded in build_vector_store)
+    return store.query_for_interview_sync("terminal_test", query, k=k)
 
 
-async def run_text_mode(store, embedder, args):
+async def run_text_mode(store, args):
     """Text-only RAG Q&A loop."""
     from agent.voice_agent import create_model_components
     from livekit.agents.llm import ChatContext
@@ -164,7 +143,7 @@ async def run_text_mode(store, embedder, args):
             break
 
         # Retrieve relevant context
-        context_chunks = retrieve_context(user_input, store, embedder, k=args.chunks, use_qdrant=args.qdrant)
+        context_chunks = retrieve_context(user_input, store, k=args.chunks)
         
         if context_chunks:
             context_str = "\n---\n".join(context_chunks)
@@ -211,7 +190,7 @@ async def run_text_mode(store, embedder, args):
     print("\n[System] RAG session ended.")
 
 
-async def run_voice_mode(store, embedder, args):
+async def run_voice_mode(store, args):
     """Full voice pipeline with RAG augmentation."""
     import sounddevice as sd
     import requests
@@ -390,7 +369,7 @@ async def run_voice_mode(store, embedder, args):
                         print(f"📊 {display}", flush=True)
 
                     # RAG retrieval
-                    context_chunks = retrieve_context(user_text, store, embedder, k=args.chunks, use_qdrant=args.qdrant)
+                    context_chunks = retrieve_context(user_text, store, k=args.chunks)
                     if context_chunks:
                         context_str = "\n---\n".join(context_chunks)
                         augmented_prompt = (
@@ -468,20 +447,13 @@ async def main():
     chunks = await load_document(args.doc)
 
     # 2. Build vector store
-    if args.qdrant:
-        from agent.rag.vector_store import get_vector_store
-        v_store = get_vector_store()
-        print("🗄️ Persisting to Qdrant...")
-        await v_store.add_template_documents("terminal_test", chunks)
-        store, embedder = [], None
-    else:
-        store, embedder = build_vector_store(chunks)
+    store = await build_vector_store(chunks, use_qdrant=args.qdrant)
 
     # 3. Run appropriate mode
     if args.voice:
-        await run_voice_mode(store, embedder, args)
+        await run_voice_mode(store, args)
     else:
-        await run_text_mode(store, embedder, args)
+        await run_text_mode(store, args)
 
 
 if __name__ == "__main__":
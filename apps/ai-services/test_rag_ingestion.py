@@ -0,0 +1,118 @@
+"""Regression tests for the RAG ingestion pipeline.
+
+Run with: python -m pytest test_rag_ingestion.py
+"""
+
+import asyncio
+
+import pytest
+
+ingestion = pytest.importorskip("agent.rag.ingestion", reason="RAG dependencies not installed")
+
+from agent.rag.schemas import DocumentChunk  # noqa: E402
+from agent.rag.vector_backend import VectorPoint  # noqa: E402
+from agent.settings import settings  # noqa: E402
+
+
+class FakeStore:
+    """Just the `TemplateVectorStore` surface used by `ingest_chunks`."""
+
+    def __init__(self, fail_upsert: bool = False, existing: set[str] | None = None):
+        self.fail_upsert = fail_upsert
+        self.existing = existing or set()
+        self.upserted: list[VectorPoint] = []
+        self.refreshed: dict[str, dict] = {}
+
+    def point_id(self, template_id, chunk):
+        return f"{template_id}:{chunk.id}"
+
+    async def existing_point_ids_async(self, template_id, point_ids):
+        return self.existing & set(point_ids)
+
+    def chunk_payload(self, template_id, chunk):
+        return {"content": chunk.content, **chunk.metadata}
+
+    async def update_point_payloads_async(self, template_id, payloads):
+        self.refreshed.update(payloads)
+
+    async def delete_stale_points_async(self, template_id, source, keep_ids):
+        pass
+
+    def embed_texts(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def build_points(self, template_id, chunks, vectors, point_ids):
+        return [
+            VectorPoint(id=point_id, vector=vector, payload={"content": chunk.content})
+            for chunk, vector, point_id in zip(chunks, vectors, point_ids, strict=True)
+        ]
+
+    async def upsert_points_async(self, points):
+        if self.fail_upsert:
+            # Give the embed stage time to fill the queue and block on it.
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upsert failed")
+        self.upserted.extend(points)
+
+
+def _chunks(count: int) -> list[DocumentChunk]:
+    return [
+        DocumentChunk(id=str(index), content=f"chunk {index}", metadata={"source": "a.pdf"})
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    # One point per batch and a one-slot queue: the embed stage is always
+    # waiting on a full queue when the upsert stage fails.
+    monkeypatch.setattr(settings, "rag_ingest_embed_batch_size", 1)
+    monkeypatch.setattr(settings, "rag_ingest_upsert_batch_size", 1)
+    monkeypatch.setattr(settings, "rag_ingest_queue_depth", 1)
+
+
+def test_ingest_upserts_every_chunk(small_batches):
+    store = FakeStore()
+    added = asyncio.run(ingestion.ingest_chunks(store, "t1", _chunks(20)))
+    assert added == 20
+    assert sorted(point.id for point in store.upserted) == sorted(f"t1:{i}" for i in range(20))
+
+
+def test_reingest_refreshes_payload_of_stored_chunks(small_batches):
+    chunks = [
+        DocumentChunk(
+            id=str(index),
+            content=f"chunk {index}",
+            metadata={"source": "a.pdf", "doc_id": "v2", "chunk_index": index},
+        )
+        for index in range(4)
+    ]
+    store = FakeStore(existing={"t1:0", "t1:1"})
+    added = asyncio.run(ingestion.ingest_chunks(store, "t1", chunks))
+    assert added == 2
+    assert sorted(point.id for point in store.upserted) == ["t1:2", "t1:3"]
+    assert store.refreshed["t1:1"]["doc_id"] == "v2"
+    assert store.refreshed["t1:1"]["chunk_index"] == 1
+    assert sorted(store.refreshed) == ["t1:0", "t1:1"]
+
+
+def test_upsert_failure_with_full_queue_raises(small_batches):
+    async def run() -> None:
+        await asyncio.wait_for(
+            ingestion.ingest_chunks(FakeStore(fail_upsert=True), "t1", _chunks(50)),
+            timeout=5.0,
+        )
+
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        asyncio.run(run())
+
+
+def test_upsert_failure_with_default_settings_raises():
+    async def run() -> None:
+        await asyncio.wait_for(
+            ingestion.ingest_chunks(FakeStore(fail_upsert=True), "t1", _chunks(1000)),
+            timeout=5.0,
+        )
+
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        asyncio.run(run())
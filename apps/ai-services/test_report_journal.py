@@ -0,0 +1,174 @@
+"""Retention and lease tests for the durable report job journal.
+
+Run with: python -m pytest test_report_journal.py
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from agent import report_journal
+from agent.report_journal import ReportJournal, ReportLeaseLostError
+from agent.report_scheduler import ReportScheduler
+from agent.session_collector import SessionData, SessionMetadata
+from agent.settings import settings
+
+OWNER = "host:1"
+DAY = 24 * 3600.0
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ReportJournal(path=str(tmp_path / "journal.sqlite3"))
+    yield journal
+    journal._conn.close()
+
+
+def _row(journal: ReportJournal, session_id: str):
+    return journal._conn.execute(
+        "SELECT state, session_data FROM report_jobs WHERE session_id = ?", (session_id,)
+    ).fetchone()
+
+
+def _age(journal: ReportJournal, session_id: str, seconds: float) -> None:
+    journal._conn.execute(
+        "UPDATE report_jobs SET updated_at = ? WHERE session_id = ?",
+        (time.time() - seconds, session_id),
+    )
+
+
+def _deliver(journal: ReportJournal, session_id: str) -> None:
+    assert journal.enqueue(session_id, b'{"metadata": {}}', OWNER)
+    journal.mark_running(session_id, OWNER)
+    journal.mark_generated(session_id, OWNER)
+    journal.mark_delivered(session_id, OWNER)
+
+
+def test_delivery_drops_session_payload(journal):
+    _deliver(journal, "s1")
+    row = _row(journal, "s1")
+    assert row["state"] == report_journal.DELIVERED
+    assert row["session_data"] == ""
+    # Still recognised as done, so a late resubmission is not run again.
+    assert not journal.enqueue("s1", b'{"metadata": {}}', OWNER)
+
+
+def test_purge_finished_keeps_recent_and_pending_jobs(journal):
+    _deliver(journal, "old-delivered")
+    _deliver(journal, "new-delivered")
+    journal.enqueue("old-failed", b"{}", OWNER)
+    journal.mark_failed("old-failed", OWNER, "boom", final=True)
+    journal.enqueue("old-pending", b"{}", OWNER)
+    for session_id in ("old-delivered", "old-failed", "old-pending"):
+        _age(journal, session_id, 10 * DAY)
+
+    assert journal.purge_finished(7 * DAY) == 2
+    assert _row(journal, "old-delivered") is None
+    assert _row(journal, "old-failed") is None
+    assert _row(journal, "new-delivered") is not None
+    assert _row(journal, "old-pending")["state"] == report_journal.QUEUED
+
+
+def test_scheduler_purges_journal_periodically(journal, monkeypatch):
+    monkeypatch.setattr(settings, "report_journal_retention_seconds", 7 * DAY)
+    monkeypatch.setattr(settings, "report_journal_purge_interval_seconds", 3600.0)
+    monkeypatch.setattr(settings, "report_journal_poll_seconds", 0.01)
+
+    async def handler(session_id, session_data):
+        pass
+
+    async def run() -> None:
+        _deliver(journal, "first")
+        _age(journal, "first", 10 * DAY)
+        scheduler = ReportScheduler(handler, journal=journal)
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        assert _row(journal, "first") is None
+
+        # Within the purge interval nothing else is deleted.
+        _deliver(journal, "second")
+        _age(journal, "second", 10 * DAY)
+        await asyncio.sleep(0.1)
+        assert _row(journal, "second") is not None
+        await scheduler.drain(timeout=1.0)
+
+    asyncio.run(run())
+
+
+def test_transitions_renew_the_lease(journal):
+    assert journal.enqueue("s1", b"{}", OWNER)
+    journal._conn.execute("UPDATE report_jobs SET lease_expires = ?", (time.time() + 1,))
+    journal.mark_running("s1", OWNER)
+    lease = journal._conn.execute("SELECT lease_expires FROM report_jobs").fetchone()[0]
+    assert lease > time.time() + journal.lease_seconds - 60
+
+
+def test_transition_after_takeover_raises(journal):
+    assert journal.enqueue("s1", b"{}", OWNER)
+    journal._conn.execute("UPDATE report_jobs SET lease_expires = ?", (time.time() - 1,))
+    assert [job.session_id for job in journal.claim_batch("host:2", 8)] == ["s1"]
+
+    with pytest.raises(ReportLeaseLostError):
+        journal.mark_generated("s1", OWNER)
+    assert journal.renew_leases(OWNER, ["s1"]) == {"s1"}
+    assert journal.renew_leases("host:2", ["s1"]) == set()
+
+
+def test_scheduler_abandons_job_whose_lease_was_taken_over(journal):
+    delivered: list[str] = []
+
+    async def handler(session_id, session_data):
+        # Another process claims the job while the report is generated.
+        journal._conn.execute(
+            "UPDATE report_jobs SET owner = 'host:2' WHERE session_id = ?", (session_id,)
+        )
+        await asyncio.to_thread(journal.mark_generated, session_id, scheduler.owner)
+        delivered.append(session_id)
+
+    async def run() -> None:
+        scheduler.start()
+        await scheduler.submit("s1", SessionData(metadata=SessionMetadata(room_name="s1")))
+        await scheduler.drain(timeout=2.0)
+
+    scheduler = ReportScheduler(handler, journal=journal)
+    asyncio.run(run())
+    assert delivered == []
+    assert scheduler.stats()["failed"] == 0
+    assert _row(journal, "s1")["state"] == report_journal.RUNNING
+
+def _orphan(journal: ReportJournal, session_id: str) -> None:
+    data = SessionData(metadata=SessionMetadata(room_name=session_id)).to_dict()
+    journal.enqueue(session_id, json.dumps(data).encode("utf-8"), "host:2")
+    journal._conn.execute(
+        "UPDATE report_jobs SET owner = NULL, lease_expires = NULL WHERE session_id = ?",
+        (session_id,),
+    )
+
+
+def test_resume_releases_claims_when_queue_fills(journal):
+    _orphan(journal, "a")
+    _orphan(journal, "b")
+
+    async def handler(session_id, session_data):
+        pass
+
+    async def run() -> bool:
+        scheduler._queue = asyncio.Queue(maxsize=scheduler.max_queue_size)
+        claim_batch = journal.claim_batch
+
+        def claim_then_fill(*args):
+            claimed = claim_batch(*args)
+            # A concurrent submit takes the free slot while the claim runs.
+            scheduler._queue.put_nowait(object())
+            return claimed
+
+        journal.claim_batch = claim_then_fill
+        return await scheduler._resume_batch()
+
+    scheduler = ReportScheduler(handler, max_queue_size=1, journal=journal)
+    assert asyncio.run(run()) is False
+    assert scheduler._jobs == {}
+    owners = journal._conn.execute("SELECT owner FROM report_jobs").fetchall()
+    assert [row["owner"] for row in owners] == [None, None]
@@ -0,0 +1,63 @@
+"""Tests for report scheduler deduplication.
+
+Run with: python -m pytest test_report_scheduler.py
+"""
+
+import asyncio
+from datetime import datetime
+
+from agent.report_journal import ReportJournal
+from agent.report_scheduler import ReportScheduler
+from agent.session_collector import SessionData, SessionMetadata
+
+
+def _session(question_count: int) -> SessionData:
+    session_data = SessionData(
+        metadata=SessionMetadata(
+            room_name="room-a",
+            template_id=None,
+            template_title="",
+            mode="strict",
+            started_at=datetime(2026, 1, 1),
+        )
+    )
+    session_data.question_count = question_count
+    return session_data
+
+
+def _run_resubmit_while_running(journal: ReportJournal | None = None) -> list[int]:
+    runs: list[int] = []
+
+    async def run() -> None:
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(session_id, session_data):
+            runs.append(session_data.question_count)
+            started.set()
+            await release.wait()
+
+        scheduler = ReportScheduler(handler, workers=1, journal=journal)
+        assert await scheduler.submit("s1", _session(1))
+        await started.wait()
+        # Both arrive while the first run is in progress; the newest wins.
+        assert not await scheduler.submit("s1", _session(2))
+        assert not await scheduler.submit("s1", _session(3))
+        release.set()
+        await scheduler.drain(timeout=2.0)
+
+    asyncio.run(run())
+    return runs
+
+
+def test_resubmit_while_running_queues_follow_up():
+    assert _run_resubmit_while_running() == [1, 3]
+
+
+def test_follow_up_is_journaled_and_delivered(tmp_path):
+    journal = ReportJournal(path=str(tmp_path / "journal.sqlite3"))
+    try:
+        assert _run_resubmit_while_running(journal) == [1, 3]
+        assert journal.counts() == {"delivered": 1}
+    finally:
+        journal._conn.close()
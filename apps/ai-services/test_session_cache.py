@@ -0,0 +1,93 @@
+"""Disk spill tests for the bounded session cache.
+
+Run with: python -m pytest test_session_cache.py
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+from agent.session_cache import SessionCache
+from agent.session_collector import SessionData, SessionMetadata
+
+
+def _session(room_name: str) -> SessionData:
+    return SessionData(
+        metadata=SessionMetadata(
+            room_name=room_name,
+            template_id=None,
+            template_title="",
+            mode="strict",
+            started_at=datetime(2026, 1, 1),
+        )
+    )
+
+
+def test_spilled_session_is_restored_under_all_keys(tmp_path):
+    cache = SessionCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put(_session("room-a"), "session-a", "room-a")
+    cache.put(_session("room-b"), "session-b", "room-b")
+    assert cache.stats()["spilled"] == 1
+
+    # Loading through the alias brings the primary key back too.
+    assert cache.get("room-a").metadata.room_name == "room-a"
+    assert cache.stats()["loadedFromDisk"] == 1
+    assert cache._get_cached("session-a") is not None
+    assert cache._get_cached("room-a") is not None
+
+
+def test_async_variants_do_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    cache = SessionCache(max_entries=1, spill_dir=str(tmp_path))
+    io_threads: list[int] = []
+    spill, load = cache._spill, cache._load_spilled
+
+    def recording_spill(entry):
+        io_threads.append(threading.get_ident())
+        spill(entry)
+
+    def recording_load(key):
+        io_threads.append(threading.get_ident())
+        return load(key)
+
+    monkeypatch.setattr(cache, "_spill", recording_spill)
+    monkeypatch.setattr(cache, "_load_spilled", recording_load)
+
+    async def run() -> SessionData | None:
+        await cache.put_async(_session("room-a"), "session-a", "room-a")
+        await cache.put_async(_session("room-b"), "session-b", "room-b")
+        return await cache.get_async("session-a")
+
+    loop_thread = threading.get_ident()
+    session_data = asyncio.run(run())
+    assert session_data is not None and session_data.metadata.room_name == "room-a"
+    assert io_threads and loop_thread not in io_threads
+
+
+def test_get_async_without_spill_dir_counts_miss():
+    cache = SessionCache(max_entries=1)
+    assert asyncio.run(cache.get_async("missing")) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_restoring_a_spilled_session_keeps_latest(tmp_path):
+    cache = SessionCache(max_entries=2, spill_dir=str(tmp_path))
+    for name in ("a", "b", "c"):
+        cache.put(_session(f"room-{name}"), f"session-{name}")
+    assert cache.latest().metadata.room_name == "room-c"
+
+    # Reading an old report loads session a back from disk...
+    assert cache.get("session-a").metadata.room_name == "room-a"
+    assert cache.stats()["loadedFromDisk"] == 1
+    # ...but it is still not the most recently stored session.
+    assert cache.latest().metadata.room_name == "room-c"
+
+
+def test_restore_never_replaces_newer_data(tmp_path):
+    cache = SessionCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put(_session("room-a"), "session-a", "room-a")
+    cache.put(_session("room-b"), "session-b")
+    # A new session for room-a arrives while the old one is on disk.
+    cache.put(_session("room-a-new"), "room-a")
+
+    assert cache.get("session-a").metadata.room_name == "room-a"
+    assert cache.get("room-a").metadata.room_name == "room-a-new"
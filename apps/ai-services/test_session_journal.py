@@ -0,0 +1,66 @@
+"""Journal-mode memory and ordering tests for the session collector.
+
+Run with: python -m pytest test_session_journal.py
+"""
+
+import threading
+
+import pytest
+
+from agent.code_history import CodeSnapshotHistory
+from agent.session_collector import SessionCollector, SessionMetadata
+from agent.session_journal import SCORE, SessionJournal, load_session, metadata_record
+from agent.settings import settings
+
+
+def _code(step: int) -> str:
+    return "".join(f"line {line}\n" for line in range(30)) + f"step {step}\n"
+
+
+def test_discarded_snapshots_keep_indices_stable():
+    history = CodeSnapshotHistory(keyframe_interval=4)
+    for step in range(10):
+        assert history.append(_code(step)) == step
+    history.discard_before(9)
+    assert len(history) == 10
+    assert history.get(9) == _code(9)
+    assert history.get(8) == _code(8)
+    with pytest.raises(IndexError):
+        history.get(7)
+    assert history.append(_code(10)) == 10
+    assert history.get(10) == _code(10)
+
+
+def test_journal_mode_bounds_snapshots_and_rebuilds_all(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "session_journal_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "session_journal_tail_entries", 5)
+    collector = SessionCollector("room-1", journal=True)
+    for step in range(100):
+        collector.add_code_history_event(
+            "user", "edit", f"step {step}", details={"codeSnapshot": _code(step)}
+        )
+        assert len(collector.data.code_snapshots._records) <= 3 * 5 + 2 * 20
+
+    data = collector.end_session()
+    assert len(data.code_history) == 100
+    assert [data.code_snapshot(entry) for entry in data.code_history] == [
+        _code(step) for step in range(100)
+    ]
+
+
+def test_concurrent_flushes_keep_append_order(tmp_path):
+    path = str(tmp_path / "order.journal")
+    journal = SessionJournal(path, fsync_interval=0.001, fsync_bytes=1)
+    journal.append(metadata_record(SessionMetadata(room_name="order")))
+    flushers = [
+        threading.Thread(target=lambda: [journal.flush() for _ in range(50)])
+        for _ in range(3)
+    ]
+    for thread in flushers:
+        thread.start()
+    for index in range(2000):
+        journal.append({"k": SCORE, "v": index})
+    for thread in flushers:
+        thread.join()
+    journal.close()
+    assert load_session(path).scores == list(range(2000))